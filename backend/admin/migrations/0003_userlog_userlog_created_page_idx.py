@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-19 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend_admin', '0002_report_mediafile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userlog',
+            index=models.Index(fields=['created_at', 'id'], name='userlog_created_page_idx'),
+        ),
+    ]
@@ -11,6 +11,9 @@ class UserLog(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='userlog_created_page_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.action} - {self.created_at}"
@@ -19,14 +19,17 @@ urlpatterns = [
     # Category Management
     path('categories/', views.CategoryListView.as_view(), name='admin-category-list'),
     path('categories/<int:pk>/', views.CategoryDetailView.as_view(), name='admin-category-detail'),
+    path('categories/bulk/', views.CategoryBulkView.as_view(), name='admin-category-bulk'),
 
     # Service Management
     path('services/', views.ServiceListView.as_view(), name='admin-service-list'),
     path('services/<int:pk>/', views.ServiceDetailView.as_view(), name='admin-service-detail'),
+    path('services/bulk/', views.ServiceBulkView.as_view(), name='admin-service-bulk'),
 
     # Appointment Management
     path('appointments/', views.AppointmentListView.as_view(), name='admin-appointment-list'),
     path('appointments/today/', views.TodayAppointmentsView.as_view(), name='admin-today-appointments'),
+    path('appointments/bulk/', views.AppointmentBulkView.as_view(), name='admin-appointment-bulk'),
     path('appointments/<int:pk>/', views.AppointmentDetailView.as_view(), name='admin-appointment-detail'),
     path('appointments/<int:pk>/cancel/', views.AppointmentCancelView.as_view(), name='admin-appointment-cancel'),
 
@@ -37,9 +40,13 @@ urlpatterns = [
     path('business-hours/', views.BusinessHoursListView.as_view(), name='admin-business-hours-list'),
     path('business-hours/<int:pk>/', views.BusinessHoursUpdateView.as_view(), name='admin-business-hours-update'),
 
+    # Schedule Management
+    path('schedules/bulk/', views.ScheduleBulkView.as_view(), name='admin-schedule-bulk'),
+
     # Holiday Management
     path('holidays/', views.HolidayListView.as_view(), name='admin-holiday-list'),
     path('holidays/<int:pk>/', views.HolidayDetailView.as_view(), name='admin-holiday-detail'),
+    path('holidays/bulk/', views.HolidayBulkView.as_view(), name='admin-holiday-bulk'),
 
     # Reports
     path('dashboard/', views.DashboardView.as_view(), name='admin-dashboard'),
@@ -71,4 +78,6 @@ urlpatterns = [
     path('sms-notifications/<int:pk>/', views.SMSNotificationDetailView.as_view(), name='admin-sms-notification-detail'),
     path('sms-notifications/send/', views.SendSMSNotificationView.as_view(), name='admin-send-sms-notification'),
     path('sms-notifications/update-status/', views.UpdateSMSStatusView.as_view(), name='admin-update-status'),
+    path('sms-notifications/requeue/', views.RequeueSMSView.as_view(), name='admin-requeue-sms'),
+    path('provider-health/', views.ProviderHealthView.as_view(), name='admin-provider-health'),
 ]
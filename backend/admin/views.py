@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from django.utils import timezone
 from django.db.models import Count, Sum, Avg, Q
 from django.shortcuts import get_object_or_404
@@ -11,39 +13,48 @@ from datetime import datetime, timedelta
 
 from barberian.common.models import (
     User, Category, Service, Appointment, ServiceMedia,
-    BusinessSettings, BusinessHours, Holiday
+    BusinessSettings, BusinessHours, Holiday, Schedule
 )
 from barberian.notification.models import SMSNotification
+from barberian.notification.partitions import recent
+from barberian.notification.retries import requeue_sms, REQUEUEABLE_STATUSES
 from barberian.admin.models import UserLog, Report, MediaFile
 from barberian.common.serializers import (
     UserSerializer, UserCreateSerializer, CategorySerializer, ServiceSerializer,
     AppointmentSerializer, BusinessSettingsSerializer,
-    BusinessHoursSerializer, HolidaySerializer
+    BusinessHoursSerializer, HolidaySerializer, ScheduleSerializer,
+    ServiceValuesSerializer, AppointmentValuesSerializer
 )
 from barberian.notification.serializers import SMSNotificationSerializer
 from barberian.admin.serializers import (
     UserLogSerializer, ServiceMediaSerializer, StaffSerializer,
     ReportSerializer, MediaFileSerializer
 )
+from barberian.utils.bulk import BulkWriteView
+from barberian.utils.eager_loading import EagerLoadingViewMixin
+from barberian.utils.pagination import KeysetPagination
+from barberian.utils.values_serializers import ValuesListMixin
 from barberian.utils.permissions import IsAdmin
-from barberian.notification.utils import (
-    notify_appointment_created,
-    notify_appointment_updated,
-    notify_appointment_canceled
-)
+from barberian.utils.circuit import breaker_metrics
+from barberian.common.catalogue import bump_catalogue_version
+from barberian.common.transitions import transition_appointment, can_transition, InvalidTransition
+from barberian.notification.batching import batch_appointment_changes
+from barberian.notification.utils import notify_appointment_created
 
 
 # User Management Views
-class UserListView(generics.ListCreateAPIView):
+class UserListView(EagerLoadingViewMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing all users and creating a new user.
     """
     queryset = User.objects.all().order_by('-date_joined')
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-date_joined', '-id')
 
 
-class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
+class UserDetailView(EagerLoadingViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint for retrieving, updating or deleting a user.
     """
@@ -122,11 +133,13 @@ class StaffDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Client Management Views
-class ClientListCreateView(generics.ListCreateAPIView):
+class ClientListCreateView(EagerLoadingViewMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing all clients and creating new ones.
     """
     permission_classes = [IsAuthenticated, IsAdmin]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-date_joined', '-id')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -189,6 +202,17 @@ class ClientDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.delete()
 
 
+class CatalogueBulkWriteView(BulkWriteView):
+    """
+    Bulk writes to catalogue models, which bypass the signals that start a
+    new catalogue version.
+    """
+    permission_classes = [IsAdmin]
+
+    def after_write(self, created, updated, deleted_ids):
+        bump_catalogue_version()
+
+
 # Category Management Views
 class CategoryListView(generics.ListCreateAPIView):
     """
@@ -208,17 +232,26 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdmin]
 
 
+class CategoryBulkView(CatalogueBulkWriteView):
+    """
+    API endpoint for creating, updating and deleting categories in bulk.
+    """
+    queryset = Category.objects.all()
+    serializer_class = CategorySerializer
+
+
 # Service Management Views
-class ServiceListView(generics.ListCreateAPIView):
+class ServiceListView(ValuesListMixin, EagerLoadingViewMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing all services and creating a new service.
     """
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
+    values_serializer_class = ServiceValuesSerializer
     permission_classes = [IsAdmin]
 
 
-class ServiceDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ServiceDetailView(EagerLoadingViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint for retrieving, updating or deleting a service.
     """
@@ -227,13 +260,24 @@ class ServiceDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdmin]
 
 
+class ServiceBulkView(CatalogueBulkWriteView):
+    """
+    API endpoint for creating, updating and deleting services in bulk.
+    """
+    queryset = Service.objects.all()
+    serializer_class = ServiceSerializer
+
+
 # Appointment Management Views
-class AppointmentListView(generics.ListCreateAPIView):
+class AppointmentListView(ValuesListMixin, EagerLoadingViewMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing all appointments and creating new appointments.
     """
     serializer_class = AppointmentSerializer
+    values_serializer_class = AppointmentValuesSerializer
     permission_classes = [IsAdmin]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-start_time', '-id')
 
     def get_queryset(self):
         queryset = Appointment.objects.all().order_by('-start_time')
@@ -270,11 +314,12 @@ class AppointmentListView(generics.ListCreateAPIView):
         notify_appointment_created(appointment)
 
 
-class TodayAppointmentsView(generics.ListAPIView):
+class TodayAppointmentsView(ValuesListMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for listing today's appointments.
     """
     serializer_class = AppointmentSerializer
+    values_serializer_class = AppointmentValuesSerializer
     permission_classes = [IsAdmin]
 
     def get_queryset(self):
@@ -284,7 +329,7 @@ class TodayAppointmentsView(generics.ListAPIView):
         ).order_by('start_time')
 
 
-class AppointmentDetailView(generics.RetrieveUpdateAPIView):
+class AppointmentDetailView(EagerLoadingViewMixin, generics.RetrieveUpdateAPIView):
     """
     API endpoint for retrieving or updating an appointment.
     """
@@ -293,6 +338,74 @@ class AppointmentDetailView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAdmin]
 
 
+class AppointmentBulkView(BulkWriteView):
+    """
+    API endpoint for creating, updating and deleting appointments in bulk.
+
+    Status changes must be allowed transitions from the status the rows
+    have once locked. Notifications are created for the whole batch once it
+    is committed.
+    """
+    queryset = Appointment.objects.all()
+    serializer_class = AppointmentSerializer
+    permission_classes = [IsAdmin]
+
+    def validate_locked(self, to_create, to_update, to_delete, errors):
+        status_updates = [
+            (index, serializer) for index, serializer in enumerate(to_update)
+            if 'status' in serializer.validated_data
+        ]
+        if not status_updates:
+            return
+
+        # Check transitions from the committed status, which may have changed since validation
+        current = dict(
+            Appointment.objects.select_for_update().filter(
+                pk__in=[serializer.instance.pk for _, serializer in status_updates]
+            ).order_by('pk').values_list('pk', 'status')
+        )
+        for index, serializer in status_updates:
+            old_status = current.get(serializer.instance.pk)
+            new_status = serializer.validated_data['status']
+            if old_status is None:
+                errors['update'][index] = {'id': ['Not found.']}
+            elif new_status != old_status and not can_transition(old_status, new_status):
+                errors['update'][index] = {
+                    'status': [f"Cannot change an appointment from '{old_status}' to '{new_status}'"]
+                }
+            else:
+                serializer.instance.status = old_status
+
+    def build_instance(self, validated_data):
+        appointment = super().build_instance(validated_data)
+        # What Appointment.save() does for new appointments
+        if not appointment.end_time:
+            appointment.end_time = appointment.start_time + timezone.timedelta(minutes=appointment.service.duration)
+        return appointment
+
+    def perform_write(self, to_create, to_update, to_delete):
+        # Read by attname, so foreign keys are compared without loading them
+        old_values = {}
+        for serializer in to_update:
+            fields = [Appointment._meta.get_field(field).attname for field in serializer.validated_data]
+            old_values[serializer.instance.pk] = {field: getattr(serializer.instance, field) for field in fields}
+
+        with batch_appointment_changes() as batch:
+            created, updated, deleted_ids = super().perform_write(to_create, to_update, to_delete)
+
+            for appointment in created:
+                batch.add(appointment.pk, created=True)
+            for appointment in updated:
+                changed = {
+                    field: value for field, value in old_values[appointment.pk].items()
+                    if getattr(appointment, field) != value
+                }
+                if changed:
+                    batch.add(appointment.pk, old_values=changed)
+
+        return created, updated, deleted_ids
+
+
 class AppointmentCancelView(APIView):
     """
     API endpoint for cancelling an appointment.
@@ -302,15 +415,16 @@ class AppointmentCancelView(APIView):
     def post(self, request, pk):
         try:
             appointment = Appointment.objects.get(pk=pk)
-            appointment.status = 'cancelled'
-            appointment.save()
 
-            # Notify the client and staff about cancellation
-            notify_appointment_canceled(appointment)
+            # Cancel the appointment; the client and staff are notified
+            # once the change is committed
+            transition_appointment(appointment, 'cancelled')
 
             return Response({"message": "Appointment cancelled successfully."}, status=status.HTTP_200_OK)
         except Appointment.DoesNotExist:
             return Response({"error": "Appointment not found."}, status=status.HTTP_404_NOT_FOUND)
+        except InvalidTransition as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
 # Business Settings Views
@@ -359,6 +473,73 @@ class BusinessHoursUpdateView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAdmin]
 
 
+# Schedule Management Views
+class ScheduleBulkView(BulkWriteView):
+    """
+    API endpoint for creating, updating and deleting staff schedules in bulk.
+
+    Schedules may not overlap other schedules of the same staff member on
+    the same day, whether already stored or in the batch.
+    """
+    queryset = Schedule.objects.all()
+    serializer_class = ScheduleSerializer
+    permission_classes = [IsAdmin]
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        # The unique_together check queries once per item; clashes are
+        # overlaps, which validate_batch() checks for the whole batch
+        serializer.validators = []
+        return serializer
+
+    def validate_batch(self, to_create, to_update, to_delete, errors):
+        # Schedules as they will be after the write, by staff member and day
+        entries = []
+        for index, serializer in enumerate(to_create):
+            data = serializer.validated_data
+            entries.append(('create', index, data['staff'].pk, data['date'], data['start_time'], data['end_time']))
+        for index, serializer in enumerate(to_update):
+            instance, data = serializer.instance, serializer.validated_data
+            entries.append((
+                'update', index,
+                data['staff'].pk if 'staff' in data else instance.staff_id,
+                data.get('date', instance.date),
+                data.get('start_time', instance.start_time),
+                data.get('end_time', instance.end_time)
+            ))
+
+        days = defaultdict(list)
+        for kind, index, staff_id, date, start_time, end_time in entries:
+            if start_time >= end_time:
+                errors[kind][index] = {'end_time': ['End time must be after start time.']}
+            days[(staff_id, date)].append((start_time, end_time, kind, index))
+        if not days:
+            return
+
+        # Stored schedules the batch leaves in place, in one query
+        changed_ids = [serializer.instance.pk for serializer in to_update] + [instance.pk for instance in to_delete]
+        stored = Schedule.objects.filter(
+            staff_id__in={staff_id for staff_id, _ in days},
+            date__in={date for _, date in days}
+        ).exclude(pk__in=changed_ids).values_list('staff_id', 'date', 'start_time', 'end_time')
+        for staff_id, date, start_time, end_time in stored:
+            if (staff_id, date) in days:
+                days[(staff_id, date)].append((start_time, end_time, None, None))
+
+        for schedules in days.values():
+            schedules.sort(key=lambda schedule: schedule[:2])
+            latest = None
+            for schedule in schedules:
+                if latest is not None and schedule[0] < latest[1]:
+                    for _, _, kind, index in (latest, schedule):
+                        if kind is not None and not errors[kind][index]:
+                            errors[kind][index] = {
+                                'non_field_errors': ['This schedule overlaps with another schedule.']
+                            }
+                if latest is None or schedule[1] > latest[1]:
+                    latest = schedule
+
+
 # Holiday Management Views
 class HolidayListView(generics.ListCreateAPIView):
     """
@@ -378,6 +559,14 @@ class HolidayDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdmin]
 
 
+class HolidayBulkView(CatalogueBulkWriteView):
+    """
+    API endpoint for creating, updating and deleting holidays in bulk.
+    """
+    queryset = Holiday.objects.all()
+    serializer_class = HolidaySerializer
+
+
 # Admin Login View
 class AdminLoginView(APIView):
     permission_classes = [AllowAny]
@@ -681,6 +870,8 @@ class AppointmentMetricsReportView(APIView):
 class UserLogListView(generics.ListAPIView):
     serializer_class = UserLogSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         queryset = UserLog.objects.all()
@@ -711,12 +902,14 @@ class UserLogDeleteView(generics.DestroyAPIView):
 
 
 # SMS Notification Management Views
-class SMSNotificationListView(generics.ListAPIView):
+class SMSNotificationListView(EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for listing SMS notifications.
     """
     serializer_class = SMSNotificationSerializer
     permission_classes = [IsAdmin]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         queryset = SMSNotification.objects.all().order_by('-created_at')
@@ -738,11 +931,12 @@ class SMSNotificationListView(generics.ListAPIView):
             queryset = queryset.filter(created_at__date__gte=start_date)
         if end_date:
             queryset = queryset.filter(created_at__date__lte=end_date)
+        queryset = recent(queryset, self.request)
 
         return queryset
 
 
-class SMSNotificationDetailView(generics.RetrieveAPIView):
+class SMSNotificationDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """
     API endpoint for retrieving SMS notification details.
     """
@@ -837,6 +1031,59 @@ class UpdateSMSStatusView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class RequeueSMSView(APIView):
+    """
+    API endpoint for putting failed or dead-lettered SMS notifications back
+    on the retry queue.
+
+    Accepts either a list of SMS notification IDs ("ids") or a status
+    ("status") to requeue every message in that status.
+    """
+    permission_classes = [IsAdmin]
+
+    def post(self, request):
+        sms_ids = request.data.get('ids')
+        status_filter = request.data.get('status')
+
+        if sms_ids:
+            if not isinstance(sms_ids, list):
+                return Response(
+                    {"error": "ids must be a list of SMS notification IDs."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = SMSNotification.objects.filter(id__in=sms_ids)
+        elif status_filter:
+            if status_filter not in REQUEUEABLE_STATUSES:
+                return Response(
+                    {"error": f"Only {', '.join(REQUEUEABLE_STATUSES)} messages can be requeued."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = SMSNotification.objects.filter(status=status_filter)
+        else:
+            return Response(
+                {"error": "Provide either ids or status."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        requeued = requeue_sms(queryset)
+
+        return Response({
+            "message": f"{requeued} SMS notifications requeued.",
+            "requeued": requeued
+        }, status=status.HTTP_200_OK)
+
+
+class ProviderHealthView(APIView):
+    """
+    API endpoint for the circuit breaker state and trip metrics of the
+    messaging providers in this process.
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response({"providers": breaker_metrics()}, status=status.HTTP_200_OK)
+
+
 # Report Management Views
 class ReportListCreateView(generics.ListCreateAPIView):
     """
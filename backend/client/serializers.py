@@ -3,10 +3,11 @@ from django.contrib.auth import get_user_model
 
 from barberian.client.models import ClientProfile, ClientPreference
 from barberian.common.serializers import UserSerializer, ServiceSerializer
+from barberian.utils.eager_loading import EagerLoadingMixin
 
 User = get_user_model()
 
-class ClientProfileSerializer(serializers.ModelSerializer):
+class ClientProfileSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the ClientProfile model
     """
@@ -1,28 +1,35 @@
 from django.utils import timezone
-from django.db.models import Q
 from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import status
 
-from barberian.common.models import User, Service, Category, Appointment, BusinessHours, Holiday, BusinessSettings
+from barberian.common.models import User, Service, Category, Appointment
 from barberian.common.serializers import (
     ServiceSerializer, CategorySerializer, UserSerializer,
-    AppointmentSerializer, StaffAvailabilitySerializer, BusinessSettingsSerializer
+    AppointmentSerializer, StaffAvailabilitySerializer,
+    ServiceValuesSerializer, AppointmentValuesSerializer
 )
+from barberian.utils.eager_loading import EagerLoadingViewMixin
 from barberian.utils.permissions import IsClient
-from barberian.notification.utils import notify_appointment_created, notify_appointment_canceled, notify_appointment_updated
+from barberian.utils.values_serializers import ValuesListMixin
+from barberian.common.business_calendar import get_business_calendar, DAY_NAMES
+from barberian.common.catalogue import CatalogueCacheMixin
+from barberian.common.transitions import transition_appointment, can_transition, InvalidTransition
+from barberian.notification.utils import notify_appointment_created
 from barberian.client.models import ClientProfile, ClientPreference
 from barberian.client.serializers import ClientProfileSerializer, ClientPreferenceSerializer
 
-class ServiceListView(generics.ListAPIView):
+class ServiceListView(CatalogueCacheMixin, ValuesListMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for listing services available for booking
     """
     queryset = Service.objects.all().order_by('category', 'name')
     serializer_class = ServiceSerializer
+    values_serializer_class = ServiceValuesSerializer
     permission_classes = [AllowAny]
+    catalogue_params = ('category', 'fields', 'expand')
 
     def get_queryset(self):
         # Optional category filter
@@ -31,7 +38,7 @@ class ServiceListView(generics.ListAPIView):
             return Service.objects.filter(category_id=category_id).order_by('name')
         return Service.objects.all().order_by('category', 'name')
 
-class ServiceDetailView(generics.RetrieveAPIView):
+class ServiceDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """
     API endpoint for retrieving service details
     """
@@ -39,7 +46,7 @@ class ServiceDetailView(generics.RetrieveAPIView):
     serializer_class = ServiceSerializer
     permission_classes = [AllowAny]
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(CatalogueCacheMixin, generics.ListAPIView):
     """
     API endpoint for listing service categories
     """
@@ -47,7 +54,7 @@ class CategoryListView(generics.ListAPIView):
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
 
-class StaffListView(generics.ListAPIView):
+class StaffListView(CatalogueCacheMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for listing staff members available for appointments
     """
@@ -58,7 +65,7 @@ class StaffListView(generics.ListAPIView):
         # Return only active staff members
         return User.objects.filter(role='staff', is_active=True).order_by('first_name')
 
-class StaffDetailView(generics.RetrieveAPIView):
+class StaffDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """
     API endpoint for retrieving staff details
     """
@@ -100,8 +107,10 @@ class StaffAvailabilityView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        calendar = get_business_calendar()
+
         # Check if the date is a holiday
-        if Holiday.objects.filter(date=date).exists():
+        if calendar.get_holiday(date) is not None:
             return Response({
                 "available": False,
                 "staff_name": f"{staff.first_name} {staff.last_name}",
@@ -112,17 +121,8 @@ class StaffAvailabilityView(APIView):
 
         # Check business hours for the day of the week
         day_of_week = date.weekday()  # 0-6 (Monday-Sunday)
-        try:
-            business_hours = BusinessHours.objects.get(day_of_week=day_of_week)
-            if not business_hours.is_open:
-                return Response({
-                    "available": False,
-                    "staff_name": f"{staff.first_name} {staff.last_name}",
-                    "date": date_str,
-                    "message": f"The shop is closed on {business_hours.get_day_of_week_display()}",
-                    "slots": []
-                })
-        except BusinessHours.DoesNotExist:
+        business_hours = calendar.get_day_hours(day_of_week)
+        if business_hours is None:
             return Response({
                 "available": False,
                 "staff_name": f"{staff.first_name} {staff.last_name}",
@@ -130,6 +130,14 @@ class StaffAvailabilityView(APIView):
                 "message": "Business hours not configured for this day",
                 "slots": []
             })
+        if not business_hours.is_open:
+            return Response({
+                "available": False,
+                "staff_name": f"{staff.first_name} {staff.last_name}",
+                "date": date_str,
+                "message": f"The shop is closed on {DAY_NAMES[day_of_week]}",
+                "slots": []
+            })
 
         # Get existing appointments for this staff member on this date
         start_of_day = timezone.datetime.combine(date, timezone.datetime.min.time())
@@ -141,27 +149,24 @@ class StaffAvailabilityView(APIView):
             status__in=['confirmed', 'pending']
         )
 
-        # Calculate available time slots
-        opening_time = business_hours.opening_time
-        closing_time = business_hours.closing_time
-
         # Generate 30-minute time slots within business hours
         all_slots = []
-        current_slot = opening_time
+        for opening_time, closing_time in calendar.open_intervals(date):
+            current_slot = opening_time
 
-        while current_slot < closing_time:
-            slot_end = (
-                timezone.datetime.combine(timezone.datetime.today(), current_slot) +
-                timezone.timedelta(minutes=30)
-            ).time()
+            while current_slot < closing_time:
+                slot_end = (
+                    timezone.datetime.combine(timezone.datetime.today(), current_slot) +
+                    timezone.timedelta(minutes=30)
+                ).time()
 
-            if slot_end <= closing_time:
-                all_slots.append({
-                    "start": current_slot.strftime('%H:%M'),
-                    "end": slot_end.strftime('%H:%M')
-                })
+                if slot_end <= closing_time:
+                    all_slots.append({
+                        "start": current_slot.strftime('%H:%M'),
+                        "end": slot_end.strftime('%H:%M')
+                    })
 
-            current_slot = slot_end
+                current_slot = slot_end
 
         # Remove slots that overlap with existing appointments
         available_slots = []
@@ -192,11 +197,12 @@ class StaffAvailabilityView(APIView):
             "slots": available_slots
         })
 
-class ClientAppointmentListView(generics.ListAPIView):
+class ClientAppointmentListView(ValuesListMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for listing a client's appointments
     """
     serializer_class = AppointmentSerializer
+    values_serializer_class = AppointmentValuesSerializer
     permission_classes = [IsAuthenticated, IsClient]
 
     def get_queryset(self):
@@ -205,7 +211,7 @@ class ClientAppointmentListView(generics.ListAPIView):
             client=self.request.user
         ).order_by('-start_time')
 
-class ClientAppointmentDetailView(generics.RetrieveAPIView):
+class ClientAppointmentDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """
     API endpoint for retrieving a client's appointment details
     """
@@ -346,8 +352,8 @@ class ClientAppointmentCancelView(APIView):
             # Get the appointment and ensure it belongs to the current user
             appointment = Appointment.objects.get(pk=pk, client=request.user)
 
-            # Check if the appointment is already cancelled or completed
-            if appointment.status in ['cancelled', 'completed']:
+            # Check if the appointment can still be cancelled
+            if not can_transition(appointment.status, 'cancelled'):
                 return Response(
                     {"error": f"Cannot cancel an appointment with status '{appointment.status}'"},
                     status=status.HTTP_400_BAD_REQUEST
@@ -360,12 +366,9 @@ class ClientAppointmentCancelView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Cancel the appointment
-            appointment.status = 'cancelled'
-            appointment.save()
-
-            # Send cancellation notification
-            notify_appointment_canceled(appointment)
+            # Cancel the appointment; the cancellation notifications are
+            # sent once the change is committed
+            transition_appointment(appointment, 'cancelled')
 
             return Response(
                 {"message": "Appointment successfully cancelled"},
@@ -378,6 +381,9 @@ class ClientAppointmentCancelView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        except InvalidTransition as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
 
 class ClientProfileView(APIView):
     """
@@ -392,6 +398,7 @@ class ClientProfileView(APIView):
 
         # Get or create client profile
         profile, created = ClientProfile.objects.get_or_create(user=user)
+        ClientProfileSerializer.prefetch_instances([profile])
         profile_data = ClientProfileSerializer(profile).data
 
         # Get or create client preferences
@@ -434,6 +441,7 @@ class ClientProfileView(APIView):
             return Response(preferences_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         # Return updated data
+        ClientProfileSerializer.prefetch_instances([profile])
         return Response({
             'message': 'Profile updated successfully',
             'user': UserSerializer(user).data,
@@ -442,62 +450,20 @@ class ClientProfileView(APIView):
         })
 
 
-class BusinessInfoView(APIView):
+class BusinessInfoView(CatalogueCacheMixin, APIView):
     """
     API endpoint for retrieving business information
     """
     permission_classes = [AllowAny]
 
-    def get(self, request):
-        # Get business settings
-        try:
-            settings = BusinessSettings.objects.get(pk=1)
-            settings_data = BusinessSettingsSerializer(settings).data
-        except BusinessSettings.DoesNotExist:
-            settings_data = {}
-
-        # Get business hours
-        hours = BusinessHours.objects.all().order_by('day_of_week')
-        hours_data = []
-        for day in range(7):
-            try:
-                day_hours = hours.get(day_of_week=day)
-                hours_data.append({
-                    'day': day,
-                    'day_name': day_hours.get_day_of_week_display(),
-                    'is_open': day_hours.is_open,
-                    'opening_time': day_hours.opening_time.strftime('%H:%M') if day_hours.is_open else None,
-                    'closing_time': day_hours.closing_time.strftime('%H:%M') if day_hours.is_open else None
-                })
-            except BusinessHours.DoesNotExist:
-                hours_data.append({
-                    'day': day,
-                    'day_name': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'][day],
-                    'is_open': False,
-                    'opening_time': None,
-                    'closing_time': None
-                })
-
-        # Get upcoming holidays
-        today = timezone.now().date()
-        holidays = Holiday.objects.filter(Q(date__gte=today) | Q(is_recurring=True)).order_by('date')[:10]
-        holidays_data = []
-        for holiday in holidays:
-            # For recurring holidays, adjust the year to current or next year
-            if holiday.is_recurring and holiday.date < today:
-                # If the holiday has already passed this year, show it for next year
-                holiday_date = holiday.date.replace(year=today.year + 1)
-            else:
-                holiday_date = holiday.date
-
-            holidays_data.append({
-                'name': holiday.name,
-                'date': holiday_date,
-                'is_recurring': holiday.is_recurring
-            })
+    def get_etag_extra(self):
+        # Upcoming holidays are relative to today
+        return timezone.now().date()
 
+    def get(self, request):
+        calendar = get_business_calendar()
         return Response({
-            'business': settings_data,
-            'hours': hours_data,
-            'holidays': holidays_data
+            'business': dict(calendar.settings),
+            'hours': calendar.weekly_hours(),
+            'holidays': calendar.upcoming_holidays(timezone.now().date())
         })
\ No newline at end of file
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend.common'
-    label = 'backend_common'
\ No newline at end of file
+    label = 'backend_common'
+
+    def ready(self):
+        import backend.common.signals
@@ -0,0 +1,151 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+from .catalogue import get_catalogue_payload
+from .models import BusinessHours, Holiday, BusinessSettings
+from .serializers import BusinessSettingsSerializer
+
+DAY_NAMES = tuple(name for _, name in BusinessHours.DAY_CHOICES)
+
+# Opening hours of one day of the week
+DayHours = namedtuple('DayHours', ['is_open', 'opening_time', 'closing_time'])
+
+# Upcoming holidays listed by default
+UPCOMING_HOLIDAYS = 10
+
+def _next_occurrence(date, today):
+    """
+    Get the first anniversary of a date on or after today, skipping years
+    without it (29 February).
+    """
+    for year in range(today.year, today.year + 5):
+        try:
+            occurrence = date.replace(year=year)
+        except ValueError:
+            continue
+        if occurrence >= today:
+            return occurrence
+    return None
+
+class BusinessCalendar:
+    """
+    Compiled, read-only view of the business hours, holidays and settings.
+
+    Built from three queries and shared by every request of a catalogue
+    version through get_business_calendar(), so call sites answer "is the
+    shop open" questions without touching the database. Recurring holidays
+    match every year on their month and day.
+    """
+
+    def __init__(self, hours, holidays, settings):
+        """
+        Args:
+            hours: BusinessHours rows
+            holidays: Holiday rows
+            settings: Serialized BusinessSettings, or an empty dict
+        """
+        by_day = {row.day_of_week: DayHours(row.is_open, row.opening_time, row.closing_time) for row in hours}
+        self._hours = tuple(by_day.get(day) for day in range(7))
+        self._holidays = tuple(sorted(
+            ((holiday.date, holiday.name, holiday.is_recurring) for holiday in holidays),
+            key=lambda holiday: holiday[0]
+        ))
+        self._dates = {date: name for date, name, is_recurring in self._holidays if not is_recurring}
+        self._recurring = {(date.month, date.day): name for date, name, is_recurring in self._holidays if is_recurring}
+        self._settings = dict(settings)
+
+    @classmethod
+    def load(cls):
+        """
+        Build a calendar from the database.
+
+        Returns:
+            BusinessCalendar: The calendar
+        """
+        try:
+            settings = BusinessSettingsSerializer(BusinessSettings.objects.get(pk=1)).data
+        except BusinessSettings.DoesNotExist:
+            settings = {}
+        return cls(BusinessHours.objects.all(), Holiday.objects.all(), settings)
+
+    @property
+    def settings(self):
+        return MappingProxyType(self._settings)
+
+    def get_day_hours(self, day_of_week):
+        """
+        Get the hours of a day of the week (0 is Monday).
+
+        Returns:
+            DayHours: The hours, or None when they are not configured
+        """
+        return self._hours[day_of_week]
+
+    def get_holiday(self, date):
+        """
+        Get the name of the holiday on a date, or None.
+        """
+        name = self._dates.get(date)
+        if name is None:
+            name = self._recurring.get((date.month, date.day))
+        return name
+
+    def is_open(self, date):
+        """
+        Whether the shop opens on a date.
+        """
+        return bool(self.open_intervals(date))
+
+    def open_intervals(self, date):
+        """
+        Get the opening hours of a date.
+
+        Returns:
+            list: (opening time, closing time) pairs; empty on holidays and
+                closed or unconfigured days
+        """
+        day_hours = self._hours[date.weekday()]
+        if day_hours is None or not day_hours.is_open or self.get_holiday(date) is not None:
+            return []
+        return [(day_hours.opening_time, day_hours.closing_time)]
+
+    def weekly_hours(self):
+        """
+        Get the hours of every day of the week, as shown to clients.
+        """
+        weekly = []
+        for day, day_hours in enumerate(self._hours):
+            is_open = day_hours is not None and day_hours.is_open
+            weekly.append({
+                'day': day,
+                'day_name': DAY_NAMES[day],
+                'is_open': is_open,
+                'opening_time': day_hours.opening_time.strftime('%H:%M') if is_open else None,
+                'closing_time': day_hours.closing_time.strftime('%H:%M') if is_open else None
+            })
+        return weekly
+
+    def upcoming_holidays(self, today, limit=UPCOMING_HOLIDAYS):
+        """
+        Get the next holidays from today on, recurring ones at their next anniversary.
+
+        Returns:
+            list: Up to limit holidays, soonest first
+        """
+        upcoming = []
+        for date, name, is_recurring in self._holidays:
+            if is_recurring:
+                date = _next_occurrence(date, today)
+            if date is not None and date >= today:
+                upcoming.append({'name': name, 'date': date, 'is_recurring': is_recurring})
+        upcoming.sort(key=lambda holiday: holiday['date'])
+        return upcoming[:limit]
+
+def get_business_calendar():
+    """
+    Get the business calendar of the current catalogue version.
+
+    Returns:
+        BusinessCalendar: The calendar, built on the first call of a version
+    """
+    return get_catalogue_payload('business_calendar', BusinessCalendar.load)
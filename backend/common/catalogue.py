@@ -0,0 +1,195 @@
+import datetime
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from backend.utils.conditional import ConditionalGetMixin, EarlyResponse
+
+# Cache alias of the shared (L2) tier
+CACHE_ALIAS = getattr(settings, 'CATALOGUE_CACHE_ALIAS', 'default')
+# Seconds a payload is kept; a safety net for writes that bypass signals
+CACHE_TIMEOUT = getattr(settings, 'CATALOGUE_CACHE_TIMEOUT', 3600)
+# Seconds a process trusts its copy of the version before reading L2 again;
+# writes in other processes become visible after at most this long
+VERSION_CHECK_SECONDS = getattr(settings, 'CATALOGUE_VERSION_CHECK_SECONDS', 1)
+# Payloads kept in each process; the least recently used are dropped first
+LOCAL_MAX_ENTRIES = getattr(settings, 'CATALOGUE_LOCAL_MAX_ENTRIES', 256)
+
+VERSION_KEY = 'catalogue:version'
+
+# In-process (L1) tier: the version last read and the payloads cached under it
+_local = {'version': None, 'checked_at': 0.0, 'payloads': OrderedDict()}
+_lock = threading.Lock()
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+def _set_local_version(version, now):
+    # Payloads of older versions are never looked up again
+    if version != _local['version']:
+        _local['payloads'] = OrderedDict()
+    _local['version'] = version
+    _local['checked_at'] = now
+
+def clear_local_cache():
+    """
+    Forget the version and payloads cached in this process.
+    """
+    with _lock:
+        _local.update(version=None, checked_at=0.0, payloads=OrderedDict())
+
+def get_catalogue_version():
+    """
+    Get the current catalogue version.
+
+    The version is the time of the last catalogue change in milliseconds,
+    shared through the L2 cache and re-read at most every
+    CATALOGUE_VERSION_CHECK_SECONDS.
+
+    Returns:
+        int: The catalogue version
+    """
+    now = time.monotonic()
+    with _lock:
+        if _local['version'] is not None and now - _local['checked_at'] < VERSION_CHECK_SECONDS:
+            return _local['version']
+
+    version = _cache().get(VERSION_KEY)
+    if version is None:
+        # Unknown after a cache flush: start a new version so payloads
+        # cached before the flush are not reused
+        _cache().add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = _cache().get(VERSION_KEY)
+
+    with _lock:
+        _set_local_version(version, now)
+    return version
+
+def bump_catalogue_version():
+    """
+    Start a new catalogue version once the current transaction commits.
+
+    A request that read the version before the commit may still cache old
+    data under the old version, which is never looked up again afterwards.
+    """
+    transaction.on_commit(_bump)
+
+def _bump():
+    current = _cache().get(VERSION_KEY) or 0
+    version = max(current + 1, int(time.time() * 1000))
+    _cache().set(VERSION_KEY, version, timeout=None)
+    with _lock:
+        _set_local_version(version, time.monotonic())
+
+def get_cached_payload(key):
+    """
+    Look a payload up in this process (L1), then in the shared cache (L2).
+
+    Returns:
+        tuple: (current version, payload or None)
+    """
+    version = get_catalogue_version()
+    cache_key = f'catalogue:{version}:{key}'
+
+    with _lock:
+        payload = _local['payloads'].get(cache_key)
+        if payload is not None:
+            _local['payloads'].move_to_end(cache_key)
+    if payload is None:
+        payload = _cache().get(cache_key)
+        if payload is not None:
+            _store_local(version, cache_key, payload)
+
+    return version, payload
+
+def store_payload(version, key, payload):
+    """
+    Cache a payload built from data read under a version, in both tiers.
+    """
+    cache_key = f'catalogue:{version}:{key}'
+    _cache().set(cache_key, payload, timeout=CACHE_TIMEOUT)
+    _store_local(version, cache_key, payload)
+
+def _store_local(version, cache_key, payload):
+    with _lock:
+        if _local['version'] == version:
+            payloads = _local['payloads']
+            payloads[cache_key] = payload
+            payloads.move_to_end(cache_key)
+            while len(payloads) > LOCAL_MAX_ENTRIES:
+                payloads.popitem(last=False)
+
+def get_catalogue_payload(key, build):
+    """
+    Get a catalogue payload, building and caching it on a miss.
+
+    Args:
+        key: Identifies the payload within a version
+        build: Callable returning the payload
+
+    Returns:
+        The cached or freshly built payload
+    """
+    version, payload = get_cached_payload(key)
+    if payload is None:
+        payload = build()
+        store_payload(version, key, payload)
+    return payload
+
+def _get_origin(request):
+    """
+    Get the scheme and host of a request, lowercased and without a default port.
+    """
+    host = request.get_host().lower().rstrip('.')
+    default_port = ':443' if request.is_secure() else ':80'
+    if host.endswith(default_port):
+        host = host[:-len(default_port)]
+    return f"{request.scheme}://{host}"
+
+class CatalogueCacheMixin(ConditionalGetMixin):
+    """
+    View mixin serving a public catalogue endpoint from the catalogue cache.
+
+    Response data is cached under the catalogue version, which is also the
+    conditional GET validator: unchanged data is answered with a 304, and
+    cached data is served without touching the database. Only the query
+    parameters in catalogue_params are part of the cache key, so arbitrary
+    parameters cannot fill the cache with copies of the same payload.
+    """
+    # Query parameters the response depends on
+    catalogue_params = ('fields', 'expand')
+
+    def get_validators(self, request):
+        version = get_catalogue_version()
+        fingerprint = f"{request.accepted_renderer.format}|{self.get_etag_extra()}|{version}"
+        etag = f'"{hashlib.md5(fingerprint.encode()).hexdigest()}"'
+        return etag, datetime.datetime.fromtimestamp(version / 1000, tz=datetime.timezone.utc)
+
+    def get_catalogue_key(self, request):
+        # Absolute URLs in the data depend on the host, and filters on the query
+        params = [(name, request.query_params.get(name)) for name in self.catalogue_params]
+        variant = repr((_get_origin(request), [param for param in params if param[1] is not None]))
+        return f"{type(self).__name__}:{self.get_etag_extra()}:{hashlib.md5(variant.encode()).hexdigest()}"
+
+    def initial(self, request, *args, **kwargs):
+        self.catalogue_key = None
+        super().initial(request, *args, **kwargs)
+
+        if request.method in ('GET', 'HEAD'):
+            self.catalogue_key = self.get_catalogue_key(request)
+            self.catalogue_version, data = get_cached_payload(self.catalogue_key)
+            if data is not None:
+                self.catalogue_key = None
+                raise EarlyResponse(Response(data))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'catalogue_key', None) and response.status_code == 200 and isinstance(response, Response):
+            store_payload(self.catalogue_version, self.catalogue_key, response.data)
+        return response
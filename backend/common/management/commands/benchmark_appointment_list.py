@@ -0,0 +1,149 @@
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from backend.common.models import User, Category, Service, ServiceMedia, Appointment
+from backend.common.serializers import AppointmentSerializer, AppointmentValuesSerializer
+
+try:
+    from dirtyfields import DirtyFieldsMixin
+except ImportError:  # --compare-tracking is unavailable
+    DirtyFieldsMixin = None
+
+class Rollback(Exception):
+    pass
+
+@lru_cache(maxsize=None)
+def get_eager_tracking_model():
+    """
+    Appointment proxy tracking dirty fields with dirtyfields.DirtyFieldsMixin,
+    as Appointment did before LazyDirtyFieldsMixin.
+
+    Built on first use so the proxy is only registered for the benchmark.
+    """
+    class EagerTrackingAppointment(DirtyFieldsMixin, Appointment):
+        class Meta:
+            proxy = True
+            app_label = Appointment._meta.app_label
+
+    return EagerTrackingAppointment
+
+class Command(BaseCommand):
+    help = 'Measure appointment list loading and serialisation throughput on throwaway rows'
+
+    # Whether the command offers --compare-tracking
+    compares_tracking = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Number of appointments to create and list')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the best run is reported')
+        if self.compares_tracking:
+            parser.add_argument(
+                '--compare-tracking', action='store_true',
+                help='Also time loading with the eager dirtyfields.DirtyFieldsMixin (needs django-dirtyfields)'
+            )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+        if options['compare_tracking'] and DirtyFieldsMixin is None:
+            raise CommandError('--compare-tracking needs django-dirtyfields: pip install django-dirtyfields')
+
+        try:
+            with transaction.atomic():
+                appointment_ids = self.create_rows(rows)
+                queryset = AppointmentSerializer.setup_eager_loading(
+                    Appointment.objects.filter(id__in=appointment_ids).order_by('-start_time')
+                )
+
+                self.report('load', rows, self.measure(lambda: list(queryset.all()), repeat))
+                if options['compare_tracking']:
+                    self.compare_tracking(appointment_ids, rows, repeat)
+                self.report('serialize', rows, self.measure(
+                    lambda: AppointmentSerializer(list(queryset.all()), many=True).data, repeat
+                ))
+                self.report('values', rows, self.measure(lambda: self.render_values(queryset), repeat))
+
+                self.check_parity(queryset)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_rows(self, rows):
+        """
+        Create the benchmark appointments; they are rolled back afterwards.
+        """
+        suffix = int(time.time() * 1000)
+        client = User.objects.create_user(
+            email=f'benchmark-client-{suffix}@example.com', first_name='Bench', last_name='Client', role='client'
+        )
+        staff = User.objects.create_user(
+            email=f'benchmark-staff-{suffix}@example.com', first_name='Bench', last_name='Staff', role='staff'
+        )
+        category = Category.objects.create(name=f'Benchmark {suffix}')
+        service = Service.objects.create(name='Benchmark cut', price=10, duration=30, category=category)
+        ServiceMedia.objects.create(service=service, file='service_media/benchmark.jpg', file_type='image', is_primary=True)
+        ServiceMedia.objects.create(service=service, file='service_media/benchmark-2.jpg', file_type='image')
+
+        start = timezone.now()
+        appointments = Appointment.objects.bulk_create([
+            Appointment(
+                client=client,
+                staff=staff,
+                service=service,
+                start_time=start + timedelta(minutes=30 * i),
+                end_time=start + timedelta(minutes=30 * (i + 1)),
+                status='confirmed'
+            )
+            for i in range(rows)
+        ], batch_size=1000)
+
+        if appointments and appointments[0].pk is None:
+            return list(Appointment.objects.filter(client=client).values_list('id', flat=True))
+        return [appointment.pk for appointment in appointments]
+
+    def compare_tracking(self, appointment_ids, rows, repeat):
+        """
+        Time loading, and loading then checking every row for changes, with
+        the lazy and the eager dirty-field tracking.
+        """
+        for label, model in (('lazy', Appointment), ('eager', get_eager_tracking_model())):
+            queryset = AppointmentSerializer.setup_eager_loading(
+                model.objects.filter(id__in=appointment_ids).order_by('-start_time')
+            )
+            self.report(f'load-{label}', rows, self.measure(lambda: list(queryset.all()), repeat))
+            self.report(f'dirty-{label}', rows, self.measure(
+                lambda: [appointment.get_dirty_fields() for appointment in queryset.all()], repeat
+            ))
+
+    def render_values(self, queryset):
+        values_serializer = AppointmentValuesSerializer()
+        return values_serializer.render(values_serializer.values(queryset.all()))
+
+    def check_parity(self, queryset):
+        """
+        Check the values() fast path renders the same JSON as AppointmentSerializer.
+        """
+        expected = JSONRenderer().render(AppointmentSerializer(list(queryset.all()), many=True).data)
+        if JSONRenderer().render(self.render_values(queryset)) != expected:
+            raise CommandError('AppointmentValuesSerializer output differs from AppointmentSerializer')
+        self.stdout.write('parity       values output matches AppointmentSerializer')
+
+    def measure(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def report(self, label, rows, elapsed):
+        self.stdout.write(
+            f"{label:<12} {rows} rows in {elapsed * 1000:.1f} ms ({rows / elapsed:,.0f} rows/s)"
+        )
@@ -0,0 +1,78 @@
+import gzip
+
+from django.core.management.base import CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from backend.admin.views import ServiceAnalysisReportView, StaffPerformanceReportView
+from backend.common.models import Appointment, User
+from backend.utils.compression import BROTLI_QUALITY, GZIP_LEVEL, brotli
+from backend.utils.renderers import ORJSONRenderer
+
+from .benchmark_appointment_list import Command as AppointmentListBenchmark, Rollback
+
+class Command(AppointmentListBenchmark):
+    help = 'Measure JSON rendering and response compression of list and report payloads on throwaway rows'
+    compares_tracking = False
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+
+        try:
+            with transaction.atomic():
+                appointment_ids = self.create_rows(rows)
+                # Completed appointments feed the revenue figures of the reports
+                Appointment.objects.filter(id__in=appointment_ids[::2]).update(status='completed')
+
+                queryset = Appointment.objects.filter(id__in=appointment_ids).order_by('-start_time')
+                payloads = [
+                    ('appointments', self.render_values(queryset)),
+                    ('staff report', self.get_report(StaffPerformanceReportView)),
+                    ('services report', self.get_report(ServiceAnalysisReportView)),
+                ]
+
+                for label, data in payloads:
+                    self.compare(label, data, repeat)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def get_report(self, view):
+        admin = User.objects.filter(role='admin').first() or User.objects.create_user(
+            email='benchmark-admin@example.com', first_name='Bench', last_name='Admin', role='admin'
+        )
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=admin)
+        response = view.as_view()(request)
+        if response.status_code != 200:
+            raise CommandError(f'{view.__name__} returned {response.status_code}')
+        return response.data
+
+    def compare(self, label, data, repeat):
+        expected = JSONRenderer().render(data)
+        if ORJSONRenderer().render(data) != expected:
+            raise CommandError(f'ORJSONRenderer output differs from JSONRenderer for {label}')
+
+        self.stdout.write(f"{label} ({len(expected):,} bytes)")
+        self.report_time('json', self.measure(lambda: JSONRenderer().render(data), repeat))
+        self.report_time('orjson', self.measure(lambda: ORJSONRenderer().render(data), repeat))
+
+        gzipped = gzip.compress(expected, compresslevel=GZIP_LEVEL, mtime=0)
+        self.report_size('gzip', expected, gzipped, self.measure(
+            lambda: gzip.compress(expected, compresslevel=GZIP_LEVEL, mtime=0), repeat
+        ))
+        if brotli is not None:
+            self.report_size('br', expected, brotli.compress(expected, quality=BROTLI_QUALITY), self.measure(
+                lambda: brotli.compress(expected, quality=BROTLI_QUALITY), repeat
+            ))
+
+    def report_time(self, label, elapsed):
+        self.stdout.write(f"  {label:<8} {elapsed * 1000:.2f} ms")
+
+    def report_size(self, label, original, compressed, elapsed):
+        self.stdout.write(
+            f"  {label:<8} {elapsed * 1000:.2f} ms, {len(compressed):,} bytes "
+            f"({len(compressed) / len(original):.1%} of original)"
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from backend.common.sweep import SWEEP_GRACE_MINUTES, sweep_past_appointments
+
+class Command(BaseCommand):
+    help = 'Close past appointments still marked confirmed or pending'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=SWEEP_GRACE_MINUTES, help='Minutes after the end time before an appointment is swept')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the appointments that would be swept')
+
+    def handle(self, *args, **options):
+        counts = sweep_past_appointments(
+            grace_minutes=options['grace_minutes'],
+            dry_run=options['dry_run']
+        )
+
+        verb = 'Would sweep' if options['dry_run'] else 'Swept'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {sum(counts.values())} appointments: "
+            f"{counts['completed']} completed, {counts['no_show']} no-show"
+        ))
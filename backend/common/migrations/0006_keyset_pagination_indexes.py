@@ -0,0 +1,25 @@
+# Generated by Django 4.2.10 on 2026-10-19 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend_common', '0005_servicemedia'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['start_time', 'id'], name='appointment_start_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['date_joined', 'id'], name='user_joined_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'date_joined', 'id'], name='user_role_joined_page_idx'),
+        ),
+    ]
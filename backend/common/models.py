@@ -2,7 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from dirtyfields import DirtyFieldsMixin
+from backend.utils.tracking import LazyDirtyFieldsMixin
 
 class CustomUserManager(BaseUserManager):
     """
@@ -60,6 +60,7 @@ class User(AbstractUser):
     # Timestamps
     date_joined = models.DateTimeField('Date Joined', auto_now_add=True)
     last_login = models.DateTimeField('Last Login', null=True, blank=True)
+    updated_at = models.DateTimeField('Updated At', auto_now=True)
 
     objects = CustomUserManager()
 
@@ -69,6 +70,11 @@ class User(AbstractUser):
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Keyset pagination of the user and client lists
+            models.Index(fields=['date_joined', 'id'], name='user_joined_page_idx'),
+            models.Index(fields=['role', 'date_joined', 'id'], name='user_role_joined_page_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
@@ -131,7 +137,7 @@ class Service(models.Model):
     def __str__(self):
         return f"{self.name} (${self.price})"
 
-class Appointment(DirtyFieldsMixin, models.Model):
+class Appointment(LazyDirtyFieldsMixin, models.Model):
     """
     Appointments made by clients with staff.
     """
@@ -159,6 +165,10 @@ class Appointment(DirtyFieldsMixin, models.Model):
         verbose_name = 'Appointment'
         verbose_name_plural = 'Appointments'
         ordering = ['-start_time']
+        indexes = [
+            # Keyset pagination of the appointment list
+            models.Index(fields=['start_time', 'id'], name='appointment_start_page_idx'),
+        ]
 
     def __str__(self):
         return f"{self.client.get_full_name()} with {self.staff.get_full_name()} on {self.start_time.strftime('%Y-%m-%d %H:%M')}"
@@ -191,6 +201,7 @@ class BusinessHours(models.Model):
     is_open = models.BooleanField('Is Open', default=True)
     opening_time = models.TimeField('Opening Time', default='09:00')
     closing_time = models.TimeField('Closing Time', default='18:00')
+    updated_at = models.DateTimeField('Updated At', auto_now=True)
 
     class Meta:
         verbose_name = 'Business Hours'
@@ -207,6 +218,7 @@ class Holiday(models.Model):
     name = models.CharField('Name', max_length=100)
     date = models.DateField('Date')
     is_recurring = models.BooleanField('Is Recurring', default=False, help_text='Recurring annually')
+    updated_at = models.DateTimeField('Updated At', auto_now=True)
 
     class Meta:
         verbose_name = 'Holiday'
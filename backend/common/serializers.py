@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
+from backend.utils.eager_loading import EagerLoadingMixin
+from backend.utils.sparse_fields import SparseFieldsetsMixin
+from backend.utils.values_serializers import ValuesSerializer
 from .models import (
     Category, Service, Appointment, ServiceMedia,
     BusinessHours, Holiday, BusinessSettings, Schedule
@@ -8,7 +11,7 @@ from .models import (
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the User model
     """
@@ -73,7 +76,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the Category model
     """
@@ -82,7 +85,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'icon', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
-class ServiceMediaSerializer(serializers.ModelSerializer):
+class ServiceMediaSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the ServiceMedia model
     """
@@ -101,7 +104,7 @@ class ServiceMediaSerializer(serializers.ModelSerializer):
             return obj.file.url
         return None
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(SparseFieldsetsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the Service model
     """
@@ -109,6 +112,9 @@ class ServiceSerializer(serializers.ModelSerializer):
     media = ServiceMediaSerializer(many=True, read_only=True)
     primary_media = serializers.SerializerMethodField()
 
+    field_select_related = {'category_name': ('category',)}
+    field_prefetch_related = {'primary_media': ('media',)}
+
     class Meta:
         model = Service
         fields = [
@@ -122,16 +128,15 @@ class ServiceSerializer(serializers.ModelSerializer):
         return obj.category.name if obj.category else None
 
     def get_primary_media(self, obj):
-        primary = obj.media.filter(is_primary=True).first()
-        if primary:
-            return ServiceMediaSerializer(primary, context=self.context).data
-        # If no primary, return the first media item if any exist
-        first_media = obj.media.first()
-        if first_media:
-            return ServiceMediaSerializer(first_media, context=self.context).data
+        # Media are ordered primary first (see ServiceMedia.Meta.ordering), so
+        # the first item is the primary one or, failing that, the oldest.
+        # all() reuses the prefetched media instead of querying again.
+        media = obj.media.all()
+        if media:
+            return ServiceMediaSerializer(media[0], context=self.context).data
         return None
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(SparseFieldsetsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the Appointment model
     """
@@ -154,6 +159,57 @@ class AppointmentSerializer(serializers.ModelSerializer):
         appointment.save()
         return appointment
 
+class UserValuesSerializer(ValuesSerializer):
+    """
+    values() fast path for UserSerializer
+    """
+    serializer_class = UserSerializer
+    method_fields = {'full_name': ('first_name', 'last_name')}
+
+    def get_full_name(self, first_name, last_name):
+        return f"{first_name} {last_name}"
+
+class ServiceMediaValuesSerializer(ValuesSerializer):
+    """
+    values() fast path for ServiceMediaSerializer
+    """
+    serializer_class = ServiceMediaSerializer
+    method_fields = {'file_url': ('file',)}
+
+    def get_file_url(self, file):
+        if file:
+            url = ServiceMedia._meta.get_field('file').storage.url(file)
+            request = self.context.get('request')
+            if request is not None:
+                return request.build_absolute_uri(url)
+            return url
+        return None
+
+class ServiceValuesSerializer(ValuesSerializer):
+    """
+    values() fast path for ServiceSerializer
+    """
+    serializer_class = ServiceSerializer
+    nested = {'media': ServiceMediaValuesSerializer}
+    method_fields = {'category_name': ('category.name',), 'primary_media': ('media',)}
+
+    def get_category_name(self, category_name):
+        return category_name
+
+    def get_primary_media(self, media):
+        return dict(media[0]) if media else None
+
+class AppointmentValuesSerializer(ValuesSerializer):
+    """
+    values() fast path for AppointmentSerializer
+    """
+    serializer_class = AppointmentSerializer
+    nested = {
+        'client_details': UserValuesSerializer,
+        'staff_details': UserValuesSerializer,
+        'service_details': ServiceValuesSerializer,
+    }
+
 class BusinessHoursSerializer(serializers.ModelSerializer):
     """
     Serializer for the BusinessHours model
@@ -190,7 +246,7 @@ class BusinessSettingsSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
-class ScheduleSerializer(serializers.ModelSerializer):
+class ScheduleSerializer(SparseFieldsetsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the Schedule model
     """
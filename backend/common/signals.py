@@ -0,0 +1,42 @@
+from django.db.models.signals import post_save, pre_save, post_delete
+from django.dispatch import receiver
+
+from .catalogue import bump_catalogue_version
+from .models import User, Service, Category, ServiceMedia, BusinessSettings, BusinessHours, Holiday
+from .serializers import UserSerializer
+
+# Models whose rows make up the public catalogue, apart from staff users
+CATALOGUE_MODELS = (Service, Category, ServiceMedia, BusinessSettings, BusinessHours, Holiday)
+
+# User fields shown in the public staff list
+STAFF_LIST_FIELDS = set(UserSerializer.Meta.fields)
+
+# Catalogue signals to start a new catalogue version on every change.
+# Queryset update() and bulk_create() send no signals; callers using them
+# on these models call bump_catalogue_version() themselves.
+
+def catalogue_changed_handler(sender, **kwargs):
+    bump_catalogue_version()
+
+for model in CATALOGUE_MODELS:
+    post_save.connect(catalogue_changed_handler, sender=model, dispatch_uid=f'catalogue_{model.__name__}_saved')
+    post_delete.connect(catalogue_changed_handler, sender=model, dispatch_uid=f'catalogue_{model.__name__}_deleted')
+
+@receiver(pre_save, sender=User)
+def user_pre_save_handler(sender, instance, update_fields=None, **kwargs):
+    # A staff member given another role drops out of the staff list
+    if not instance._state.adding and instance.role != 'staff' and (update_fields is None or 'role' in update_fields):
+        instance._was_staff = User.objects.filter(pk=instance.pk, role='staff').exists()
+
+@receiver(post_save, sender=User)
+def user_saved_handler(sender, instance, update_fields=None, **kwargs):
+    # Such as password changes
+    if update_fields is not None and not STAFF_LIST_FIELDS.intersection(update_fields):
+        return
+    if instance.role == 'staff' or getattr(instance, '_was_staff', False):
+        bump_catalogue_version()
+
+@receiver(post_delete, sender=User)
+def user_deleted_handler(sender, instance, **kwargs):
+    if instance.role == 'staff':
+        bump_catalogue_version()
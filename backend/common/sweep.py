@@ -0,0 +1,111 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Appointment
+
+logger = logging.getLogger(__name__)
+
+# Minutes after an appointment ends before the sweep closes it
+SWEEP_GRACE_MINUTES = getattr(settings, 'APPOINTMENT_SWEEP_GRACE_MINUTES', 60)
+
+# Status a stale appointment is moved to, by its current status; each must
+# be allowed by transitions.APPOINTMENT_TRANSITIONS
+SWEEP_TRANSITIONS = {
+    'confirmed': 'completed',
+    'pending': 'no_show',
+}
+
+def get_sweep_cutoff(now=None, grace_minutes=None):
+    """
+    Get the end time before which open appointments count as stale.
+    """
+    grace_minutes = SWEEP_GRACE_MINUTES if grace_minutes is None else grace_minutes
+    return (now or timezone.now()) - timedelta(minutes=grace_minutes)
+
+def stale_appointments(cutoff):
+    """
+    Open appointments that ended before the cutoff.
+    """
+    return Appointment.objects.filter(status__in=list(SWEEP_TRANSITIONS), end_time__lt=cutoff)
+
+def close_stale_appointments(cutoff, now=None):
+    """
+    Move every stale appointment to its closed status in one statement.
+
+    Runs a single ``UPDATE ... RETURNING`` so no Appointment instances are
+    loaded or saved and no per-row post_save handlers fire.
+
+    Args:
+        cutoff: Appointments that ended before this time are closed
+        now: Time stored in updated_at (default: timezone.now())
+
+    Returns:
+        dict: Mapping of new status to the list of updated appointment IDs
+    """
+    now = now or timezone.now()
+    table = connection.ops.quote_name(Appointment._meta.db_table)
+
+    cases = ' '.join('WHEN %s THEN %s' for _ in SWEEP_TRANSITIONS)
+    placeholders = ', '.join('%s' for _ in SWEEP_TRANSITIONS)
+    params = [value for transition in SWEEP_TRANSITIONS.items() for value in transition]
+    params += [now, *SWEEP_TRANSITIONS, cutoff]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {table}
+            SET status = CASE status {cases} END, updated_at = %s
+            WHERE status IN ({placeholders}) AND end_time < %s
+            RETURNING id, status
+        """, params)
+        rows = cursor.fetchall()
+
+    updated = {status: [] for status in SWEEP_TRANSITIONS.values()}
+    for appointment_id, status in rows:
+        updated[status].append(appointment_id)
+    return updated
+
+def sweep_past_appointments(now=None, grace_minutes=None, dry_run=False):
+    """
+    Close appointments left confirmed or pending after they ended.
+
+    Confirmed appointments become completed and pending ones no_show. The
+    status change is a single statement, and the changes are handed to the
+    notification batch, which cancels reminders, creates in-app notifications
+    and updates unread counters in bulk after commit. No SMS are sent, since
+    the sweep is meant to run overnight.
+
+    Args:
+        now: Current time (default: timezone.now())
+        grace_minutes: Minutes after the end time before an appointment is
+            swept (default: APPOINTMENT_SWEEP_GRACE_MINUTES)
+        dry_run: Only count what would be swept
+
+    Returns:
+        dict: Number of appointments moved to each status
+    """
+    from backend.notification.batching import batch_appointment_changes
+
+    now = now or timezone.now()
+    cutoff = get_sweep_cutoff(now, grace_minutes)
+
+    if dry_run:
+        counts = {status: 0 for status in SWEEP_TRANSITIONS.values()}
+        for row in stale_appointments(cutoff).values('status').order_by():
+            counts[SWEEP_TRANSITIONS[row['status']]] += 1
+        return counts
+
+    sources = {target: source for source, target in SWEEP_TRANSITIONS.items()}
+
+    with transaction.atomic(), batch_appointment_changes(send_sms=False) as batch:
+        updated = close_stale_appointments(cutoff, now)
+        for status, appointment_ids in updated.items():
+            for appointment_id in appointment_ids:
+                batch.add(appointment_id, old_values={'status': sources[status]})
+
+    counts = {status: len(ids) for status, ids in updated.items()}
+    logger.info(f"Swept {sum(counts.values())} past appointments: {counts}")
+    return counts
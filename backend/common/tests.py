@@ -0,0 +1,926 @@
+from datetime import date, time, timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import gzip
+
+from django.core.cache import caches
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from barberian.common import catalogue
+from barberian.common.business_calendar import get_business_calendar
+from barberian.common.models import User, Category, Service, ServiceMedia, Appointment, BusinessHours, Holiday, Schedule
+from barberian.common.sweep import sweep_past_appointments
+from barberian.common.transitions import (
+    can_transition, validate_transition, transition_appointments, InvalidTransition
+)
+from barberian.common.serializers import (
+    AppointmentSerializer, ServiceSerializer, AppointmentValuesSerializer, ServiceValuesSerializer
+)
+from barberian.utils import email as email_utils
+from barberian.utils.circuit import CircuitBreaker, CircuitOpenError
+from barberian.utils.models import DeferredEmail
+from barberian.utils.compression import CompressionMiddleware, choose_encoding
+from barberian.utils.renderers import ORJSONRenderer
+from barberian.utils.sparse_fields import FieldSelection
+from barberian.admin import views as admin_views
+from barberian.notification.models import Notification
+from barberian.staff import views as staff_views
+from barberian.client import views as client_views
+
+
+class ShopTestCase(TestCase):
+    """
+    A small shop shared by the view and serializer tests: an admin, a staff
+    member and a client; every service has a category and two media items, one
+    of them primary, and the client has an appointment for each service.
+    """
+    APPOINTMENTS = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='admin@example.com', password='password', first_name='Ada', last_name='Admin', role='admin'
+        )
+        cls.staff = User.objects.create_user(
+            email='staff@example.com', password='password', first_name='Sam', last_name='Staff', role='staff'
+        )
+        cls.client_user = User.objects.create_user(
+            email='client@example.com', password='password', first_name='Cal', last_name='Client', role='client'
+        )
+        category = Category.objects.create(name='Hair')
+
+        now = timezone.now()
+        cls.appointments = []
+        cls.services = []
+        for i in range(cls.APPOINTMENTS):
+            service = Service.objects.create(
+                name=f'Service {i}', price=20, duration=30, category=category
+            )
+            ServiceMedia.objects.create(service=service, file=f'service_media/{i}b.jpg', file_type='image')
+            ServiceMedia.objects.create(service=service, file=f'service_media/{i}.jpg', file_type='image', is_primary=True)
+            cls.services.append(service)
+
+            # Half today, half later in the week, all upcoming
+            start_time = now + timedelta(minutes=5 + i) if i % 2 == 0 else now + timedelta(days=2, hours=i)
+            cls.appointments.append(Appointment.objects.create(
+                client=cls.client_user,
+                staff=cls.staff,
+                service=service,
+                start_time=start_time,
+                status='confirmed'
+            ))
+
+    def setUp(self):
+        caches[catalogue.CACHE_ALIAS].clear()
+        catalogue.clear_local_cache()
+
+    def get(self, view, user, params=None, **kwargs):
+        request = APIRequestFactory().get('/', params or {})
+        force_authenticate(request, user=user)
+        response = view.as_view()(request, **kwargs)
+        response.render()
+        self.assertEqual(response.status_code, 200)
+        return response
+
+class AppointmentEagerLoadingTests(ShopTestCase):
+    """
+    Query-count regression tests for the appointment endpoints.
+
+    Every endpoint should load appointments with their client, staff,
+    service and category in one query and the service media in a second,
+    however many appointments are listed.
+    """
+
+    def test_serializer_declares_related_lookups(self):
+        select, prefetch = AppointmentSerializer.get_eager_loading()
+        self.assertEqual(set(select), {'client', 'staff', 'service', 'service__category'})
+        self.assertEqual(set(prefetch), {'service__media'})
+
+    def test_admin_appointment_list(self):
+        with self.assertNumQueries(2):
+            response = self.get(admin_views.AppointmentListView, self.admin)
+        self.assertEqual(len(response.data['results']), self.APPOINTMENTS)
+
+    def test_admin_today_appointments(self):
+        today = Appointment.objects.filter(start_time__date=timezone.now().date()).count()
+        with self.assertNumQueries(2):
+            response = self.get(admin_views.TodayAppointmentsView, self.admin)
+        self.assertEqual(len(response.data), today)
+
+    def test_admin_appointment_detail(self):
+        with self.assertNumQueries(2):
+            self.get(admin_views.AppointmentDetailView, self.admin, pk=self.appointments[0].pk)
+
+    def test_staff_appointment_list(self):
+        with self.assertNumQueries(2):
+            response = self.get(staff_views.StaffAppointmentListView, self.staff)
+        self.assertEqual(len(response.data), self.APPOINTMENTS)
+
+    def test_staff_upcoming_appointments(self):
+        with self.assertNumQueries(2):
+            response = self.get(staff_views.StaffUpcomingAppointmentsView, self.staff)
+        self.assertEqual(len(response.data), self.APPOINTMENTS)
+
+    def test_staff_today_appointments(self):
+        today = Appointment.objects.filter(start_time__date=timezone.now().date()).count()
+        with self.assertNumQueries(2):
+            response = self.get(staff_views.StaffTodayAppointmentsView, self.staff)
+        self.assertEqual(len(response.data), today)
+
+    def test_staff_appointment_detail(self):
+        with self.assertNumQueries(2):
+            self.get(staff_views.StaffAppointmentDetailView, self.staff, pk=self.appointments[0].pk)
+
+    def test_client_appointment_list(self):
+        with self.assertNumQueries(2):
+            response = self.get(client_views.ClientAppointmentListView, self.client_user)
+        self.assertEqual(len(response.data), self.APPOINTMENTS)
+
+    def test_client_appointment_detail(self):
+        with self.assertNumQueries(2):
+            self.get(client_views.ClientAppointmentDetailView, self.client_user, pk=self.appointments[0].pk)
+
+
+class ServiceEagerLoadingTests(ShopTestCase):
+    """
+    Query-count regression tests for the service endpoints: services and
+    categories in one query, media in a second, primary media picked in memory.
+    """
+
+    def test_primary_media_comes_from_prefetched_media(self):
+        service = ServiceSerializer.setup_eager_loading(Service.objects.filter(pk=self.services[0].pk)).get()
+        with self.assertNumQueries(0):
+            data = ServiceSerializer(service).data
+        self.assertTrue(data['primary_media']['is_primary'])
+        self.assertEqual(data['primary_media']['id'], data['media'][0]['id'])
+
+    def test_admin_service_list(self):
+        with self.assertNumQueries(2):
+            response = self.get(admin_views.ServiceListView, self.admin)
+        self.assertEqual(len(response.data), self.APPOINTMENTS)
+
+    def test_staff_service_list(self):
+        with self.assertNumQueries(2):
+            response = self.get(staff_views.StaffServicesView, self.staff)
+        self.assertEqual(len(response.data), self.APPOINTMENTS)
+
+    def test_client_service_list(self):
+        with self.assertNumQueries(2):
+            response = self.get(client_views.ServiceListView, self.client_user)
+        self.assertEqual(len(response.data), self.APPOINTMENTS)
+
+    def test_client_service_detail(self):
+        with self.assertNumQueries(2):
+            self.get(client_views.ServiceDetailView, self.client_user, pk=self.services[0].pk)
+
+
+class KeysetPaginationTests(ShopTestCase):
+    """
+    Cursor pagination of the admin appointment list.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Appointments sharing a start time are ordered by id
+        start_time = timezone.now() + timedelta(days=7)
+        for _ in range(7):
+            cls.appointments.append(Appointment.objects.create(
+                client=cls.client_user,
+                staff=cls.staff,
+                service=cls.services[0],
+                start_time=start_time,
+                status='pending'
+            ))
+
+    def cursor(self, link):
+        return parse_qs(urlparse(link).query)['cursor'][0]
+
+    def test_pages_cover_ordering_at_constant_cost(self):
+        expected = list(Appointment.objects.order_by('-start_time', '-id').values_list('id', flat=True))
+        seen = []
+        params = {'page_size': 3}
+
+        while True:
+            with self.assertNumQueries(2):
+                response = self.get(admin_views.AppointmentListView, self.admin, params)
+            seen.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                break
+            params = {'page_size': 3, 'cursor': self.cursor(response.data['next'])}
+
+        self.assertEqual(seen, expected)
+
+        # Walking back from the last page returns the page before it
+        response = self.get(admin_views.AppointmentListView, self.admin, {
+            'page_size': 3, 'cursor': self.cursor(response.data['previous'])
+        })
+        last_page_start = len(expected) - (len(expected) % 3 or 3)
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            expected[last_page_start - 3:last_page_start]
+        )
+
+    def test_invalid_cursor(self):
+        request = APIRequestFactory().get('/', {'cursor': 'not-a-cursor'})
+        force_authenticate(request, user=self.admin)
+        response = admin_views.AppointmentListView.as_view()(request)
+        self.assertEqual(response.status_code, 404)
+
+
+class SparseFieldsetsTests(ShopTestCase):
+    """
+    ?fields= and ?expand= trim both the response and the related rows loaded.
+    """
+
+    def test_nested_relations_are_opt_in(self):
+        selection = FieldSelection.from_query_params({'fields': 'id,service_details.name'})
+        self.assertEqual(AppointmentSerializer.get_eager_loading(selection=selection), (['service'], []))
+
+    def test_plain_fields(self):
+        with self.assertNumQueries(1):
+            response = self.get(admin_views.AppointmentListView, self.admin, {'fields': 'id,start_time'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'start_time'})
+
+    def test_nested_fields(self):
+        with self.assertNumQueries(1):
+            response = self.get(staff_views.StaffAppointmentListView, self.staff, {
+                'fields': 'id,service_details.name,service_details.category_name'
+            })
+        self.assertEqual(response.data[0], {
+            'id': response.data[0]['id'],
+            'service_details': {'name': response.data[0]['service_details']['name'], 'category_name': 'Hair'},
+        })
+
+    def test_expand(self):
+        with self.assertNumQueries(2):
+            response = self.get(client_views.ClientAppointmentListView, self.client_user, {
+                'expand': 'service_details.media'
+            })
+        appointment = response.data[0]
+        self.assertIn('status', appointment)
+        self.assertNotIn('client_details', appointment)
+        self.assertIn('primary_media', appointment['service_details'])
+        self.assertEqual(len(appointment['service_details']['media']), 2)
+
+    def test_without_parameters(self):
+        with self.assertNumQueries(2):
+            response = self.get(client_views.ClientAppointmentListView, self.client_user)
+        self.assertIn('client_details', response.data[0])
+        self.assertIn('primary_media', response.data[0]['service_details'])
+
+
+class ValuesSerializerTests(ShopTestCase):
+    """
+    The values() fast path renders byte-for-byte what the ModelSerializers do.
+    """
+
+    def assertSameOutput(self, serializer_class, values_serializer_class, queryset, queries):
+        context = {'request': Request(APIRequestFactory().get('/'))}
+        expected = serializer_class(queryset, many=True, context=context).data
+
+        values_serializer = values_serializer_class(context=context)
+        with self.assertNumQueries(queries):
+            data = values_serializer.render(values_serializer.values(queryset))
+
+        self.assertEqual(JSONRenderer().render(data), JSONRenderer().render(expected))
+
+    def test_appointments(self):
+        self.assertSameOutput(
+            AppointmentSerializer, AppointmentValuesSerializer, Appointment.objects.order_by('start_time'), 2
+        )
+
+    def test_services(self):
+        # Including one without media or description
+        Service.objects.create(name='Beard trim', price='12.50', duration=15, category=self.services[0].category)
+        self.assertSameOutput(ServiceSerializer, ServiceValuesSerializer, Service.objects.order_by('id'), 2)
+
+    def test_list_view_pages_rows(self):
+        with self.assertNumQueries(2):
+            response = self.get(admin_views.AppointmentListView, self.admin, {'page_size': 3})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+
+
+class CatalogueCacheTests(ShopTestCase):
+    """
+    Public catalogue endpoints are served from the catalogue cache until a write.
+    """
+
+    def revalidate(self, view, response):
+        request = APIRequestFactory().get(
+            '/', HTTP_IF_NONE_MATCH=response['ETag'], HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        return view.as_view()(request)
+
+    def test_unchanged_catalogue(self):
+        response = self.get(client_views.ServiceListView, None)
+        with self.assertNumQueries(0):
+            revalidated = self.revalidate(client_views.ServiceListView, response)
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_changed_catalogue(self):
+        response = self.get(client_views.ServiceListView, None)
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceMedia.objects.filter(service=self.services[0], is_primary=False).first().delete()
+        revalidated = self.revalidate(client_views.ServiceListView, response)
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertNotEqual(revalidated['ETag'], response['ETag'])
+
+    def test_staff_list(self):
+        response = self.get(client_views.StaffListView, None)
+        self.assertEqual(self.revalidate(client_views.StaffListView, response).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            # The password is not part of the staff list
+            self.staff.set_password('new-password')
+            self.staff.save(update_fields=['password'])
+        self.assertEqual(self.revalidate(client_views.StaffListView, response).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.bio = 'Fades and beard trims'
+            self.staff.save()
+        self.assertEqual(self.revalidate(client_views.StaffListView, response).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.role = 'client'
+            self.staff.save()
+        self.assertEqual(self.get(client_views.StaffListView, None).data, [])
+
+    def test_cached_payload(self):
+        response = self.get(client_views.ServiceListView, None)
+        with self.assertNumQueries(0):
+            cached = self.get(client_views.ServiceListView, None)
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+        # Filters are cached separately
+        filtered = self.get(client_views.ServiceListView, None, {'category': 0})
+        self.assertEqual(filtered.data, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.services[0].name = 'Skin fade'
+            self.services[0].save()
+        names = [service['name'] for service in self.get(client_views.ServiceListView, None).data]
+        self.assertIn('Skin fade', names)
+
+    def test_cache_key(self):
+        view = client_views.ServiceListView()
+
+        def key(params=None, host='testserver'):
+            request = view.initialize_request(APIRequestFactory().get('/', params or {}, HTTP_HOST=host))
+            return view.get_catalogue_key(request)
+
+        # Unrecognised parameters and the host's case or default port do not matter
+        self.assertEqual(key({'utm_source': 'mail', 'page': 2}), key())
+        self.assertEqual(key(host='TestServer:80'), key())
+        self.assertNotEqual(key(host='example.com'), key())
+        self.assertNotEqual(key({'category': self.services[0].category_id}), key())
+        self.assertNotEqual(key({'fields': 'id,name'}), key())
+
+    def test_local_cache_capped(self):
+        version = catalogue.get_catalogue_version()
+        with mock.patch.object(catalogue, 'LOCAL_MAX_ENTRIES', 2):
+            for key in ('a', 'b'):
+                catalogue.store_payload(version, key, key)
+            # Reading 'a' makes 'b' the least recently used
+            self.assertEqual(catalogue.get_cached_payload('a'), (version, 'a'))
+            catalogue.store_payload(version, 'c', 'c')
+
+        self.assertEqual(list(catalogue._local['payloads']), [f'catalogue:{version}:a', f'catalogue:{version}:c'])
+
+
+class BusinessCalendarTests(ShopTestCase):
+    """
+    The business calendar is built once per catalogue version.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for day in range(6):
+            BusinessHours.objects.create(day_of_week=day, is_open=day < 5, opening_time='09:00', closing_time='17:00')
+        Holiday.objects.create(name='Christmas', date=date(2020, 12, 25), is_recurring=True)
+        Holiday.objects.create(name='Refit', date=date(2031, 3, 4))
+
+    def test_calendar(self):
+        with self.assertNumQueries(3):
+            calendar = get_business_calendar()
+        with self.assertNumQueries(0):
+            self.assertIs(get_business_calendar(), calendar)
+
+        self.assertEqual(calendar.open_intervals(date(2031, 3, 3)), [(time(9), time(17))])
+        self.assertFalse(calendar.is_open(date(2031, 3, 4)))  # Holiday
+        self.assertFalse(calendar.is_open(date(2031, 3, 8)))  # Closed on Saturday
+        self.assertFalse(calendar.is_open(date(2031, 3, 9)))  # Sunday is not configured
+        self.assertEqual(calendar.get_holiday(date(2030, 12, 25)), 'Christmas')
+
+        self.assertEqual(calendar.upcoming_holidays(date(2031, 3, 5)), [
+            {'name': 'Christmas', 'date': date(2031, 12, 25), 'is_recurring': True},
+        ])
+        self.assertEqual([holiday['date'] for holiday in calendar.upcoming_holidays(date(2030, 6, 1))],
+                         [date(2030, 12, 25), date(2031, 3, 4)])
+
+    def test_rebuilt_after_change(self):
+        calendar = get_business_calendar()
+        with self.captureOnCommitCallbacks(execute=True):
+            BusinessHours.objects.filter(day_of_week=5).first().delete()
+        self.assertIsNot(get_business_calendar(), calendar)
+        self.assertIsNone(get_business_calendar().get_day_hours(5))
+
+    def test_business_info(self):
+        response = self.get(client_views.BusinessInfoView, None)
+        self.assertEqual(len(response.data['hours']), 7)
+        self.assertEqual(response.data['hours'][0]['opening_time'], '09:00')
+        self.assertFalse(response.data['hours'][6]['is_open'])
+        self.assertEqual(response.data['business'], {})
+
+    def test_staff_availability(self):
+        response = self.get(client_views.StaffAvailabilityView, None, {'date': '2031-03-03'}, pk=self.staff.pk)
+        self.assertEqual(len(response.data['slots']), 16)
+        response = self.get(client_views.StaffAvailabilityView, None, {'date': '2031-03-04'}, pk=self.staff.pk)
+        self.assertFalse(response.data['available'])
+
+
+class BulkWriteTests(ShopTestCase):
+    """
+    Admin bulk endpoints write a batch only when every item is valid.
+    """
+
+    def post(self, view, data):
+        request = APIRequestFactory().post('/', data, format='json')
+        force_authenticate(request, user=self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            return view.as_view()(request)
+
+    def test_services(self):
+        self.get(client_views.ServiceListView, None)
+        category = self.services[0].category_id
+        response = self.post(admin_views.ServiceBulkView, {
+            'create': [
+                {'name': 'Beard trim', 'price': '15.00', 'duration': 15, 'category': category},
+                {'name': 'Hot towel shave', 'price': '25.00', 'duration': 30, 'category': category},
+            ],
+            'update': [{'id': self.services[0].pk, 'price': '22.50'}],
+            'delete': [self.services[1].pk],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['created']), 2)
+        self.assertEqual(response.data['deleted'], [self.services[1].pk])
+        self.services[0].refresh_from_db()
+        self.assertEqual(str(self.services[0].price), '22.50')
+        self.assertGreater(self.services[0].updated_at, self.services[0].created_at)
+
+        # Bulk writes start a new catalogue version
+        names = {service['name'] for service in self.get(client_views.ServiceListView, None).data}
+        self.assertIn('Beard trim', names)
+        self.assertNotIn(self.services[1].name, names)
+
+    def test_invalid_batch(self):
+        response = self.post(admin_views.CategoryBulkView, {
+            'create': [{'name': 'Beard'}, {'description': 'No name'}],
+            'delete': [self.services[0].category_id, 0],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors']['create'][0], {})
+        self.assertIn('name', response.data['errors']['create'][1])
+        self.assertEqual(response.data['errors']['delete'], [{}, {'id': ['Not found.']}])
+        self.assertFalse(Category.objects.filter(name='Beard').exists())
+        self.assertTrue(Category.objects.filter(pk=self.services[0].category_id).exists())
+
+    def test_schedule_overlaps(self):
+        Schedule.objects.create(staff=self.staff, date='2031-03-03', start_time='09:00', end_time='12:00')
+        response = self.post(admin_views.ScheduleBulkView, {'create': [
+            {'staff': self.staff.pk, 'date': '2031-03-03', 'start_time': '13:00', 'end_time': '17:00'},
+            {'staff': self.staff.pk, 'date': '2031-03-03', 'start_time': '11:00', 'end_time': '13:00'},
+            {'staff': self.staff.pk, 'date': '2031-03-04', 'start_time': '09:00', 'end_time': '17:00'},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([bool(errors) for errors in response.data['errors']['create']], [False, True, False])
+
+        response = self.post(admin_views.ScheduleBulkView, {'create': [
+            {'staff': self.staff.pk, 'date': '2031-03-03', 'start_time': '13:00', 'end_time': '17:00'},
+            {'staff': self.staff.pk, 'date': '2031-03-04', 'start_time': '09:00', 'end_time': '17:00'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Schedule.objects.filter(staff=self.staff).count(), 3)
+
+    def test_appointments(self):
+        start_time = timezone.now() + timedelta(days=10)
+        response = self.post(admin_views.AppointmentBulkView, {
+            'create': [{
+                'client': self.client_user.pk, 'staff': self.staff.pk, 'service': self.services[0].pk,
+                'start_time': start_time.isoformat(), 'status': 'confirmed'
+            }],
+            'update': [{'id': self.appointments[0].pk, 'status': 'pending'}],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.data['errors']['update'][0])
+
+        response = self.post(admin_views.AppointmentBulkView, {
+            'create': [{
+                'client': self.client_user.pk, 'staff': self.staff.pk, 'service': self.services[0].pk,
+                'start_time': start_time.isoformat(), 'status': 'confirmed'
+            }],
+            'update': [{'id': self.appointments[0].pk, 'status': 'cancelled'}],
+        })
+        self.assertEqual(response.status_code, 200)
+        created = Appointment.objects.get(pk=response.data['created'][0]['id'])
+        self.assertEqual(created.end_time - created.start_time, timedelta(minutes=self.services[0].duration))
+        self.assertEqual(Appointment.objects.get(pk=self.appointments[0].pk).status, 'cancelled')
+
+    def test_status_changed_concurrently(self):
+        appointment = self.appointments[1]
+
+        def cancel_concurrently(*args):
+            # Runs after the rows were read, before the write transaction
+            Appointment.objects.filter(pk=appointment.pk).update(status='cancelled')
+
+        with mock.patch.object(admin_views.AppointmentBulkView, 'validate_batch', side_effect=cancel_concurrently):
+            response = self.post(admin_views.AppointmentBulkView, {
+                'update': [{'id': appointment.pk, 'status': 'completed'}],
+            })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['errors']['update'][0],
+            {'status': ["Cannot change an appointment from 'cancelled' to 'completed'"]}
+        )
+        self.assertEqual(Appointment.objects.get(pk=appointment.pk).status, 'cancelled')
+
+    def test_body_must_be_an_object(self):
+        response = self.post(admin_views.CategoryBulkView, [{'name': 'Beard'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
+
+
+class TransitionTests(ShopTestCase):
+    """
+    Appointment status changes follow the transition table, in bulk and through the views.
+    """
+
+    def post(self, view, user, data=None, **kwargs):
+        request = APIRequestFactory().post('/', data or {}, format='json')
+        force_authenticate(request, user=user)
+        return view.as_view()(request, **kwargs)
+
+    def test_table(self):
+        self.assertTrue(can_transition('pending', 'confirmed'))
+        self.assertTrue(can_transition('confirmed', 'no_show'))
+        self.assertFalse(can_transition('confirmed', 'pending'))
+        self.assertFalse(can_transition('cancelled', 'confirmed'))
+        with self.assertRaises(InvalidTransition):
+            validate_transition('completed', 'cancelled')
+        with self.assertRaises(InvalidTransition):
+            validate_transition('pending', 'bogus')
+
+    def test_bulk_transition_skips_blocked_rows(self):
+        allowed, blocked = self.appointments[:2]
+        Appointment.objects.filter(pk=blocked.pk).update(status='completed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            changed = transition_appointments([allowed.pk, blocked.pk], 'cancelled')
+
+        self.assertEqual(changed, {allowed.pk: 'confirmed'})
+        statuses = dict(Appointment.objects.filter(pk__in=[allowed.pk, blocked.pk]).values_list('pk', 'status'))
+        self.assertEqual(statuses, {allowed.pk: 'cancelled', blocked.pk: 'completed'})
+
+    def test_staff_status_update(self):
+        appointment = self.appointments[1]
+        view = staff_views.AppointmentStatusUpdateView
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(view, self.staff, {'status': 'completed'}, pk=appointment.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['appointment']['status'], 'completed')
+
+        for status in ('confirmed', 'bogus'):
+            with self.subTest(status=status):
+                response = self.post(view, self.staff, {'status': status}, pk=appointment.pk)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+    def test_cancel_twice(self):
+        appointment = self.appointments[1]
+        for view, user in ((client_views.ClientAppointmentCancelView, self.client_user),
+                           (admin_views.AppointmentCancelView, self.admin)):
+            with self.subTest(view=view.__name__):
+                Appointment.objects.filter(pk=appointment.pk).update(status='confirmed')
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.assertEqual(self.post(view, user, pk=appointment.pk).status_code, 200)
+                response = self.post(view, user, pk=appointment.pk)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("'cancelled'", response.data['error'])
+
+
+class SweepTests(ShopTestCase):
+    """
+    The sweep closes appointments left open after they ended.
+    """
+
+    def book(self, status, hours_ago):
+        return Appointment.objects.create(
+            client=self.client_user,
+            staff=self.staff,
+            service=self.services[0],
+            start_time=timezone.now() - timedelta(hours=hours_ago),
+            status=status
+        )
+
+    def test_status_mapping(self):
+        confirmed = self.book('confirmed', 5)
+        pending = self.book('pending', 5)
+        cancelled = self.book('cancelled', 5)
+        # Ended within the grace period
+        recent = self.book('confirmed', 1)
+
+        self.assertEqual(sweep_past_appointments(dry_run=True), {'completed': 1, 'no_show': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(sweep_past_appointments(), {'completed': 1, 'no_show': 1})
+
+        statuses = dict(Appointment.objects.filter(
+            pk__in=[confirmed.pk, pending.pk, cancelled.pk, recent.pk]
+        ).values_list('pk', 'status'))
+        self.assertEqual(statuses, {
+            confirmed.pk: 'completed', pending.pk: 'no_show', cancelled.pk: 'cancelled', recent.pk: 'confirmed'
+        })
+        self.assertTrue(Notification.objects.filter(
+            recipient=self.client_user, notification_type='appointment_completed', reference_id=str(confirmed.pk)
+        ).exists())
+
+        self.assertEqual(sweep_past_appointments(), {'completed': 0, 'no_show': 0})
+
+
+class DirtyFieldsTests(ShopTestCase):
+    """
+    Appointments report the fields changed since they were loaded or saved.
+    """
+
+    def load(self, queryset=None):
+        return (queryset or Appointment.objects).get(pk=self.appointments[0].pk)
+
+    def test_after_load(self):
+        appointment = self.load()
+        self.assertEqual(appointment.get_dirty_fields(), {})
+
+        appointment.status = 'cancelled'
+        appointment.staff = self.admin
+        self.assertEqual(appointment.get_dirty_fields(), {'status': 'confirmed'})
+        self.assertEqual(appointment.get_dirty_fields(check_relationship=True), {'status': 'confirmed', 'staff': self.staff.pk})
+
+        appointment.status = 'confirmed'
+        self.assertFalse(appointment.is_dirty())
+
+    def test_after_save(self):
+        appointment = self.load()
+        appointment.status = 'cancelled'
+        appointment.save()
+        self.assertEqual(appointment.get_dirty_fields(), {})
+
+    def test_after_save_with_update_fields(self):
+        appointment = self.load()
+        appointment.status = 'cancelled'
+        appointment.notes = 'Running late'
+        appointment.save(update_fields=['status'])
+        # Only the saved field is clean
+        self.assertEqual(appointment.get_dirty_fields(), {'notes': ''})
+
+    def test_after_refresh_from_db(self):
+        appointment = self.load()
+        appointment.status = 'cancelled'
+        appointment.notes = 'Running late'
+        Appointment.objects.filter(pk=appointment.pk).update(status='completed')
+
+        appointment.refresh_from_db(fields=['status'])
+        self.assertEqual(appointment.status, 'completed')
+        self.assertEqual(appointment.get_dirty_fields(), {'notes': ''})
+
+    def test_after_expression(self):
+        appointment = self.load()
+        appointment.notes = Concat(F('notes'), Value('!'))
+        # The result is unknown until the row is read back
+        self.assertEqual(appointment.get_dirty_fields(), {})
+
+        appointment.save()
+        appointment.refresh_from_db(fields=['notes'])
+        self.assertEqual(appointment.notes, '!')
+        self.assertEqual(appointment.get_dirty_fields(), {})
+        appointment.notes = ''
+        self.assertEqual(appointment.get_dirty_fields(), {'notes': '!'})
+
+    def test_deferred_fields(self):
+        appointment = self.load(Appointment.objects.only('id', 'status'))
+        self.assertEqual(appointment.notes, '')
+        self.assertEqual(appointment.get_dirty_fields(), {})
+
+        appointment.status = 'cancelled'
+        self.assertEqual(appointment.get_dirty_fields(), {'status': 'confirmed'})
+
+
+class RenderingTests(ShopTestCase):
+    """
+    orjson rendering matches JSONRenderer.
+    """
+
+    def test_orjson_renderer_output(self):
+        data = {
+            'appointments': AppointmentSerializer(Appointment.objects.all(), many=True).data,
+            'revenue': Service.objects.first().price,
+            'generated_at': timezone.now(),
+            'date': timezone.now().date(),
+            'distribution': {1: 'Monday'},
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class CompressionTests(SimpleTestCase):
+    """
+    Large responses are compressed as negotiated.
+    """
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(choose_encoding('gzip;q=0, identity'), None)
+        self.assertIsNone(choose_encoding(''))
+
+    def test_compression(self):
+        body = b'{"results": [%s]}' % b','.join([b'"appointment"'] * 500)
+        middleware = CompressionMiddleware(lambda request: HttpResponse(body))
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), body)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        small = CompressionMiddleware(lambda request: HttpResponse(b'{}'))(request)
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+        stream = CompressionMiddleware(lambda request: StreamingHttpResponse(iter([body])))(request)
+        self.assertFalse(stream.has_header('Content-Encoding'))
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    """
+    The breaker opens after repeated failures and lets one probe through to recover.
+    """
+
+    def setUp(self):
+        self.now = 0.0
+        self.breaker = CircuitBreaker('test', failure_threshold=2, recovery_timeout=30, clock=lambda: self.now)
+
+    def fail(self, error=None):
+        def func():
+            raise error or ConnectionError('timed out')
+        with self.assertRaises(Exception):
+            self.breaker.call(func, is_failure=lambda e: isinstance(e, ConnectionError))
+
+    def test_closed(self):
+        self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
+        self.fail()
+        # A rejected request is not the provider's fault
+        self.fail(ValueError('invalid number'))
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_open(self):
+        self.fail()
+        self.fail()
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError) as context:
+            self.breaker.call(lambda: 'ok')
+        self.assertEqual(context.exception.retry_after, 30)
+
+        self.now = 10
+        self.assertEqual(self.breaker.retry_after(), 20)
+
+    def test_half_open_allows_one_probe(self):
+        self.fail()
+        self.fail()
+        self.now = 30
+        self.assertEqual(self.breaker.state, 'half_open')
+        self.assertEqual(self.breaker.retry_after(), 0)
+
+        self.assertTrue(self.breaker.allow_request())
+        # Concurrent senders are turned away while the probe is in flight
+        self.assertFalse(self.breaker.allow_request())
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(lambda: 'ok')
+
+    def test_probe_success_closes(self):
+        self.fail()
+        self.fail()
+        self.now = 30
+        self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_probe_failure_reopens(self):
+        self.fail()
+        self.fail()
+        self.now = 30
+        self.fail()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertEqual(self.breaker.retry_after(), 30)
+
+
+@mock.patch.object(email_utils, 'SENDGRID_API_KEY', 'key')
+@mock.patch.object(email_utils, 'SENDGRID_MAX_PERSONALIZATIONS', 2)
+class BulkEmailTests(SimpleTestCase):
+    """
+    Bulk emails are split into API calls of personalizations, one per recipient.
+    """
+
+    def setUp(self):
+        email_utils.sendgrid_breaker.reset()
+        self.addCleanup(email_utils.sendgrid_breaker.reset)
+        client = mock.patch.object(email_utils, 'get_sendgrid_client')
+        self.send = client.start().return_value.send
+        self.send.return_value = mock.Mock(status_code=202)
+        self.addCleanup(client.stop)
+
+    def test_chunked(self):
+        recipients = [f'client{number}@example.com' for number in range(5)]
+        self.assertEqual(
+            email_utils.send_bulk_email(recipients, 'shop@example.com', 'Hello', text_content='Hello'), 5
+        )
+
+        self.assertEqual(self.send.call_count, 3)
+        personalizations = [call.args[0].get()['personalizations'] for call in self.send.call_args_list]
+        self.assertEqual([len(chunk) for chunk in personalizations], [2, 2, 1])
+        # Recipients do not see each other
+        self.assertCountEqual(
+            [[to['email'] for to in personalization['to']] for chunk in personalizations for personalization in chunk],
+            [[recipient] for recipient in recipients]
+        )
+
+    def test_failed_chunk_not_counted(self):
+        self.send.side_effect = [mock.Mock(status_code=202), mock.Mock(status_code=400, body=b'bad')]
+        recipients = ['a@example.com', 'b@example.com', 'c@example.com']
+        self.assertEqual(
+            email_utils.send_bulk_email(recipients, 'shop@example.com', 'Hello', text_content='Hello'), 2
+        )
+
+
+@mock.patch.object(email_utils, 'SENDGRID_API_KEY', 'key')
+class DeferredEmailTests(TestCase):
+    """
+    Emails held back by the open SendGrid circuit are stored and sent later.
+    """
+
+    def setUp(self):
+        email_utils.sendgrid_breaker.reset()
+        self.addCleanup(email_utils.sendgrid_breaker.reset)
+        client = mock.patch.object(email_utils, 'get_sendgrid_client')
+        self.send = client.start().return_value.send
+        self.send.return_value = mock.Mock(status_code=202)
+        self.addCleanup(client.stop)
+
+    def open_circuit(self):
+        for _ in range(email_utils.sendgrid_breaker.failure_threshold):
+            email_utils.sendgrid_breaker.record_failure()
+
+    def send_email(self, recipients):
+        return email_utils.send_bulk_email(recipients, 'shop@example.com', 'Hello', text_content='Hello')
+
+    def test_deferred_while_open(self):
+        self.open_circuit()
+        self.assertEqual(self.send_email(['a@example.com', 'b@example.com']), 0)
+        self.send.assert_not_called()
+
+        deferred = DeferredEmail.objects.get()
+        self.assertEqual(deferred.to_emails, ['a@example.com', 'b@example.com'])
+        self.assertGreater(deferred.next_attempt_at, timezone.now())
+
+    def test_sent_once_closed(self):
+        self.open_circuit()
+        self.send_email(['a@example.com'])
+        DeferredEmail.objects.update(next_attempt_at=timezone.now())
+
+        # Still open: nothing is claimed
+        self.assertEqual(email_utils.send_deferred_emails(), {'sent': 0, 'deferred': 0, 'recipients': 0})
+        self.assertTrue(DeferredEmail.objects.exists())
+
+        email_utils.sendgrid_breaker.reset()
+        self.assertEqual(email_utils.send_deferred_emails(), {'sent': 1, 'deferred': 0, 'recipients': 1})
+        self.assertFalse(DeferredEmail.objects.exists())
+        self.send.assert_called_once()
+
+    def test_held_back_again(self):
+        self.open_circuit()
+        self.send_email(['a@example.com'])
+        DeferredEmail.objects.update(next_attempt_at=timezone.now())
+
+        # The circuit went half-open and another sender holds the probe
+        email_utils.sendgrid_breaker.reset()
+        with mock.patch.object(email_utils.sendgrid_breaker, 'allow_request', return_value=False):
+            results = email_utils.send_deferred_emails()
+
+        self.assertEqual(results, {'sent': 0, 'deferred': 1, 'recipients': 0})
+        self.assertGreater(DeferredEmail.objects.get().next_attempt_at, timezone.now())
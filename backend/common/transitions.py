@@ -0,0 +1,135 @@
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Appointment
+
+logger = logging.getLogger(__name__)
+
+# Allowed status changes, by current status. Cancelled, completed and
+# no_show appointments are closed and cannot change status again.
+APPOINTMENT_TRANSITIONS = {
+    'pending': {'confirmed', 'cancelled', 'completed', 'no_show'},
+    'confirmed': {'cancelled', 'completed', 'no_show'},
+    'cancelled': set(),
+    'completed': set(),
+    'no_show': set(),
+}
+
+APPOINTMENT_STATUSES = [choice[0] for choice in Appointment.STATUS_CHOICES]
+
+class InvalidTransition(Exception):
+    """
+    Raised when an appointment cannot move to the requested status.
+    """
+
+def can_transition(from_status, to_status):
+    """
+    Check whether an appointment may move from one status to another.
+    """
+    return to_status in APPOINTMENT_TRANSITIONS.get(from_status, ())
+
+def get_source_statuses(to_status):
+    """
+    Get the statuses an appointment can move to the given status from.
+
+    Raises:
+        InvalidTransition: If the status is not a valid appointment status
+    """
+    if to_status not in APPOINTMENT_TRANSITIONS:
+        raise InvalidTransition(
+            f"Invalid status. Must be one of: {', '.join(APPOINTMENT_STATUSES)}"
+        )
+    return [status for status, targets in APPOINTMENT_TRANSITIONS.items() if to_status in targets]
+
+def validate_transition(from_status, to_status):
+    """
+    Raise InvalidTransition unless the status change is allowed.
+    """
+    get_source_statuses(to_status)
+    if not can_transition(from_status, to_status):
+        raise InvalidTransition(f"Cannot change an appointment from '{from_status}' to '{to_status}'")
+
+def transition_appointments(appointment_ids, to_status, queryset=None, notify=True, send_sms=False):
+    """
+    Move many appointments to a status in one guarded UPDATE.
+
+    The rows are locked and their current status read, then updated in a
+    single statement whose WHERE clause only matches statuses the target can
+    be reached from, so a concurrent change can never be overwritten with an
+    invalid transition. The changes are handed to the notification batch,
+    which processes them once after commit.
+
+    Args:
+        appointment_ids: IDs of the appointments to change
+        to_status: Status to move them to
+        queryset: Optional Appointment queryset restricting which rows may
+            change (e.g. a staff member's own appointments)
+        notify: Whether to create in-app notifications for the changes
+        send_sms: Whether to text clients about the changes
+
+    Returns:
+        dict: Mapping of changed appointment ID to its previous status;
+            appointments that were missing or could not make the
+            transition are left out
+
+    Raises:
+        InvalidTransition: If to_status is not a valid appointment status
+    """
+    from backend.notification.batching import batch_appointment_changes
+
+    sources = get_source_statuses(to_status)
+    queryset = Appointment.objects.all() if queryset is None else queryset
+    now = timezone.now()
+
+    with transaction.atomic(), batch_appointment_changes(notify=notify, send_sms=send_sms) as batch:
+        changed = dict(
+            queryset.select_for_update().filter(
+                id__in=list(appointment_ids),
+                status__in=sources
+            ).order_by().values_list('id', 'status')
+        )
+
+        if changed:
+            Appointment.objects.filter(id__in=changed, status__in=sources).update(
+                status=to_status,
+                updated_at=now
+            )
+
+        for appointment_id, old_status in changed.items():
+            batch.add(appointment_id, old_values={'status': old_status})
+
+    if changed:
+        logger.info(f"Moved {len(changed)} appointments to '{to_status}'")
+    return changed
+
+def transition_appointment(appointment, to_status, send_sms=True):
+    """
+    Move one appointment to a status, validating the transition.
+
+    Notifications are processed through the same batch as bulk transitions,
+    and the instance is refreshed from the database afterwards.
+
+    Args:
+        appointment: The appointment to change
+        to_status: Status to move it to
+        send_sms: Whether to text the client about the change
+
+    Returns:
+        Appointment: The refreshed appointment
+
+    Raises:
+        InvalidTransition: If the transition is not allowed, including when
+            the appointment changed status concurrently
+    """
+    validate_transition(appointment.status, to_status)
+
+    if not transition_appointments([appointment.pk], to_status, send_sms=send_sms):
+        appointment.refresh_from_db(fields=['status'])
+        raise InvalidTransition(
+            f"Cannot change an appointment from '{appointment.status}' to '{to_status}'"
+        )
+
+    appointment.refresh_from_db()
+    return appointment
@@ -3,17 +3,21 @@ from rest_framework.response import Response
 from .models import Service, Category, BusinessSettings, BusinessHours
 from .serializers import (
     ServiceSerializer, CategorySerializer, 
-    BusinessSettingsSerializer, BusinessHoursSerializer
+    BusinessSettingsSerializer, BusinessHoursSerializer,
+    ServiceValuesSerializer
 )
+from barberian.utils.eager_loading import EagerLoadingViewMixin
 from barberian.utils.permissions import IsAdminOrReadOnly
+from barberian.utils.values_serializers import ValuesListMixin
 
 
-class ServiceListView(generics.ListAPIView):
+class ServiceListView(ValuesListMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint that allows services to be viewed.
     """
     queryset = Service.objects.filter(active=True)
     serializer_class = ServiceSerializer
+    values_serializer_class = ServiceValuesSerializer
     permission_classes = [permissions.AllowAny]
     
     def get_queryset(self):
@@ -38,7 +42,7 @@ class ServiceListView(generics.ListAPIView):
         return queryset
 
 
-class ServiceDetailView(generics.RetrieveAPIView):
+class ServiceDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """
     API endpoint that allows a service to be viewed.
     """
@@ -0,0 +1,233 @@
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.utils import timezone
+
+from backend.common.models import Appointment
+from .models import ScheduledReminder
+from .bulk import create_bulk_appointment_notifications, publish_appointment_changes
+from .reminders import REMINDABLE_STATUSES, schedule_appointment_reminder
+from .messages import MessageContext
+from .utils import send_sms_notification
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+def get_active_batch():
+    """
+    Get the appointment batch open in this thread, if any.
+    """
+    return getattr(_local, 'batch', None)
+
+def classify_appointment_change(appointment, created, old_values):
+    """
+    Work out which message an appointment change should produce.
+
+    Mirrors the per-row choice made in signals.create_appointment_updated_notifications,
+    but compares against the values from before the first save in the batch,
+    and uses the dedicated no-show message for no_show.
+
+    Args:
+        appointment: The appointment as it is now
+        created: Whether the appointment was created in the batch
+        old_values: Mapping of changed field to its value before the batch
+
+    Returns:
+        tuple: (event, notification_type, audiences, status_change), where
+            status_change is (old_status, new_status) for generic status updates
+    """
+    if created:
+        return 'appointment_created', 'appointment_created', ('client', 'staff'), None
+
+    old_status = old_values.get('status', appointment.status)
+    if old_status != appointment.status:
+        new_status = appointment.status
+        if new_status == 'confirmed':
+            return 'appointment_confirmed', 'appointment_updated', ('client',), None
+        if new_status == 'cancelled':
+            return 'appointment_cancelled', 'appointment_cancelled', ('client', 'staff'), None
+        if new_status == 'completed':
+            return 'appointment_completed', 'appointment_completed', ('client',), None
+        if new_status == 'no_show':
+            return 'appointment_no_show', 'appointment_updated', ('client',), None
+        return 'appointment_updated', 'appointment_updated', ('client',), (old_status, new_status)
+
+    if old_values.get('start_time', appointment.start_time) != appointment.start_time:
+        return 'appointment_rescheduled', 'appointment_updated', ('client', 'staff'), None
+
+    return 'appointment_updated', 'appointment_updated', ('client',), None
+
+def should_send_sms(event, appointment, old_values):
+    """
+    Check whether a batched change warrants an SMS to the client, using the
+    same rules as the per-row handlers in signals.py.
+    """
+    if event == 'appointment_cancelled':
+        return old_values.get('status') == 'confirmed'
+    if event == 'appointment_rescheduled':
+        return appointment.status == 'confirmed'
+    if event == 'appointment_updated':
+        return old_values.get('status', appointment.status) != appointment.status
+    return event in ('appointment_created', 'appointment_confirmed', 'appointment_completed')
+
+class AppointmentBatch:
+    """
+    Appointment changes collected while per-row signal handling is suspended.
+
+    Args:
+        notify: Whether to create in-app notifications when the batch is processed
+        send_sms: Whether to text clients, per appointment, as the per-row
+            handlers would
+    """
+
+    def __init__(self, notify=True, send_sms=False):
+        self.notify = notify
+        self.send_sms = send_sms
+        self.changes = {}
+        self.results = None
+
+    @property
+    def appointment_ids(self):
+        return list(self.changes)
+
+    def add(self, appointment_id, created=False, old_values=None):
+        """
+        Record a change to an appointment.
+
+        The first recorded value of each field is kept, so an appointment
+        saved several times in the batch is compared with its state from
+        before the batch. Use this for rows changed with QuerySet.update().
+
+        Args:
+            appointment_id: ID of the changed appointment
+            created: Whether the appointment was created
+            old_values: Mapping of changed field to its previous value
+        """
+        change = self.changes.setdefault(appointment_id, {'created': False, 'old_values': {}})
+        change['created'] = change['created'] or created
+        for field, value in (old_values or {}).items():
+            change['old_values'].setdefault(field, value)
+
+    def record(self, instance, created):
+        """
+        Record a saved Appointment instance, reading its dirty fields.
+        """
+        self.add(instance.pk, created, {} if created else instance.get_dirty_fields())
+
+    def process(self):
+        """
+        Apply the collected changes: reminders, in-app notifications and push events.
+
+        Appointments are loaded in one query, reminders of closed appointments
+        are cancelled in one update, and notifications are created with one
+        bulk insert per message type. SMS are only sent if the batch was
+        opened with send_sms=True.
+
+        Returns:
+            dict: Number of appointments processed per event
+        """
+        if not self.changes:
+            self.results = {}
+            return self.results
+
+        appointments = list(
+            Appointment.objects.filter(id__in=self.changes).select_related(
+                'client', 'client__preferences', 'staff', 'service'
+            )
+        )
+
+        now = timezone.now()
+        groups = defaultdict(list)
+        status_changes = {}
+        closed_ids = []
+        texts = []
+        for appointment in appointments:
+            change = self.changes[appointment.id]
+            old_values = change['old_values']
+            event, notification_type, audiences, status_change = classify_appointment_change(
+                appointment, change['created'], old_values
+            )
+            groups[(event, notification_type, audiences)].append(appointment)
+            if status_change:
+                status_changes[appointment.id] = status_change
+            if self.send_sms and should_send_sms(event, appointment, old_values):
+                texts.append((appointment, event, notification_type, status_change))
+
+            if appointment.status not in REMINDABLE_STATUSES or appointment.start_time <= now:
+                closed_ids.append(appointment.id)
+            elif change['created'] or 'status' in old_values:
+                schedule_appointment_reminder(appointment)
+            elif 'start_time' in old_values:
+                schedule_appointment_reminder(appointment, rescheduled=True)
+
+        if closed_ids:
+            ScheduledReminder.objects.filter(
+                appointment_id__in=closed_ids,
+                state__in=['pending', 'claimed']
+            ).update(state='cancelled', updated_at=now)
+
+        if self.notify:
+            for (event, notification_type, audiences), items in groups.items():
+                create_bulk_appointment_notifications(
+                    items, event, notification_type, audiences, status_changes=status_changes
+                )
+
+        for appointment, event, notification_type, status_change in texts:
+            if not appointment.client.phone_number:
+                continue
+            old_status, new_status = status_change or (None, None)
+            context = MessageContext(appointment, old_status=old_status, new_status=new_status)
+            send_sms_notification(
+                recipient=appointment.client,
+                phone_number=appointment.client.phone_number,
+                message=context.render(event, 'client')['sms'],
+                notification_type=notification_type,
+                reference_id=context.reference_id
+            )
+
+        publish_appointment_changes(appointments)
+
+        self.results = {event: len(items) for (event, _, _), items in groups.items()}
+        logger.info(f"Processed batch of {len(appointments)} appointment changes: {self.results}")
+        return self.results
+
+@contextmanager
+def batch_appointment_changes(notify=True, send_sms=False):
+    """
+    Suspend the per-row Appointment post_save handler for a block of work.
+
+    Saved appointments are only recorded while the block runs; the batch is
+    processed once when it exits, after the surrounding transaction commits.
+    Nested blocks join the outermost batch. If the block raises, the batch
+    is discarded.
+
+    Usage:
+        with batch_appointment_changes() as batch:
+            for appointment in appointments:
+                appointment.status = 'cancelled'
+                appointment.save()
+
+    Args:
+        notify: Whether to create in-app notifications for the changes
+        send_sms: Whether to text clients about the changes
+
+    Yields:
+        AppointmentBatch: The batch collecting the changes
+    """
+    batch = get_active_batch()
+    if batch is not None:
+        yield batch
+        return
+
+    batch = AppointmentBatch(notify=notify, send_sms=send_sms)
+    _local.batch = batch
+    try:
+        yield batch
+    finally:
+        _local.batch = None
+
+    transaction.on_commit(batch.process)
@@ -0,0 +1,216 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from backend.common.models import Appointment
+from .models import Broadcast
+from .channels import preload_preferences, is_channel_enabled
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Default number of days without a visit for the lapsed clients audience
+DEFAULT_LAPSED_DAYS = 60
+
+# Statuses of broadcasts that are never sent again
+FINISHED_STATUSES = ('completed', 'cancelled')
+
+def all_clients_audience(params):
+    """
+    Every active client.
+    """
+    return User.objects.filter(role='client', is_active=True)
+
+def lapsed_clients_audience(params):
+    """
+    Active clients who have visited before but not in the last N days.
+
+    A visit is a completed appointment. Clients who never completed one
+    are not lapsed and are left out; all_clients reaches them too.
+
+    Args:
+        params: Audience parameters; 'days' sets N (default: 60)
+    """
+    days = int(params.get('days', DEFAULT_LAPSED_DAYS))
+    cutoff = timezone.now() - timedelta(days=days)
+
+    visits = Appointment.objects.filter(client=OuterRef('pk'), status='completed')
+
+    return User.objects.filter(role='client', is_active=True).filter(
+        Exists(visits),
+        ~Exists(visits.filter(start_time__gte=cutoff))
+    )
+
+# Audience name -> function returning the recipient queryset
+AUDIENCES = {
+    'all_clients': all_clients_audience,
+    'lapsed_clients': lapsed_clients_audience,
+}
+
+def get_audience_queryset(broadcast):
+    """
+    Build the recipient queryset for a broadcast's audience.
+
+    Args:
+        broadcast: The Broadcast instance
+
+    Returns:
+        QuerySet: Users in the audience
+    """
+    try:
+        audience = AUDIENCES[broadcast.audience]
+    except KeyError:
+        raise ValueError(f"Unknown broadcast audience: {broadcast.audience}")
+
+    return audience(broadcast.audience_params or {})
+
+def iter_recipient_chunks(broadcast):
+    """
+    Stream the remaining recipients of a broadcast in chunks.
+
+    Recipients are read in primary key order after the broadcast's
+    checkpoint through a server-side cursor, so memory use stays flat
+    whatever the audience size.
+
+    Args:
+        broadcast: The Broadcast instance
+
+    Yields:
+        list: Up to broadcast.chunk_size User instances
+    """
+    recipients = get_audience_queryset(broadcast).filter(
+        id__gt=broadcast.last_recipient_id
+    ).order_by('id').only('id', 'email', 'phone_number', 'first_name', 'last_name', 'role')
+
+    chunk = []
+    for recipient in recipients.iterator(chunk_size=broadcast.chunk_size):
+        chunk.append(recipient)
+        if len(chunk) >= broadcast.chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+def send_broadcast_chunk(broadcast, recipients):
+    """
+    Send a broadcast message to one chunk of recipients.
+
+    Args:
+        broadcast: The Broadcast instance
+        recipients: List of User instances
+
+    Returns:
+        dict: Counts of sent, failed and skipped recipients
+    """
+    from .utils import send_sms_notification, send_email_notifications
+
+    counts = {'sent': 0, 'failed': 0, 'skipped': 0}
+    reference_id = f"broadcast:{broadcast.id}"
+
+    # Drop recipients who opted out of marketing on this channel
+    preload_preferences(recipients)
+    targets = []
+    for recipient in recipients:
+        address = recipient.phone_number if broadcast.channel == 'sms' else recipient.email
+        if address and is_channel_enabled(recipient, broadcast.channel, 'marketing'):
+            targets.append(recipient)
+        else:
+            counts['skipped'] += 1
+
+    if broadcast.channel == 'sms':
+        for recipient in targets:
+            try:
+                _, twilio_sid = send_sms_notification(
+                    recipient=recipient,
+                    phone_number=recipient.phone_number,
+                    message=broadcast.message,
+                    notification_type='marketing',
+                    reference_id=reference_id
+                )
+                counts['sent' if twilio_sid else 'failed'] += 1
+            except Exception as e:
+                logger.error(f"Error sending broadcast {broadcast.id} to user {recipient.id}: {str(e)}")
+                counts['failed'] += 1
+    else:
+        sent = send_email_notifications(
+            [(recipient, broadcast.subject or broadcast.name, broadcast.message, None) for recipient in targets]
+        )
+        counts['sent'] += sent
+        counts['failed'] += len(targets) - sent
+
+    return counts
+
+def run_broadcast(broadcast, sleep=time.sleep, progress=None):
+    """
+    Send a broadcast, resuming from its last checkpoint.
+
+    Chunks are throttled to broadcast.rate_per_second and the checkpoint is
+    saved after each one. Setting the broadcast's status to 'paused' or
+    'cancelled' while it runs stops it after the current chunk; paused
+    broadcasts can be run again, cancelled ones cannot.
+
+    Args:
+        broadcast: The Broadcast instance
+        sleep: Function used to wait between chunks (default: time.sleep)
+        progress: Optional callback called with the broadcast after each chunk
+
+    Returns:
+        Broadcast: The updated broadcast
+    """
+    if broadcast.status in FINISHED_STATUSES:
+        return broadcast
+
+    broadcast.status = 'running'
+    broadcast.error_message = None
+    if not broadcast.started_at:
+        broadcast.started_at = timezone.now()
+    broadcast.save(update_fields=['status', 'error_message', 'started_at', 'updated_at'])
+
+    try:
+        for recipients in iter_recipient_chunks(broadcast):
+            chunk_started = time.monotonic()
+            counts = send_broadcast_chunk(broadcast, recipients)
+
+            # Throttle so the chunk takes at least len(chunk) / rate seconds
+            if broadcast.rate_per_second > 0:
+                wait = len(recipients) / broadcast.rate_per_second - (time.monotonic() - chunk_started)
+                if wait > 0:
+                    sleep(wait)
+
+            # Checkpoint progress
+            broadcast.last_recipient_id = recipients[-1].id
+            broadcast.sent_count += counts['sent']
+            broadcast.failed_count += counts['failed']
+            broadcast.skipped_count += counts['skipped']
+            broadcast.elapsed_seconds += time.monotonic() - chunk_started
+            broadcast.save(update_fields=[
+                'last_recipient_id', 'sent_count', 'failed_count',
+                'skipped_count', 'elapsed_seconds', 'updated_at'
+            ])
+
+            if progress:
+                progress(broadcast)
+
+            # Allow the broadcast to be paused or cancelled from elsewhere
+            current_status = Broadcast.objects.filter(pk=broadcast.pk).values_list('status', flat=True).first()
+            if current_status in ('paused', 'cancelled'):
+                broadcast.status = current_status
+                return broadcast
+
+    except Exception as e:
+        logger.error(f"Broadcast {broadcast.id} failed: {str(e)}")
+        broadcast.status = 'failed'
+        broadcast.error_message = str(e)
+        broadcast.save(update_fields=['status', 'error_message', 'updated_at'])
+        raise
+
+    broadcast.status = 'completed'
+    broadcast.finished_at = timezone.now()
+    broadcast.save(update_fields=['status', 'finished_at', 'updated_at'])
+    return broadcast
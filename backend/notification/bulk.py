@@ -0,0 +1,72 @@
+from collections import Counter
+
+from .models import Notification
+from .messages import MessageContext
+from .channels import preload_preferences, is_channel_enabled
+from .counters import increment_unread_counts
+from .push import publish_event, notification_event, appointment_event
+
+def create_bulk_appointment_notifications(appointments, event, notification_type, audiences=('client',), status_changes=None):
+    """
+    Create in-app notifications for many appointments in one INSERT.
+
+    bulk_create skips the Notification post_save handler, so unread counters
+    are incremented here with one update per recipient and push events are
+    published explicitly.
+
+    Args:
+        appointments: Appointments with client, staff and service loaded
+        event: Message registry event (e.g., 'appointment_completed')
+        notification_type: Notification type stored on the rows
+        audiences: Audiences to notify ('client' and/or 'staff')
+        status_changes: Optional mapping of appointment ID to
+            (old_status, new_status) for status change messages
+
+    Returns:
+        list: The created Notification instances
+    """
+    appointments = list(appointments)
+    status_changes = status_changes or {}
+    recipients = {'client': lambda appointment: appointment.client, 'staff': lambda appointment: appointment.staff}
+
+    preload_preferences(
+        recipients[audience](appointment) for appointment in appointments for audience in audiences
+    )
+
+    notifications = []
+    for appointment in appointments:
+        old_status, new_status = status_changes.get(appointment.id, (None, None))
+        context = MessageContext(appointment, old_status=old_status, new_status=new_status)
+        for audience in audiences:
+            recipient = recipients[audience](appointment)
+            if not is_channel_enabled(recipient, 'in_app', notification_type):
+                continue
+
+            texts = context.render(event, audience)
+            notifications.append(Notification(
+                recipient=recipient,
+                title=texts['title'],
+                message=texts['in_app'],
+                notification_type=notification_type,
+                reference_id=context.reference_id
+            ))
+
+    created = Notification.objects.bulk_create(notifications, batch_size=500)
+
+    increment_unread_counts(Counter(notification.recipient_id for notification in created))
+
+    for notification in created:
+        if notification.pk:
+            publish_event([notification.recipient_id], 'notification', notification_event(notification))
+
+    return created
+
+def publish_appointment_changes(appointments):
+    """
+    Push appointment change events for appointments updated in bulk.
+
+    Args:
+        appointments: The updated appointments
+    """
+    for appointment in appointments:
+        publish_event([appointment.client_id, appointment.staff_id], 'appointment', appointment_event(appointment))
@@ -0,0 +1,191 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .models import NotificationPreference
+
+User = get_user_model()
+
+# Notification types users can configure through NotificationPreference
+CONFIGURABLE_TYPES = {choice[0] for choice in NotificationPreference.TYPE_CHOICES}
+
+APPOINTMENT_TYPES = {
+    'appointment_created',
+    'appointment_updated',
+    'appointment_reminder',
+    'appointment_cancelled',
+    'appointment_completed',
+}
+
+# Notification types let through by StaffSettings.notification_preference
+# (None means every type is allowed)
+STAFF_PREFERENCE_TYPES = {
+    'all': None,
+    'appointments_only': APPOINTMENT_TYPES,
+    'important_only': {'appointment_cancelled', 'appointment_reminder', 'system'},
+    'none': set(),
+}
+
+# Seconds a cached preference entry stays valid; saves in other processes
+# are only picked up once it expires
+PREFERENCE_CACHE_TTL = getattr(settings, 'NOTIFICATION_PREFERENCE_CACHE_TTL', 300)
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+class RecipientPreferences:
+    """
+    Resolved notification channel preferences for a single user.
+    """
+    __slots__ = ('user_id', 'sms', 'email', 'staff_types', 'overrides')
+
+    def __init__(self, user_id, sms=True, email=True, staff_types=None, overrides=None):
+        self.user_id = user_id
+        self.sms = sms
+        self.email = email
+        self.staff_types = staff_types
+        self.overrides = overrides or {}
+
+    def allows(self, channel, notification_type):
+        """
+        Check whether the user accepts a notification type on a channel.
+
+        An explicit NotificationPreference row wins; otherwise the SMS/email
+        switches from ClientPreference or StaffSettings apply.
+        """
+        override = self.overrides.get((notification_type, channel))
+        if override is not None:
+            return override
+
+        if channel == 'in_app':
+            return True
+
+        if self.staff_types is not None and notification_type not in self.staff_types:
+            return False
+
+        if channel == 'sms':
+            return self.sms
+        if channel == 'email':
+            return self.email
+        return False
+
+def _user_id(user):
+    return user if isinstance(user, int) else user.pk
+
+def _load_preferences(user_ids):
+    """
+    Load preferences for the given users from the database.
+
+    Costs two queries however many users are passed: one joining the
+    ClientPreference and StaffSettings rows onto the users, and one for
+    NotificationPreference overrides.
+    """
+    preferences = {}
+
+    rows = User.objects.filter(id__in=user_ids).values(
+        'id',
+        'role',
+        'preferences__sms_notifications',
+        'preferences__email_notifications',
+        'staff_settings__sms_notifications',
+        'staff_settings__email_notifications',
+        'staff_settings__notification_preference',
+    )
+
+    for row in rows:
+        if row['role'] == 'staff':
+            sms = row['staff_settings__sms_notifications']
+            email = row['staff_settings__email_notifications']
+            staff_preference = row['staff_settings__notification_preference'] or 'all'
+            staff_types = STAFF_PREFERENCE_TYPES.get(staff_preference)
+        else:
+            sms = row['preferences__sms_notifications']
+            email = row['preferences__email_notifications']
+            staff_types = None
+
+        preferences[row['id']] = RecipientPreferences(
+            row['id'],
+            sms=True if sms is None else sms,
+            email=True if email is None else email,
+            staff_types=staff_types,
+        )
+
+    overrides = NotificationPreference.objects.filter(user_id__in=user_ids).values_list(
+        'user_id', 'notification_type', 'channel', 'is_enabled'
+    )
+    for user_id, notification_type, channel, is_enabled in overrides:
+        if user_id in preferences:
+            preferences[user_id].overrides[(notification_type, channel)] = is_enabled
+
+    return preferences
+
+def preload_preferences(users):
+    """
+    Resolve channel preferences for a batch of recipients.
+
+    Cached entries are reused and all cache misses are loaded together, so a
+    whole dispatch batch costs at most two queries.
+
+    Args:
+        users: Iterable of User instances or user IDs
+
+    Returns:
+        dict: Mapping of user ID to RecipientPreferences
+    """
+    user_ids = {_user_id(user) for user in users if user is not None}
+    now = time.monotonic()
+    resolved = {}
+
+    with _cache_lock:
+        for user_id in user_ids:
+            entry = _cache.get(user_id)
+            if entry and entry[0] > now:
+                resolved[user_id] = entry[1]
+
+    missing = user_ids - resolved.keys()
+    if missing:
+        loaded = _load_preferences(missing)
+        expires_at = now + PREFERENCE_CACHE_TTL
+        with _cache_lock:
+            for user_id, preferences in loaded.items():
+                _cache[user_id] = (expires_at, preferences)
+        resolved.update(loaded)
+
+    return resolved
+
+def get_preferences(user):
+    """
+    Get the resolved channel preferences for a single user.
+    """
+    user_id = _user_id(user)
+    return preload_preferences([user_id]).get(user_id) or RecipientPreferences(user_id)
+
+def is_channel_enabled(user, channel, notification_type):
+    """
+    Check whether a notification type may be sent to a user on a channel.
+
+    Types users cannot configure (e.g. manual messages) are always allowed.
+
+    Args:
+        user: User instance or user ID
+        channel: One of 'in_app', 'sms' or 'email'
+        notification_type: The notification type being sent
+
+    Returns:
+        bool: True if the channel is enabled for the user
+    """
+    if user is None or notification_type not in CONFIGURABLE_TYPES:
+        return True
+    return get_preferences(user).allows(channel, notification_type)
+
+def invalidate_preferences(user_id=None):
+    """
+    Drop cached preferences for a user, or for everyone if no user is given.
+    """
+    with _cache_lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(user_id, None)
@@ -0,0 +1,162 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Notification, NotificationCounter
+
+def adjust_unread_count(user_id, delta):
+    """
+    Atomically add delta to a user's unread notification count.
+
+    The counter row is created from an exact count the first time it is
+    needed, after which it is only ever changed with F() updates.
+
+    Args:
+        user_id: ID of the user whose counter changes
+        delta: Amount to add (negative to subtract)
+    """
+    if not delta:
+        return
+
+    updated = NotificationCounter.objects.filter(user_id=user_id).update(
+        unread_count=F('unread_count') + delta,
+        updated_at=timezone.now()
+    )
+
+    if not updated:
+        # No counter yet; seed it from the table, which already includes this change
+        recount_unread(user_id)
+
+def increment_unread_counts(counts):
+    """
+    Apply several counter increments at once, e.g. after a bulk_create.
+
+    Args:
+        counts: Mapping of user ID to the number of new unread notifications
+    """
+    for user_id, delta in counts.items():
+        adjust_unread_count(user_id, delta)
+
+def recount_unread(user_id):
+    """
+    Reset a user's counter to the exact number of unread notifications.
+
+    Args:
+        user_id: ID of the user to recount
+
+    Returns:
+        int: The unread count
+    """
+    unread = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+
+    try:
+        with transaction.atomic():
+            NotificationCounter.objects.update_or_create(
+                user_id=user_id,
+                defaults={'unread_count': unread}
+            )
+    except IntegrityError:
+        # Another request created the counter first
+        NotificationCounter.objects.filter(user_id=user_id).update(
+            unread_count=unread,
+            updated_at=timezone.now()
+        )
+
+    return unread
+
+def get_unread_counter(user_id):
+    """
+    Get a user's notification counter, creating it if needed.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        NotificationCounter: The user's counter
+    """
+    counter = NotificationCounter.objects.filter(user_id=user_id).first()
+    if counter is None:
+        recount_unread(user_id)
+        counter = NotificationCounter.objects.get(user_id=user_id)
+    return counter
+
+def mark_notification_read(notification):
+    """
+    Mark a notification as read, decrementing the counter exactly once.
+
+    Args:
+        notification: The Notification instance
+
+    Returns:
+        bool: True if the notification was unread before the call
+    """
+    marked = Notification.objects.filter(pk=notification.pk, is_read=False).update(
+        is_read=True,
+        updated_at=timezone.now()
+    )
+    notification.is_read = True
+    adjust_unread_count(notification.recipient_id, -marked)
+    return bool(marked)
+
+def mark_all_notifications_read(user_id):
+    """
+    Mark all of a user's notifications as read.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        int: Number of notifications marked as read
+    """
+    marked = Notification.objects.filter(recipient_id=user_id, is_read=False).update(
+        is_read=True,
+        updated_at=timezone.now()
+    )
+    adjust_unread_count(user_id, -marked)
+    return marked
+
+def delete_notifications(queryset, user_id):
+    """
+    Delete a user's notifications and remove the unread ones from the counter.
+
+    Args:
+        queryset: Notifications to delete, all belonging to the user
+        user_id: ID of the user
+
+    Returns:
+        int: Number of notifications deleted
+    """
+    with transaction.atomic():
+        unread_deleted, _ = queryset.filter(is_read=False).delete()
+        read_deleted, _ = queryset.delete()
+    adjust_unread_count(user_id, -unread_deleted)
+    return unread_deleted + read_deleted
+
+def reconcile_unread_counts(user_ids=None):
+    """
+    Repair counters that drifted from the notification table.
+
+    Args:
+        user_ids: Optional list of user IDs to limit the reconciliation to
+
+    Returns:
+        int: Number of counters corrected
+    """
+    unread = Notification.objects.filter(is_read=False)
+    counters = NotificationCounter.objects.all()
+    if user_ids:
+        unread = unread.filter(recipient_id__in=user_ids)
+        counters = counters.filter(user_id__in=user_ids)
+
+    actual = dict(
+        unread.values('recipient_id').annotate(total=Count('id')).values_list('recipient_id', 'total')
+    )
+    stored = dict(counters.values_list('user_id', 'unread_count'))
+
+    fixed = 0
+    for user_id in set(actual) | set(stored):
+        if actual.get(user_id, 0) != stored.get(user_id, 0) or user_id not in stored:
+            recount_unread(user_id)
+            fixed += 1
+
+    return fixed
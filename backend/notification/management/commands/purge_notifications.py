@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from backend.notification.partitions import (
+    RETENTION_MONTHS, PARTITIONS_AHEAD, add_months, month_start, ensure_partitions, purge_before
+)
+
+class Command(BaseCommand):
+    help = 'Create upcoming notification partitions and drop those past the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=RETENTION_MONTHS, help='Months of notifications to keep')
+        parser.add_argument('--ahead', type=int, default=PARTITIONS_AHEAD, help='Months of partitions to create ahead')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would be dropped without dropping it')
+
+    def handle(self, *args, **options):
+        if not options['dry_run']:
+            for name in ensure_partitions(months_ahead=options['ahead']):
+                self.stdout.write(f"Created partition {name}")
+
+        cutoff = add_months(month_start(timezone.now()), -options['months'])
+        results = purge_before(cutoff, dry_run=options['dry_run'])
+
+        verb = 'Would drop' if options['dry_run'] else 'Dropped'
+        for table, removed in results.items():
+            if isinstance(removed, int):
+                self.stdout.write(f"{verb} {removed} rows from {table} created before {cutoff:%Y-%m}")
+            else:
+                for name in removed:
+                    self.stdout.write(f"{verb} partition {name}")
+
+        self.stdout.write(self.style.SUCCESS(f"Retention applied: keeping notifications from {cutoff:%Y-%m} onwards"))
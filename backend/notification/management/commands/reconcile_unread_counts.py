@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from backend.notification.counters import reconcile_unread_counts
+
+class Command(BaseCommand):
+    help = 'Repair unread notification counters that drifted from the notification table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Only reconcile this user (repeatable)')
+
+    def handle(self, *args, **options):
+        fixed = reconcile_unread_counts(user_ids=options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Corrected {fixed} unread counters"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from backend.notification.retries import process_sms_retries
+
+class Command(BaseCommand):
+    help = 'Retry SMS notifications whose backoff has elapsed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of messages claimed per batch')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        results = process_sms_retries(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches']
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Retried {results['total']} SMS: {results['sent']} sent, "
+            f"{results['retrying']} rescheduled, {results['failed']} failed, "
+            f"{results['dead_letter']} dead-lettered"
+        ))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from backend.notification.models import Broadcast
+from backend.notification.broadcasts import run_broadcast, FINISHED_STATUSES
+
+class Command(BaseCommand):
+    help = 'Send a marketing broadcast, resuming from its last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('broadcast_id', type=int, help='ID of the broadcast to send')
+        parser.add_argument('--rate', type=float, default=None, help='Override the messages per second limit')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Override the number of recipients per chunk')
+
+    def handle(self, *args, **options):
+        try:
+            broadcast = Broadcast.objects.get(pk=options['broadcast_id'])
+        except Broadcast.DoesNotExist:
+            raise CommandError(f"Broadcast {options['broadcast_id']} not found")
+
+        if broadcast.status in FINISHED_STATUSES:
+            raise CommandError(f"Broadcast {broadcast.id} is {broadcast.status} and cannot be sent again")
+
+        if options['rate'] is not None:
+            broadcast.rate_per_second = options['rate']
+        if options['chunk_size'] is not None:
+            broadcast.chunk_size = options['chunk_size']
+        broadcast.save(update_fields=['rate_per_second', 'chunk_size', 'updated_at'])
+
+        if broadcast.last_recipient_id:
+            self.stdout.write(f"Resuming broadcast {broadcast.id} after recipient {broadcast.last_recipient_id}")
+        else:
+            self.stdout.write(f"Starting broadcast {broadcast.id}: {broadcast.name}")
+
+        def report(progress):
+            self.stdout.write(
+                f"  {progress.processed_count} processed ({progress.sent_count} sent, "
+                f"{progress.failed_count} failed, {progress.skipped_count} skipped) "
+                f"- {progress.throughput} msg/s"
+            )
+
+        broadcast = run_broadcast(broadcast, progress=report)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Broadcast {broadcast.id} {broadcast.status}: {broadcast.sent_count} sent, "
+            f"{broadcast.failed_count} failed, {broadcast.skipped_count} skipped "
+            f"in {broadcast.elapsed_seconds:.1f}s ({broadcast.throughput} msg/s)"
+        ))
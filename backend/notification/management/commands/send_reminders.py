@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from backend.notification.reminders import process_due_reminders, backfill_scheduled_reminders
+
+class Command(BaseCommand):
+    help = 'Send appointment reminders that are due'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of reminders claimed per batch')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+        parser.add_argument('--backfill', action='store_true', help='Schedule reminders for upcoming appointments that have none before sending')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            scheduled = backfill_scheduled_reminders()
+            self.stdout.write(f"Scheduled {scheduled} missing reminders")
+
+        results = process_due_reminders(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches']
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {results['total']} reminders: {results['sent']} sent, "
+            f"{results['skipped']} skipped, {results['failed']} failed"
+        ))
@@ -0,0 +1,199 @@
+import threading
+from string import Template
+
+from django.conf import settings
+from django.utils import translation
+from django.utils.translation import gettext, gettext_noop
+
+# Format used for appointment times when no per-language format is set
+DEFAULT_TIME_FORMAT = getattr(settings, 'NOTIFICATION_TIME_FORMAT', '%A, %B %d at %I:%M %p')
+
+# Optional per-language overrides of DEFAULT_TIME_FORMAT, e.g. {'fr': '%A %d %B à %H:%M'}
+TIME_FORMATS = getattr(settings, 'NOTIFICATION_TIME_FORMATS', {})
+
+# Message sources per event and audience. Strings are marked for translation
+# and compiled into Templates once per language on first use.
+MESSAGE_TEMPLATES = {
+    'appointment_created': {
+        'client': {
+            'title': gettext_noop("New Appointment Booked"),
+            'in_app': gettext_noop("Your appointment with $staff_name for $service_name on $appointment_time has been booked successfully."),
+        },
+        'staff': {
+            'title': gettext_noop("New Appointment Scheduled"),
+            'in_app': gettext_noop("A new appointment with $client_name for $service_name on $appointment_time has been scheduled."),
+        },
+    },
+    'appointment_confirmed': {
+        'client': {
+            'title': gettext_noop("Appointment Confirmed"),
+            'in_app': gettext_noop("Your appointment with $staff_name for $service_name on $appointment_time has been confirmed."),
+        },
+    },
+    'appointment_cancelled': {
+        'client': {
+            'title': gettext_noop("Appointment Cancelled"),
+            'in_app': gettext_noop("Your appointment with $staff_name for $service_name on $appointment_time has been cancelled."),
+        },
+        'staff': {
+            'title': gettext_noop("Appointment Cancelled"),
+            'in_app': gettext_noop("The appointment with $client_name for $service_name on $appointment_time has been cancelled."),
+        },
+    },
+    'appointment_completed': {
+        'client': {
+            'title': gettext_noop("Appointment Completed"),
+            'in_app': gettext_noop("Your appointment with $staff_name for $service_name has been completed. We hope you enjoyed your visit!"),
+            'sms': gettext_noop("Thank you for visiting Barberian! Your appointment with $staff_name has been completed. We hope to see you again soon!"),
+        },
+    },
+    'appointment_no_show': {
+        'client': {
+            'title': gettext_noop("Missed Appointment"),
+            'in_app': gettext_noop("We missed you at your appointment with $staff_name for $service_name on $appointment_time. You can book a new time whenever suits you."),
+        },
+    },
+    'appointment_rescheduled': {
+        'client': {
+            'title': gettext_noop("Appointment Rescheduled"),
+            'in_app': gettext_noop("Your appointment with $staff_name for $service_name has been rescheduled to $appointment_time."),
+        },
+        'staff': {
+            'title': gettext_noop("Appointment Rescheduled"),
+            'in_app': gettext_noop("The appointment with $client_name for $service_name has been rescheduled to $appointment_time."),
+        },
+    },
+    'appointment_updated': {
+        'client': {
+            'title': gettext_noop("Appointment Updated"),
+            'in_app': gettext_noop("Your appointment with $staff_name for $service_name on $appointment_time has been updated.$status_change"),
+            'sms': gettext_noop("Your appointment with $staff_name for $service_name on $appointment_time has been updated. Status: $new_status."),
+        },
+        'staff': {
+            'title': gettext_noop("Appointment Updated"),
+            'in_app': gettext_noop("The appointment with $client_name for $service_name on $appointment_time has been updated."),
+        },
+    },
+    'appointment_reminder': {
+        'client': {
+            'title': gettext_noop("Appointment Reminder"),
+            'in_app': gettext_noop("Reminder: You have an appointment with $staff_name for $service_name on $appointment_time."),
+        },
+    },
+}
+
+# Sentence appended to generic updates when the status changed
+STATUS_CHANGE_TEMPLATE = gettext_noop(" Status changed from $old_status to $new_status.")
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+def register_message(event, audience, title, in_app, sms=None):
+    """
+    Add or replace the texts for an event and audience.
+
+    Args:
+        event: Event name (e.g., 'appointment_created')
+        audience: 'client' or 'staff'
+        title: In-app notification title
+        in_app: In-app notification message
+        sms: SMS message (default: the in-app message)
+    """
+    texts = {'title': title, 'in_app': in_app}
+    if sms:
+        texts['sms'] = sms
+
+    MESSAGE_TEMPLATES.setdefault(event, {})[audience] = texts
+    with _compiled_lock:
+        for key in [key for key in _compiled if key[1:3] == (event, audience)]:
+            del _compiled[key]
+
+def get_template(source, event=None, audience=None, language=None):
+    """
+    Get the compiled Template for a source string in a language.
+
+    The source is translated with gettext in the given (or active) language
+    and compiled once; later renders reuse the compiled Template.
+    """
+    language = language or translation.get_language() or settings.LANGUAGE_CODE
+    key = (language, event, audience, source)
+
+    template = _compiled.get(key)
+    if template is None:
+        with translation.override(language):
+            template = Template(gettext(source))
+        with _compiled_lock:
+            _compiled[key] = template
+    return template
+
+def format_appointment_time(value, language=None):
+    """
+    Format an appointment time for messages, honouring NOTIFICATION_TIME_FORMATS.
+    """
+    language = language or translation.get_language() or settings.LANGUAGE_CODE
+    return value.strftime(TIME_FORMATS.get(language, DEFAULT_TIME_FORMAT))
+
+class MessageContext:
+    """
+    Values shared by every message about one appointment event.
+
+    Related rows are read and the time is formatted once, when the context
+    is built, and each rendered event is cached so the in-app and SMS copies
+    for the same audience reuse the same text.
+
+    Args:
+        appointment: The appointment the messages are about, ideally with
+            client, staff and service already loaded
+        old_status: Previous status, for status change messages
+        new_status: New status, for status change messages
+        language: Language to render in (default: the active language)
+    """
+
+    def __init__(self, appointment, old_status=None, new_status=None, language=None):
+        self.appointment = appointment
+        self.language = language or translation.get_language() or settings.LANGUAGE_CODE
+        self.reference_id = str(appointment.id)
+
+        self.values = {
+            'client_name': appointment.client.get_full_name(),
+            'staff_name': appointment.staff.get_full_name(),
+            'service_name': appointment.service.name,
+            'appointment_time': format_appointment_time(appointment.start_time, self.language),
+            'old_status': old_status or '',
+            'new_status': new_status or '',
+            'status_change': '',
+        }
+
+        if old_status and new_status:
+            self.values['status_change'] = get_template(
+                STATUS_CHANGE_TEMPLATE, language=self.language
+            ).substitute(self.values)
+
+        self._rendered = {}
+
+    def render(self, event, audience='client'):
+        """
+        Render the texts for an event and audience.
+
+        Args:
+            event: Event name (e.g., 'appointment_created')
+            audience: 'client' or 'staff'
+
+        Returns:
+            dict: 'title', 'in_app' and 'sms' texts
+        """
+        key = (event, audience)
+        if key not in self._rendered:
+            try:
+                sources = MESSAGE_TEMPLATES[event][audience]
+            except KeyError:
+                raise ValueError(f"No message registered for {event} ({audience})")
+
+            rendered = {
+                channel: get_template(source, event, audience, self.language).substitute(self.values)
+                for channel, source in sources.items()
+            }
+            rendered.setdefault('sms', rendered['in_app'])
+            self._rendered[key] = rendered
+
+        return self._rendered[key]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.10 on 2026-10-19 06:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend_common', '0005_servicemedia'),
+        ('backend_notification', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_at', models.DateTimeField(verbose_name='Due At')),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('claimed', 'Claimed'), ('sent', 'Sent'), ('cancelled', 'Cancelled'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='State')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Claimed At')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Sent At')),
+                ('error_message', models.TextField(blank=True, help_text='Error details if the reminder failed', null=True, verbose_name='Error Message')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('appointment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='scheduled_reminder', to='backend_common.appointment', verbose_name='Appointment')),
+            ],
+            options={
+                'verbose_name': 'Scheduled Reminder',
+                'verbose_name_plural': 'Scheduled Reminders',
+                'ordering': ['due_at'],
+                'indexes': [models.Index(fields=['state', 'due_at'], name='reminder_state_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.10 on 2026-10-19 06:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('backend_notification', '0002_scheduledreminder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Broadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Name')),
+                ('audience', models.CharField(choices=[('all_clients', 'All Active Clients'), ('lapsed_clients', 'Clients With No Recent Visit')], max_length=50, verbose_name='Audience')),
+                ('audience_params', models.JSONField(blank=True, default=dict, help_text='Audience options, e.g. {"days": 60} for lapsed clients', verbose_name='Audience Parameters')),
+                ('channel', models.CharField(choices=[('sms', 'SMS'), ('email', 'Email')], max_length=20, verbose_name='Channel')),
+                ('subject', models.CharField(blank=True, help_text='Email subject', max_length=255, verbose_name='Subject')),
+                ('message', models.TextField(verbose_name='Message')),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('running', 'Running'), ('paused', 'Paused'), ('completed', 'Completed'), ('failed', 'Failed')], default='draft', max_length=20, verbose_name='Status')),
+                ('chunk_size', models.PositiveIntegerField(default=100, verbose_name='Chunk Size')),
+                ('rate_per_second', models.FloatField(default=10, verbose_name='Messages Per Second')),
+                ('last_recipient_id', models.BigIntegerField(default=0, verbose_name='Last Recipient ID')),
+                ('sent_count', models.PositiveIntegerField(default=0, verbose_name='Sent')),
+                ('failed_count', models.PositiveIntegerField(default=0, verbose_name='Failed')),
+                ('skipped_count', models.PositiveIntegerField(default=0, verbose_name='Skipped')),
+                ('elapsed_seconds', models.FloatField(default=0, verbose_name='Elapsed Seconds')),
+                ('error_message', models.TextField(blank=True, null=True, verbose_name='Error Message')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Started At')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished At')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='broadcasts', to=settings.AUTH_USER_MODEL, verbose_name='Created By')),
+            ],
+            options={
+                'verbose_name': 'Broadcast',
+                'verbose_name_plural': 'Broadcasts',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
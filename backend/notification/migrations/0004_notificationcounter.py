@@ -0,0 +1,28 @@
+# Generated by Django 4.2.10 on 2026-10-19 06:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend_common', '0005_servicemedia'),
+        ('backend_notification', '0003_broadcast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+                ('unread_count', models.IntegerField(default=0, verbose_name='Unread Count')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Notification Counter',
+                'verbose_name_plural': 'Notification Counters',
+            },
+        ),
+    ]
@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations
+
+# Months of empty partitions created ahead of the current one
+MONTHS_AHEAD = 3
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+def partition_table(cursor, table, user_table):
+    """
+    Rebuild a table as a monthly range-partitioned table on created_at.
+    """
+    old = f"{table}_unpartitioned"
+
+    cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    cursor.execute(f"""
+        CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS)
+        PARTITION BY RANGE (created_at)
+    """)
+
+    # Partitioned tables need the partition key in their primary key
+    cursor.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id, created_at)')
+    cursor.execute(f"""
+        ALTER TABLE "{table}" ADD CONSTRAINT "{table}_recipient_id_fk"
+        FOREIGN KEY (recipient_id) REFERENCES "{user_table}" (id)
+        DEFERRABLE INITIALLY DEFERRED
+    """)
+    cursor.execute(f'CREATE INDEX "{table}_recipient_created_idx" ON "{table}" (recipient_id, created_at DESC)')
+    cursor.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+    cursor.execute(f'SELECT MIN(created_at) FROM "{old}"')
+    oldest = cursor.fetchone()[0]
+    now = datetime.now(timezone.utc)
+    month = datetime((oldest or now).year, (oldest or now).month, 1, tzinfo=timezone.utc)
+    last = add_months(datetime(now.year, now.month, 1, tzinfo=timezone.utc), MONTHS_AHEAD)
+
+    while month <= last:
+        upper = add_months(month, 1)
+        cursor.execute(
+            f'CREATE TABLE "{table}_p{month.year:04d}_{month.month:02d}" PARTITION OF "{table}" '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [month, upper]
+        )
+        month = upper
+
+    cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM \"{table}\""
+    )
+    cursor.execute(f'DROP TABLE "{old}"')
+
+def unpartition_table(cursor, table, user_table):
+    """
+    Rebuild a partitioned table as a plain table, dropping its partitions.
+    """
+    old = f"{table}_partitioned"
+
+    cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    cursor.execute(f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS)')
+    cursor.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id)')
+    cursor.execute(f"""
+        ALTER TABLE "{table}" ADD CONSTRAINT "{table}_recipient_id_fk"
+        FOREIGN KEY (recipient_id) REFERENCES "{user_table}" (id)
+        DEFERRABLE INITIALLY DEFERRED
+    """)
+    cursor.execute(f'CREATE INDEX "{table}_recipient_id_idx" ON "{table}" (recipient_id)')
+
+    cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM \"{table}\""
+    )
+    # Dropping the parent drops every partition with it
+    cursor.execute(f'DROP TABLE "{old}"')
+
+def get_tables(apps):
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    tables = [
+        apps.get_model('backend_notification', 'Notification')._meta.db_table,
+        apps.get_model('backend_notification', 'SMSNotification')._meta.db_table,
+    ]
+    return user_table, tables
+
+def partition_notifications(apps, schema_editor):
+    # Partitioning is Postgres-only; other databases keep plain tables
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    user_table, tables = get_tables(apps)
+    with schema_editor.connection.cursor() as cursor:
+        for table in tables:
+            partition_table(cursor, table, user_table)
+
+def unpartition_notifications(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    user_table, tables = get_tables(apps)
+    with schema_editor.connection.cursor() as cursor:
+        for table in tables:
+            unpartition_table(cursor, table, user_table)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('backend_notification', '0004_notificationcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_notifications, unpartition_notifications),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.10 on 2026-10-19 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend_notification', '0005_partition_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smsnotification',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Attempts'),
+        ),
+        migrations.AddField(
+            model_name='smsnotification',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='When a retrying SMS is due to be sent again', null=True, verbose_name='Next Attempt At'),
+        ),
+        migrations.AlterField(
+            model_name='smsnotification',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('delivered', 'Delivered'), ('failed', 'Failed'), ('undelivered', 'Undelivered'), ('received', 'Received'), ('read', 'Read'), ('retrying', 'Retrying'), ('dead_letter', 'Dead Letter')], default='pending', max_length=20, verbose_name='Status'),
+        ),
+        migrations.AddIndex(
+            model_name='smsnotification',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='sms_retry_due_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.10 on 2026-10-19 06:57
+
+from django.db import migrations, models
+
+def drop_recipient_created_index(apps, schema_editor):
+    # notification_page_idx covers the (recipient, created_at) index created
+    # by hand when the table was partitioned in 0005
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    table = apps.get_model('backend_notification', 'Notification')._meta.db_table
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_recipient_created_idx"')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend_notification', '0006_sms_retries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'created_at', 'id'], name='notification_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smsnotification',
+            index=models.Index(fields=['created_at', 'id'], name='sms_page_idx'),
+        ),
+        migrations.RunPython(drop_recipient_created_index, migrations.RunPython.noop),
+    ]
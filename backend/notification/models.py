@@ -48,6 +48,10 @@ class Notification(models.Model):
         verbose_name = _('Notification')
         verbose_name_plural = _('Notifications')
         ordering = ['-created_at']
+        indexes = [
+            # A recipient's notifications, newest first, for keyset pagination
+            models.Index(fields=['recipient', 'created_at', 'id'], name='notification_page_idx'),
+        ]
     
     def __str__(self):
         return f"{self.notification_type} - {self.title} ({self.recipient.email})"
@@ -114,6 +118,8 @@ class SMSNotification(models.Model):
         ('undelivered', 'Undelivered'),
         ('received', 'Received'),
         ('read', 'Read'),
+        ('retrying', 'Retrying'),
+        ('dead_letter', 'Dead Letter'),
     )
     
     TYPE_CHOICES = (
@@ -169,6 +175,15 @@ class SMSNotification(models.Model):
         null=True,
         help_text=_('Error details if the SMS failed')
     )
+
+    # Retry tracking
+    attempts = models.PositiveIntegerField(_('Attempts'), default=0)
+    next_attempt_at = models.DateTimeField(
+        _('Next Attempt At'),
+        blank=True,
+        null=True,
+        help_text=_('When a retrying SMS is due to be sent again')
+    )
     
     # Timestamps
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
@@ -178,6 +193,178 @@ class SMSNotification(models.Model):
         verbose_name = _('SMS Notification')
         verbose_name_plural = _('SMS Notifications')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='sms_retry_due_idx'),
+            models.Index(fields=['created_at', 'id'], name='sms_page_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.notification_type} to {self.phone_number} ({self.status})"
\ No newline at end of file
+        return f"{self.notification_type} to {self.phone_number} ({self.status})"
+
+
+class ScheduledReminder(models.Model):
+    """
+    Reminder due for an upcoming appointment.
+
+    Rows are written when an appointment is created or rescheduled, with
+    ``due_at`` derived from the client's reminder lead time, and are claimed
+    by the reminder worker once they fall due.
+    """
+    STATE_CHOICES = (
+        ('pending', 'Pending'),
+        ('claimed', 'Claimed'),
+        ('sent', 'Sent'),
+        ('cancelled', 'Cancelled'),
+        ('failed', 'Failed'),
+    )
+
+    appointment = models.OneToOneField(
+        'backend_common.Appointment',
+        on_delete=models.CASCADE,
+        related_name='scheduled_reminder',
+        verbose_name=_('Appointment')
+    )
+    due_at = models.DateTimeField(_('Due At'))
+    state = models.CharField(
+        _('State'),
+        max_length=20,
+        choices=STATE_CHOICES,
+        default='pending'
+    )
+    claimed_at = models.DateTimeField(_('Claimed At'), blank=True, null=True)
+    sent_at = models.DateTimeField(_('Sent At'), blank=True, null=True)
+    error_message = models.TextField(
+        _('Error Message'),
+        blank=True,
+        null=True,
+        help_text=_('Error details if the reminder failed')
+    )
+
+    # Timestamps
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Scheduled Reminder')
+        verbose_name_plural = _('Scheduled Reminders')
+        ordering = ['due_at']
+        indexes = [
+            models.Index(fields=['state', 'due_at'], name='reminder_state_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reminder for appointment {self.appointment_id} due {self.due_at} ({self.state})"
+
+class Broadcast(models.Model):
+    """
+    Marketing message sent to an audience of clients in throttled chunks.
+
+    Progress is checkpointed after every chunk so an interrupted run resumes
+    from the last recipient it reached.
+    """
+    AUDIENCE_CHOICES = (
+        ('all_clients', 'All Active Clients'),
+        ('lapsed_clients', 'Clients With No Recent Visit'),
+    )
+
+    CHANNEL_CHOICES = (
+        ('sms', 'SMS'),
+        ('email', 'Email'),
+    )
+
+    STATUS_CHOICES = (
+        ('draft', 'Draft'),
+        ('running', 'Running'),
+        ('paused', 'Paused'),
+        ('cancelled', 'Cancelled'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    name = models.CharField(_('Name'), max_length=255)
+    audience = models.CharField(_('Audience'), max_length=50, choices=AUDIENCE_CHOICES)
+    audience_params = models.JSONField(
+        _('Audience Parameters'),
+        default=dict,
+        blank=True,
+        help_text=_('Audience options, e.g. {"days": 60} for lapsed clients')
+    )
+    channel = models.CharField(_('Channel'), max_length=20, choices=CHANNEL_CHOICES)
+    subject = models.CharField(_('Subject'), max_length=255, blank=True, help_text=_('Email subject'))
+    message = models.TextField(_('Message'))
+    status = models.CharField(_('Status'), max_length=20, choices=STATUS_CHOICES, default='draft')
+
+    # Throttling
+    chunk_size = models.PositiveIntegerField(_('Chunk Size'), default=100)
+    rate_per_second = models.FloatField(_('Messages Per Second'), default=10)
+
+    # Progress checkpoint
+    last_recipient_id = models.BigIntegerField(_('Last Recipient ID'), default=0)
+    sent_count = models.PositiveIntegerField(_('Sent'), default=0)
+    failed_count = models.PositiveIntegerField(_('Failed'), default=0)
+    skipped_count = models.PositiveIntegerField(_('Skipped'), default=0)
+    elapsed_seconds = models.FloatField(_('Elapsed Seconds'), default=0)
+    error_message = models.TextField(_('Error Message'), blank=True, null=True)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='broadcasts',
+        verbose_name=_('Created By'),
+        null=True,
+        blank=True
+    )
+
+    # Timestamps
+    started_at = models.DateTimeField(_('Started At'), blank=True, null=True)
+    finished_at = models.DateTimeField(_('Finished At'), blank=True, null=True)
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Broadcast')
+        verbose_name_plural = _('Broadcasts')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} via {self.channel} ({self.status})"
+
+    @property
+    def processed_count(self):
+        return self.sent_count + self.failed_count + self.skipped_count
+
+    @property
+    def throughput(self):
+        """
+        Messages processed per second of sending time.
+        """
+        if not self.elapsed_seconds:
+            return 0.0
+        return round(self.processed_count / self.elapsed_seconds, 2)
+
+class NotificationCounter(models.Model):
+    """
+    Denormalised count of a user's unread notifications.
+
+    Maintained with atomic F() updates whenever notifications are created,
+    marked as read or deleted, so unread badges never scan the notification
+    table. The reconcile_unread_counts command repairs any drift.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter',
+        verbose_name=_('User')
+    )
+    unread_count = models.IntegerField(_('Unread Count'), default=0)
+
+    # Timestamps
+    updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Notification Counter')
+        verbose_name_plural = _('Notification Counters')
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread_count} unread"
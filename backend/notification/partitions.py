@@ -0,0 +1,232 @@
+import logging
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Notification, SMSNotification
+
+logger = logging.getLogger(__name__)
+
+# Tables range-partitioned by month on created_at (see migration 0005)
+PARTITIONED_MODELS = (Notification, SMSNotification)
+
+# Months of notifications kept by the purge_notifications command
+RETENTION_MONTHS = getattr(settings, 'NOTIFICATION_RETENTION_MONTHS', 12)
+
+# Months of empty partitions created ahead of time
+PARTITIONS_AHEAD = getattr(settings, 'NOTIFICATION_PARTITIONS_AHEAD', 3)
+
+PARTITION_SUFFIX = re.compile(r'_p(\d{4})_(\d{2})$')
+
+def is_partitioned():
+    """
+    Check whether notifications are stored in partitioned tables.
+    """
+    return connection.vendor == 'postgresql'
+
+def month_start(value):
+    """
+    Get midnight UTC on the first day of the month containing value.
+    """
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+def add_months(month, count):
+    """
+    Move a month_start() value by a number of months.
+    """
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+def list_partitions(table):
+    """
+    List the monthly partitions attached to a table.
+
+    Returns:
+        list: (partition name, month start) tuples ordered by month
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+        """, [table])
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_SUFFIX.search(name)
+        if match:
+            month = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc)
+            partitions.append((name, month))
+
+    return sorted(partitions, key=lambda partition: partition[1])
+
+def create_partition(table, month):
+    """
+    Create and attach the partition for one month.
+
+    Rows for that month that landed in the default partition are moved into
+    the new partition first, since Postgres refuses to attach it otherwise.
+
+    Args:
+        table: Name of the partitioned table
+        month: month_start() of the month to create
+
+    Returns:
+        str: Name of the partition
+    """
+    name = partition_name(table, month)
+    upper = add_months(month, 1)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM "{table}_default"
+                WHERE created_at >= %s AND created_at < %s
+                RETURNING *
+            )
+            INSERT INTO "{name}" SELECT * FROM moved
+        """, [month, upper])
+        cursor.execute(
+            f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+            [month, upper]
+        )
+
+    logger.info(f"Created partition {name}")
+    return name
+
+def ensure_partitions(months_ahead=None, now=None):
+    """
+    Create any missing partitions from the current month onwards.
+
+    Args:
+        months_ahead: Months after the current one to prepare (default: PARTITIONS_AHEAD)
+        now: Current time (default: timezone.now())
+
+    Returns:
+        list: Names of the partitions created
+    """
+    if not is_partitioned():
+        return []
+
+    months_ahead = PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(now or timezone.now())
+
+    created = []
+    for model in PARTITIONED_MODELS:
+        table = model._meta.db_table
+        existing = {month for _, month in list_partitions(table)}
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                created.append(create_partition(table, month))
+
+    return created
+
+def _unread_counts_in(table, where, params):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT recipient_id, COUNT(*) FROM "{table}" WHERE NOT is_read AND {where} GROUP BY recipient_id',
+            params
+        )
+        return dict(cursor.fetchall())
+
+def purge_before(cutoff, dry_run=False):
+    """
+    Remove notifications created before the start of cutoff's month.
+
+    On Postgres whole monthly partitions are detached and dropped, which is
+    instant whatever their size; only stragglers in the default partition
+    are deleted row by row. Elsewhere a single set-based DELETE is issued per
+    table. Unread counters are reduced by the unread notifications removed.
+
+    Args:
+        cutoff: Notifications from months before this one are removed
+        dry_run: Only report what would be removed
+
+    Returns:
+        dict: Mapping of table name to the partitions dropped (or, without
+            partitioning, the number of rows deleted)
+    """
+    from .counters import adjust_unread_count
+
+    boundary = month_start(cutoff)
+    notification_table = Notification._meta.db_table
+    results = {}
+
+    for model in PARTITIONED_MODELS:
+        table = model._meta.db_table
+
+        if not is_partitioned():
+            expired = model.objects.filter(created_at__lt=boundary)
+            if dry_run:
+                results[table] = expired.count()
+                continue
+
+            with transaction.atomic():
+                unread = {}
+                if table == notification_table:
+                    unread = _unread_counts_in(table, 'created_at < %s', [boundary])
+                results[table], _ = expired.delete()
+                for user_id, count in unread.items():
+                    adjust_unread_count(user_id, -count)
+            continue
+
+        expired = [name for name, month in list_partitions(table) if add_months(month, 1) <= boundary]
+        results[table] = expired
+        if dry_run:
+            continue
+
+        for name in expired:
+            with transaction.atomic(), connection.cursor() as cursor:
+                unread = _unread_counts_in(name, 'TRUE', []) if table == notification_table else {}
+                cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+                cursor.execute(f'DROP TABLE "{name}"')
+                for user_id, count in unread.items():
+                    adjust_unread_count(user_id, -count)
+            logger.info(f"Dropped partition {name}")
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            unread = {}
+            if table == notification_table:
+                unread = _unread_counts_in(f"{table}_default", 'created_at < %s', [boundary])
+            cursor.execute(f'DELETE FROM "{table}_default" WHERE created_at < %s', [boundary])
+            for user_id, count in unread.items():
+                adjust_unread_count(user_id, -count)
+
+    return results
+
+def recent(queryset, request):
+    """
+    Limit a notification queryset to the window asked for with ?days=.
+
+    Lists return the whole history by default, so they agree with the
+    unread counter. Clients that only show recent notifications pass
+    ?days=, and filtering on created_at lets Postgres prune partitions
+    outside the window instead of scanning the whole history.
+
+    Args:
+        queryset: Notification or SMSNotification queryset
+        request: The request
+
+    Returns:
+        QuerySet: The filtered queryset, unchanged without a valid ?days=
+    """
+    try:
+        days = int(request.query_params.get('days', ''))
+    except ValueError:
+        return queryset
+    if days <= 0:
+        return queryset
+    days = min(days, RETENTION_MONTHS * 31)
+    return queryset.filter(created_at__gte=timezone.now() - timedelta(days=days))
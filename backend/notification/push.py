@@ -0,0 +1,246 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel every process LISTENs on
+PUSH_CHANNEL = getattr(settings, 'NOTIFICATION_PUSH_CHANNEL', 'barberian_events')
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+
+# Seconds between reconnection attempts after the listener loses its connection
+LISTEN_RETRY_SECONDS = 5
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Seconds a stream ticket can be used to open a stream
+STREAM_TICKET_SECONDS = getattr(settings, 'NOTIFICATION_STREAM_TICKET_SECONDS', 60)
+
+STREAM_TICKET_SALT = 'notification-stream'
+
+def _encode(user_ids, event, data):
+    return json.dumps(
+        {'users': sorted(set(user_ids)), 'event': event, 'data': data},
+        cls=DjangoJSONEncoder
+    )
+
+def publish_event(user_ids, event, data):
+    """
+    Push an event to the given users once the current transaction commits.
+
+    On Postgres the event goes out through ``pg_notify`` so every ASGI process
+    receives it, whichever process made the change. On other databases it is
+    only delivered to subscribers in this process.
+
+    Args:
+        user_ids: IDs of the users the event is for
+        event: Event name (e.g., 'notification', 'appointment')
+        data: JSON-serialisable event data
+    """
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if not user_ids:
+        return
+
+    payload = _encode(user_ids, event, data)
+    if len(payload.encode('utf-8')) > MAX_PAYLOAD_BYTES:
+        # Too large to NOTIFY; clients refetch the object on a bare event
+        payload = _encode(user_ids, event, {'id': data.get('id'), 'truncated': True})
+
+    def send():
+        try:
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_notify(%s, %s)", [PUSH_CHANNEL, payload])
+            else:
+                broker.dispatch(payload)
+        except Exception as e:
+            logger.error(f"Error publishing {event} event: {str(e)}")
+
+    transaction.on_commit(send)
+
+class PushBroker:
+    """
+    Fans events out to the server-sent event streams open in this process.
+
+    A single background thread holds one dedicated Postgres connection that
+    LISTENs on PUSH_CHANNEL and hands each event to the asyncio queues of the
+    matching subscribers, so open streams cost no database queries at all.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, user_id):
+        """
+        Register a stream for a user.
+
+        Must be called from the event loop that will read the queue.
+
+        Returns:
+            asyncio.Queue: Queue receiving (event, data) tuples
+        """
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add((loop, queue))
+
+        self._ensure_listener()
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            streams = self._subscribers.get(user_id, set())
+            streams.discard((asyncio.get_running_loop(), queue))
+            if not streams:
+                self._subscribers.pop(user_id, None)
+
+    def dispatch(self, payload):
+        """
+        Deliver a raw NOTIFY payload to the subscribed streams.
+        """
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.error("Ignoring malformed push payload")
+            return
+
+        event = (message['event'], message['data'])
+        with self._lock:
+            targets = [
+                stream
+                for user_id in message['users']
+                for stream in self._subscribers.get(user_id, ())
+            ]
+
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(self._put, queue, event)
+
+    @staticmethod
+    def _put(queue, event):
+        if queue.full():
+            # Slow client; drop its oldest event rather than block the broker
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def _ensure_listener(self):
+        if connection.vendor != 'postgresql':
+            return
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._listen_forever, name='push-listener', daemon=True)
+                self._thread.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                logger.error(f"Push listener error, reconnecting: {str(e)}")
+            threading.Event().wait(LISTEN_RETRY_SECONDS)
+
+    def _listen(self):
+        """
+        LISTEN on a dedicated connection and dispatch events until it fails.
+
+        The connection is closed whatever the failure, so reconnecting never
+        leaves the previous one open.
+        """
+        import psycopg2
+        import psycopg2.extensions
+
+        db = settings.DATABASES['default']
+        conn = psycopg2.connect(
+            dbname=db['NAME'],
+            user=db.get('USER') or None,
+            password=db.get('PASSWORD') or None,
+            host=db.get('HOST') or None,
+            port=db.get('PORT') or None,
+        )
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{PUSH_CHANNEL}"')
+
+            logger.info(f"Listening for push events on {PUSH_CHANNEL}")
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self.dispatch(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+broker = PushBroker()
+
+def notification_event(notification):
+    """
+    Build the push payload for an in-app notification.
+    """
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'reference_id': notification.reference_id,
+        'created_at': notification.created_at,
+    }
+
+def appointment_event(appointment):
+    """
+    Build the push payload for an appointment change.
+    """
+    return {
+        'id': appointment.id,
+        'status': appointment.status,
+        'start_time': appointment.start_time,
+        'end_time': appointment.end_time,
+        'client': appointment.client_id,
+        'staff': appointment.staff_id,
+        'service': appointment.service_id,
+    }
+
+def issue_stream_ticket(user):
+    """
+    Issue a ticket that opens the user's notification stream.
+
+    EventSource cannot send an Authorization header, so the stream URL
+    carries this ticket instead of the access token: it is signed for this
+    one purpose only and expires after STREAM_TICKET_SECONDS, so one leaked
+    through proxy or access logs is of little use.
+
+    Args:
+        user: The authenticated user
+
+    Returns:
+        str: The ticket
+    """
+    return signing.dumps({'user': user.pk}, salt=STREAM_TICKET_SALT)
+
+def get_stream_ticket_user(ticket):
+    """
+    Get the active user a stream ticket was issued to.
+
+    Returns:
+        User: The user, or None if the ticket is invalid or expired
+    """
+    try:
+        payload = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=STREAM_TICKET_SECONDS)
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=payload.get('user'), is_active=True).first()
@@ -0,0 +1,288 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from backend.client.models import ClientPreference
+from .models import ScheduledReminder
+from .channels import preload_preferences
+from .messages import MessageContext
+
+logger = logging.getLogger(__name__)
+
+# Lead time used when a client has no ClientPreference row
+DEFAULT_REMINDER_HOURS = getattr(settings, 'APPOINTMENT_REMINDER_HOURS', 24)
+
+# Claimed reminders older than this are assumed to belong to a dead worker
+REMINDER_CLAIM_TIMEOUT = timedelta(
+    minutes=getattr(settings, 'APPOINTMENT_REMINDER_CLAIM_TIMEOUT_MINUTES', 10)
+)
+
+# Appointment statuses that keep a reminder scheduled
+REMINDABLE_STATUSES = ('pending', 'confirmed')
+
+def get_reminder_lead_time(client, default_hours=None):
+    """
+    Get how long before an appointment the client wants to be reminded.
+
+    Args:
+        client: User instance of the client
+        default_hours: Fallback lead time in hours (default: DEFAULT_REMINDER_HOURS)
+
+    Returns:
+        timedelta: The reminder lead time
+    """
+    hours = default_hours if default_hours is not None else DEFAULT_REMINDER_HOURS
+
+    try:
+        hours = client.preferences.reminder_time
+    except ClientPreference.DoesNotExist:
+        pass
+
+    return timedelta(hours=hours)
+
+def schedule_appointment_reminder(appointment, rescheduled=False, default_hours=None):
+    """
+    Create or update the scheduled reminder for an appointment.
+
+    Args:
+        appointment: The appointment to schedule a reminder for
+        rescheduled: Whether the appointment start time changed, which re-arms
+            a reminder that was already sent
+        default_hours: Fallback lead time in hours for clients without preferences
+
+    Returns:
+        ScheduledReminder: The scheduled reminder, or None if no reminder is needed
+    """
+    if appointment.status not in REMINDABLE_STATUSES or appointment.start_time <= timezone.now():
+        cancel_appointment_reminder(appointment)
+        return None
+
+    due_at = appointment.start_time - get_reminder_lead_time(appointment.client, default_hours)
+
+    reminder = ScheduledReminder.objects.filter(appointment=appointment).first()
+    if reminder is None:
+        return ScheduledReminder.objects.create(appointment=appointment, due_at=due_at)
+
+    if reminder.state == 'sent' and not rescheduled:
+        # Already reminded for this start time
+        return reminder
+
+    reminder.due_at = due_at
+    reminder.state = 'pending'
+    reminder.claimed_at = None
+    reminder.sent_at = None
+    reminder.error_message = None
+    reminder.save()
+    return reminder
+
+def reschedule_client_reminders(client_id, hours=None):
+    """
+    Move a client's pending reminders to a new reminder lead time.
+
+    Args:
+        client_id: ID of the client
+        hours: Lead time in hours (default: DEFAULT_REMINDER_HOURS)
+
+    Returns:
+        int: Number of reminders moved
+    """
+    lead_time = timedelta(hours=hours if hours is not None else DEFAULT_REMINDER_HOURS)
+    now = timezone.now()
+
+    reminders = []
+    for reminder in ScheduledReminder.objects.filter(
+        appointment__client_id=client_id,
+        appointment__start_time__gt=now,
+        state='pending'
+    ).select_related('appointment'):
+        due_at = reminder.appointment.start_time - lead_time
+        if reminder.due_at != due_at:
+            reminder.due_at = due_at
+            reminder.updated_at = now
+            reminders.append(reminder)
+
+    ScheduledReminder.objects.bulk_update(reminders, ['due_at', 'updated_at'])
+    return len(reminders)
+
+def cancel_appointment_reminder(appointment):
+    """
+    Cancel any outstanding reminder for an appointment.
+
+    Args:
+        appointment: The appointment whose reminder should be cancelled
+
+    Returns:
+        int: Number of reminders cancelled
+    """
+    return ScheduledReminder.objects.filter(
+        appointment=appointment,
+        state__in=['pending', 'claimed']
+    ).update(state='cancelled', updated_at=timezone.now())
+
+def claim_due_reminders(batch_size=100, now=None):
+    """
+    Claim a batch of due reminders for this worker.
+
+    Due rows are locked with ``SELECT ... FOR UPDATE SKIP LOCKED`` so that
+    concurrent workers never claim the same reminder, then flagged as claimed
+    before the lock is released. Reminders claimed by a worker that died are
+    reclaimed once REMINDER_CLAIM_TIMEOUT has passed.
+
+    Args:
+        batch_size: Maximum number of reminders to claim
+        now: Current time (default: timezone.now())
+
+    Returns:
+        list: Claimed ScheduledReminder instances with their appointment loaded
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        reminder_ids = list(
+            ScheduledReminder.objects.select_for_update(skip_locked=True).filter(
+                Q(state='pending') |
+                Q(state='claimed', claimed_at__lt=now - REMINDER_CLAIM_TIMEOUT),
+                due_at__lte=now
+            ).order_by('due_at').values_list('id', flat=True)[:batch_size]
+        )
+
+        if not reminder_ids:
+            return []
+
+        ScheduledReminder.objects.filter(id__in=reminder_ids).update(
+            state='claimed',
+            claimed_at=now,
+            updated_at=now
+        )
+
+    return list(
+        ScheduledReminder.objects.filter(id__in=reminder_ids).select_related(
+            'appointment__client', 'appointment__staff', 'appointment__service'
+        ).order_by('due_at')
+    )
+
+def send_scheduled_reminder(reminder, now=None):
+    """
+    Send a claimed reminder as an in-app notification and SMS.
+
+    Args:
+        reminder: A claimed ScheduledReminder instance
+        now: Current time (default: timezone.now())
+
+    Returns:
+        bool: True if the reminder was sent, False if it was skipped
+    """
+    from .utils import send_notification, send_sms_notification
+
+    now = now or timezone.now()
+    appointment = reminder.appointment
+
+    # Only confirmed appointments that have not started yet are reminded
+    if appointment.status != 'confirmed' or appointment.start_time <= now:
+        reminder.state = 'cancelled'
+        reminder.save(update_fields=['state', 'updated_at'])
+        return False
+
+    context = MessageContext(appointment)
+    texts = context.render('appointment_reminder', 'client')
+
+    send_notification(
+        recipient=appointment.client,
+        title=texts['title'],
+        message=texts['in_app'],
+        notification_type='appointment_reminder',
+        reference_id=context.reference_id
+    )
+
+    if appointment.client.phone_number:
+        send_sms_notification(
+            recipient=appointment.client,
+            phone_number=appointment.client.phone_number,
+            message=texts['sms'],
+            notification_type='appointment_reminder',
+            reference_id=context.reference_id
+        )
+
+    reminder.state = 'sent'
+    reminder.sent_at = now
+    reminder.save(update_fields=['state', 'sent_at', 'updated_at'])
+    return True
+
+def process_due_reminders(batch_size=100, max_batches=None):
+    """
+    Claim and send due reminders in batches until none are left.
+
+    Each run costs a claim query per batch plus the sends themselves, so it
+    scales with the number of due reminders rather than with the number of
+    upcoming appointments.
+
+    Args:
+        batch_size: Number of reminders to claim per batch
+        max_batches: Optional limit on the number of batches to process
+
+    Returns:
+        dict: Summary of reminder results
+    """
+    results = {
+        'sent': 0,
+        'skipped': 0,
+        'failed': 0,
+        'total': 0,
+    }
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        reminders = claim_due_reminders(batch_size=batch_size)
+        if not reminders:
+            break
+
+        batches += 1
+        results['total'] += len(reminders)
+
+        # Resolve channel preferences for the whole batch up front
+        preload_preferences(reminder.appointment.client for reminder in reminders)
+
+        for reminder in reminders:
+            try:
+                if send_scheduled_reminder(reminder):
+                    results['sent'] += 1
+                else:
+                    results['skipped'] += 1
+            except Exception as e:
+                logger.error(f"Error sending reminder for appointment {reminder.appointment_id}: {str(e)}")
+                reminder.state = 'failed'
+                reminder.error_message = str(e)
+                reminder.save(update_fields=['state', 'error_message', 'updated_at'])
+                results['failed'] += 1
+
+    return results
+
+def backfill_scheduled_reminders(default_hours=None):
+    """
+    Schedule reminders for upcoming appointments that do not have one yet.
+
+    Args:
+        default_hours: Fallback lead time in hours for clients without preferences
+
+    Returns:
+        int: Number of reminders scheduled
+    """
+    from backend.common.models import Appointment
+
+    appointments = Appointment.objects.filter(
+        status__in=REMINDABLE_STATUSES,
+        start_time__gt=timezone.now(),
+        scheduled_reminder__isnull=True
+    ).select_related('client__preferences')
+
+    reminders = []
+    for appointment in appointments.iterator():
+        due_at = appointment.start_time - get_reminder_lead_time(appointment.client, default_hours)
+        reminders.append(ScheduledReminder(appointment=appointment, due_at=due_at))
+
+    ScheduledReminder.objects.bulk_create(reminders, batch_size=500, ignore_conflicts=True)
+    return len(reminders)
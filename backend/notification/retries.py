@@ -0,0 +1,232 @@
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from backend.utils.circuit import CircuitOpenError
+from backend.utils.sms import create_twilio_message, is_retryable_error, describe_sms_error, TWILIO_TIMEOUT_SECONDS
+from .models import SMSNotification
+
+logger = logging.getLogger(__name__)
+
+# Attempts before an SMS is moved to the dead-letter state
+SMS_MAX_ATTEMPTS = getattr(settings, 'SMS_MAX_ATTEMPTS', 5)
+
+# Backoff before the first retry, doubled on every further attempt
+SMS_RETRY_BASE_SECONDS = getattr(settings, 'SMS_RETRY_BASE_SECONDS', 30)
+
+# Upper bound on the backoff
+SMS_RETRY_MAX_SECONDS = getattr(settings, 'SMS_RETRY_MAX_SECONDS', 3600)
+
+# How long a claimed retry is hidden from other workers
+SMS_RETRY_LEASE = timedelta(minutes=5)
+
+# Statuses an admin can put back on the retry queue
+REQUEUEABLE_STATUSES = ('dead_letter', 'failed', 'undelivered')
+
+def get_retry_delay(attempts, rng=random):
+    """
+    Get the backoff before the next attempt, with jitter.
+
+    The delay doubles with every attempt up to SMS_RETRY_MAX_SECONDS; half of
+    it is randomised so that messages failing together do not retry together.
+
+    Args:
+        attempts: Number of attempts made so far
+        rng: Random number source (default: the random module)
+
+    Returns:
+        timedelta: Time to wait before the next attempt
+    """
+    delay = min(SMS_RETRY_MAX_SECONDS, SMS_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return timedelta(seconds=delay / 2 + rng.uniform(0, delay / 2))
+
+def record_sms_failure(sms_notification, error_message, now=None):
+    """
+    Schedule a retry for a failed send, or dead-letter it after SMS_MAX_ATTEMPTS.
+
+    Args:
+        sms_notification: The SMSNotification whose last attempt failed
+        error_message: Description of the failure
+        now: Current time (default: timezone.now())
+    """
+    now = now or timezone.now()
+    sms_notification.error_message = error_message
+
+    if sms_notification.attempts >= SMS_MAX_ATTEMPTS:
+        sms_notification.status = 'dead_letter'
+        sms_notification.next_attempt_at = None
+        logger.warning(f"SMS {sms_notification.id} dead-lettered after {sms_notification.attempts} attempts: {error_message}")
+    else:
+        sms_notification.status = 'retrying'
+        sms_notification.next_attempt_at = now + get_retry_delay(sms_notification.attempts)
+
+    sms_notification.save(update_fields=['status', 'error_message', 'next_attempt_at', 'updated_at'])
+
+def fail_sms(sms_notification, error_message):
+    """
+    Mark an SMS as failed for good, e.g. after Twilio rejected the number.
+
+    Args:
+        sms_notification: The SMSNotification whose last attempt failed
+        error_message: Description of the failure
+    """
+    sms_notification.status = 'failed'
+    sms_notification.error_message = error_message
+    sms_notification.next_attempt_at = None
+    sms_notification.save(update_fields=['status', 'error_message', 'next_attempt_at', 'updated_at'])
+    logger.warning(f"SMS {sms_notification.id} failed permanently: {error_message}")
+
+def defer_sms(sms_notification, delay, reason):
+    """
+    Put an SMS on the retry queue without counting an attempt.
+
+    Args:
+        sms_notification: The SMSNotification to defer
+        delay: Seconds to wait before sending
+        reason: Why the message was deferred
+    """
+    sms_notification.status = 'retrying'
+    sms_notification.error_message = reason
+    sms_notification.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    sms_notification.save(update_fields=['status', 'error_message', 'next_attempt_at', 'updated_at'])
+
+def attempt_sms_delivery(sms_notification):
+    """
+    Make one attempt to send an SMS through Twilio.
+
+    While the Twilio circuit is open, or half-open with another sender
+    holding the probe, the message is queued for later instead and the
+    attempt is not counted. Transient errors
+    (timeouts, connection errors, 429 and 5xx responses) are retried with
+    backoff; any other error fails the message at once.
+
+    Args:
+        sms_notification: The SMSNotification to send
+
+    Returns:
+        str: The Twilio message SID if successful, None otherwise
+    """
+    try:
+        twilio_sid = create_twilio_message(
+            to_phone_number=sms_notification.phone_number,
+            message=sms_notification.message
+        )
+    except CircuitOpenError as e:
+        # A half-open probe settles within the Twilio timeout
+        defer_sms(sms_notification, max(e.retry_after, TWILIO_TIMEOUT_SECONDS), "Twilio circuit open; queued for retry")
+        return None
+    except Exception as e:
+        sms_notification.attempts += 1
+        sms_notification.save(update_fields=['attempts', 'updated_at'])
+        if is_retryable_error(e):
+            record_sms_failure(sms_notification, describe_sms_error(e))
+        else:
+            fail_sms(sms_notification, describe_sms_error(e))
+        return None
+
+    sms_notification.attempts += 1
+    sms_notification.twilio_sid = twilio_sid
+    sms_notification.status = 'sent'
+    sms_notification.error_message = None
+    sms_notification.next_attempt_at = None
+    sms_notification.save(update_fields=[
+        'attempts', 'twilio_sid', 'status', 'error_message', 'next_attempt_at', 'updated_at'
+    ])
+    return twilio_sid
+
+def claim_due_retries(batch_size=100, now=None):
+    """
+    Claim a batch of SMS notifications whose retry is due.
+
+    Rows are locked with ``SELECT ... FOR UPDATE SKIP LOCKED`` and leased by
+    pushing next_attempt_at forward, so concurrent workers never send the same
+    message twice and a crashed worker's messages come back after SMS_RETRY_LEASE.
+
+    Args:
+        batch_size: Maximum number of messages to claim
+        now: Current time (default: timezone.now())
+
+    Returns:
+        list: Claimed SMSNotification instances
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        sms_ids = list(
+            SMSNotification.objects.select_for_update(skip_locked=True).filter(
+                status='retrying',
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at').values_list('id', flat=True)[:batch_size]
+        )
+
+        if not sms_ids:
+            return []
+
+        SMSNotification.objects.filter(id__in=sms_ids).update(
+            next_attempt_at=now + SMS_RETRY_LEASE,
+            updated_at=now
+        )
+
+    return list(SMSNotification.objects.filter(id__in=sms_ids).order_by('next_attempt_at'))
+
+def process_sms_retries(batch_size=100, max_batches=None):
+    """
+    Retry due SMS notifications in batches until none are left.
+
+    Args:
+        batch_size: Number of messages claimed per batch
+        max_batches: Optional limit on the number of batches to process
+
+    Returns:
+        dict: Summary of retry results
+    """
+    results = {
+        'sent': 0,
+        'retrying': 0,
+        'failed': 0,
+        'dead_letter': 0,
+        'total': 0,
+    }
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        messages = claim_due_retries(batch_size=batch_size)
+        if not messages:
+            break
+
+        batches += 1
+        results['total'] += len(messages)
+
+        for sms_notification in messages:
+            if attempt_sms_delivery(sms_notification):
+                results['sent'] += 1
+            else:
+                results[sms_notification.status] += 1
+
+    return results
+
+def requeue_sms(queryset):
+    """
+    Put failed or dead-lettered SMS notifications back on the retry queue.
+
+    Attempts are reset so each message gets a full set of retries again.
+
+    Args:
+        queryset: SMSNotification queryset to requeue; rows in other
+            statuses are left alone
+
+    Returns:
+        int: Number of messages requeued
+    """
+    now = timezone.now()
+    return queryset.filter(status__in=REQUEUEABLE_STATUSES).update(
+        status='retrying',
+        attempts=0,
+        next_attempt_at=now,
+        error_message=None,
+        updated_at=now
+    )
@@ -1,12 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
-from .models import Notification, NotificationPreference, SMSNotification
-from barberian.common.serializers import UserSerializer
+from .models import Notification, NotificationPreference, SMSNotification, Broadcast
+from barberian.common.serializers import UserSerializer, UserValuesSerializer
+from barberian.utils.eager_loading import EagerLoadingMixin
+from barberian.utils.sparse_fields import SparseFieldsetsMixin
+from barberian.utils.values_serializers import ValuesSerializer
 
 User = get_user_model()
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the Notification model.
     """
@@ -21,7 +24,14 @@ class NotificationSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
-class NotificationPreferenceSerializer(serializers.ModelSerializer):
+class NotificationValuesSerializer(ValuesSerializer):
+    """
+    values() fast path for NotificationSerializer.
+    """
+    serializer_class = NotificationSerializer
+    nested = {'recipient_details': UserValuesSerializer}
+
+class NotificationPreferenceSerializer(SparseFieldsetsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the NotificationPreference model.
     """
@@ -35,7 +45,7 @@ class NotificationPreferenceSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
-class SMSNotificationSerializer(serializers.ModelSerializer):
+class SMSNotificationSerializer(SparseFieldsetsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """
     Serializer for the SMSNotification model.
     """
@@ -46,9 +56,10 @@ class SMSNotificationSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'recipient', 'recipient_details', 'phone_number', 
             'message', 'status', 'twilio_sid', 'notification_type', 
-            'reference_id', 'error_message', 'created_at', 'updated_at'
+            'reference_id', 'error_message', 'attempts', 'next_attempt_at',
+            'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'attempts', 'next_attempt_at', 'created_at', 'updated_at']
 
 class SMSManualSendSerializer(serializers.Serializer):
     """
@@ -68,4 +79,44 @@ class SMSStatusUpdateSerializer(serializers.Serializer):
     Serializer for updating SMS status.
     """
     sms_id = serializers.IntegerField(required=False)
-    max_age_hours = serializers.IntegerField(required=False, default=24)
\ No newline at end of file
+    max_age_hours = serializers.IntegerField(required=False, default=24)
+
+class BroadcastSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the Broadcast model.
+    """
+    processed_count = serializers.IntegerField(read_only=True)
+    throughput = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Broadcast
+        fields = [
+            'id', 'name', 'audience', 'audience_params', 'channel', 'subject',
+            'message', 'status', 'chunk_size', 'rate_per_second',
+            'last_recipient_id', 'sent_count', 'failed_count', 'skipped_count',
+            'processed_count', 'elapsed_seconds', 'throughput', 'error_message',
+            'created_by', 'started_at', 'finished_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'last_recipient_id', 'sent_count', 'failed_count',
+            'skipped_count', 'elapsed_seconds', 'error_message', 'created_by',
+            'started_at', 'finished_at', 'created_at', 'updated_at'
+        ]
+
+    def validate_status(self, value):
+        # Only pausing or cancelling a broadcast can be requested through the API
+        if self.instance is None:
+            return 'draft'
+        if value != self.instance.status:
+            if value not in ('paused', 'cancelled'):
+                raise serializers.ValidationError("Broadcasts can only be paused or cancelled through the API.")
+            if self.instance.status in ('completed', 'cancelled'):
+                raise serializers.ValidationError(f"The broadcast is already {self.instance.status}.")
+        return value
+
+    def validate(self, data):
+        channel = data.get('channel', getattr(self.instance, 'channel', None))
+        subject = data.get('subject', getattr(self.instance, 'subject', ''))
+        if channel == 'email' and not subject:
+            raise serializers.ValidationError({"subject": "A subject is required for email broadcasts."})
+        return data
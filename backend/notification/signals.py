@@ -1,10 +1,18 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
 from backend.common.models import Appointment
-from .models import Notification, SMSNotification
-from .utils import send_sms_notification
+from backend.client.models import ClientPreference
+from backend.staff.models import StaffSettings
+from .models import Notification, SMSNotification, NotificationPreference
+from .utils import send_notification, send_sms_notification
+from .reminders import schedule_appointment_reminder, reschedule_client_reminders
+from .channels import invalidate_preferences
+from .counters import adjust_unread_count
+from .push import publish_event, notification_event, appointment_event
+from .messages import MessageContext
+from .batching import get_active_batch
 
 User = get_user_model()
 
@@ -15,14 +23,75 @@ def appointment_post_save_handler(sender, instance, created, **kwargs):
     """
     Signal handler for appointment creation and updates.
     Creates notifications for both client and staff.
+    Inside batch_appointment_changes() the change is only recorded.
     """
+    batch = get_active_batch()
+    if batch is not None:
+        batch.record(instance, created)
+        return
+
     if created:
         # New appointment created
         create_appointment_created_notifications(instance)
+        schedule_appointment_reminder(instance)
+        publish_event([instance.client_id, instance.staff_id], 'appointment', appointment_event(instance))
     else:
         # Appointment updated
+        dirty_fields = instance.get_dirty_fields()
         create_appointment_updated_notifications(instance)
 
+        # Keep the scheduled reminder in step with the start time and status
+        if 'start_time' in dirty_fields:
+            schedule_appointment_reminder(instance, rescheduled=True)
+        elif 'status' in dirty_fields:
+            schedule_appointment_reminder(instance)
+
+        publish_event([instance.client_id, instance.staff_id], 'appointment', appointment_event(instance))
+
+# Notification signals to keep unread counters and push streams in step
+
+@receiver(post_save, sender=Notification)
+def notification_post_save_handler(sender, instance, created, **kwargs):
+    """
+    Count new unread notifications towards the recipient's unread counter
+    and push them to the recipient's open streams. Reads and deletes are
+    counted where they happen, in counters.py.
+    """
+    if created and not instance.is_read:
+        adjust_unread_count(instance.recipient_id, 1)
+
+    if created:
+        publish_event([instance.recipient_id], 'notification', notification_event(instance))
+
+# Preference signals to keep the channel router cache fresh
+
+@receiver(post_save, sender=NotificationPreference)
+@receiver(post_delete, sender=NotificationPreference)
+def notification_preference_changed_handler(sender, instance, **kwargs):
+    invalidate_preferences(instance.user_id)
+
+@receiver(post_save, sender=ClientPreference)
+@receiver(post_delete, sender=ClientPreference)
+def client_preference_changed_handler(sender, instance, **kwargs):
+    invalidate_preferences(instance.client_id)
+
+# Reminder signals to move pending reminders to a new lead time
+
+@receiver(post_save, sender=ClientPreference)
+def client_reminder_time_saved_handler(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'reminder_time' in update_fields:
+        reschedule_client_reminders(instance.client_id, instance.reminder_time)
+
+@receiver(post_delete, sender=ClientPreference)
+def client_reminder_time_deleted_handler(sender, instance, **kwargs):
+    # Back to the default lead time
+    reschedule_client_reminders(instance.client_id)
+
+@receiver(post_save, sender=StaffSettings)
+@receiver(post_delete, sender=StaffSettings)
+def staff_settings_changed_handler(sender, instance, **kwargs):
+    invalidate_preferences(instance.staff_id)
+
 def create_appointment_created_notifications(appointment):
     """
     Create notifications for a new appointment.
@@ -30,22 +99,26 @@ def create_appointment_created_notifications(appointment):
     Args:
         appointment: The appointment instance that was created
     """
+    context = MessageContext(appointment)
+    client_texts = context.render('appointment_created', 'client')
+    staff_texts = context.render('appointment_created', 'staff')
+
     # Notification for the client
-    Notification.objects.create(
+    send_notification(
         recipient=appointment.client,
-        title="New Appointment Booked",
-        message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment.start_time.strftime('%A, %B %d at %I:%M %p')} has been booked successfully.",
+        title=client_texts['title'],
+        message=client_texts['in_app'],
         notification_type="appointment_created",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Notification for the staff
-    Notification.objects.create(
+    send_notification(
         recipient=appointment.staff,
-        title="New Appointment Scheduled",
-        message=f"A new appointment with {appointment.client.get_full_name()} for {appointment.service.name} on {appointment.start_time.strftime('%A, %B %d at %I:%M %p')} has been scheduled.",
+        title=staff_texts['title'],
+        message=staff_texts['in_app'],
         notification_type="appointment_created",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Send SMS if phone numbers are available
@@ -53,9 +126,9 @@ def create_appointment_created_notifications(appointment):
         send_sms_notification(
             recipient=appointment.client,
             phone_number=appointment.client.phone_number,
-            message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment.start_time.strftime('%A, %B %d at %I:%M %p')} has been booked successfully.",
+            message=client_texts['sms'],
             notification_type="appointment_created",
-            reference_id=str(appointment.id)
+            reference_id=context.reference_id
         )
 
 def create_appointment_updated_notifications(appointment):
@@ -93,13 +166,16 @@ def create_appointment_confirmed_notifications(appointment):
     Args:
         appointment: The appointment instance that was confirmed
     """
+    context = MessageContext(appointment)
+    client_texts = context.render('appointment_confirmed', 'client')
+
     # Notification for the client
-    Notification.objects.create(
+    send_notification(
         recipient=appointment.client,
-        title="Appointment Confirmed",
-        message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment.start_time.strftime('%A, %B %d at %I:%M %p')} has been confirmed.",
+        title=client_texts['title'],
+        message=client_texts['in_app'],
         notification_type="appointment_updated",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Send SMS if phone number is available
@@ -107,9 +183,9 @@ def create_appointment_confirmed_notifications(appointment):
         send_sms_notification(
             recipient=appointment.client,
             phone_number=appointment.client.phone_number,
-            message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment.start_time.strftime('%A, %B %d at %I:%M %p')} has been confirmed.",
+            message=client_texts['sms'],
             notification_type="appointment_updated",
-            reference_id=str(appointment.id)
+            reference_id=context.reference_id
         )
 
 def create_appointment_cancelled_notifications(appointment, old_status):
@@ -120,22 +196,26 @@ def create_appointment_cancelled_notifications(appointment, old_status):
         appointment: The appointment instance that was cancelled
         old_status: The previous status of the appointment
     """
+    context = MessageContext(appointment)
+    client_texts = context.render('appointment_cancelled', 'client')
+    staff_texts = context.render('appointment_cancelled', 'staff')
+
     # Notification for the client
-    Notification.objects.create(
+    send_notification(
         recipient=appointment.client,
-        title="Appointment Cancelled",
-        message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment.start_time.strftime('%A, %B %d at %I:%M %p')} has been cancelled.",
+        title=client_texts['title'],
+        message=client_texts['in_app'],
         notification_type="appointment_cancelled",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Notification for the staff (if the client cancelled it)
-    Notification.objects.create(
+    send_notification(
         recipient=appointment.staff,
-        title="Appointment Cancelled",
-        message=f"The appointment with {appointment.client.get_full_name()} for {appointment.service.name} on {appointment.start_time.strftime('%A, %B %d at %I:%M %p')} has been cancelled.",
+        title=staff_texts['title'],
+        message=staff_texts['in_app'],
         notification_type="appointment_cancelled",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Send SMS if phone number is available and the appointment was previously confirmed
@@ -143,9 +223,9 @@ def create_appointment_cancelled_notifications(appointment, old_status):
         send_sms_notification(
             recipient=appointment.client,
             phone_number=appointment.client.phone_number,
-            message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment.start_time.strftime('%A, %B %d at %I:%M %p')} has been cancelled.",
+            message=client_texts['sms'],
             notification_type="appointment_cancelled",
-            reference_id=str(appointment.id)
+            reference_id=context.reference_id
         )
 
 def create_appointment_completed_notifications(appointment):
@@ -155,13 +235,16 @@ def create_appointment_completed_notifications(appointment):
     Args:
         appointment: The appointment instance that was completed
     """
+    context = MessageContext(appointment)
+    client_texts = context.render('appointment_completed', 'client')
+
     # Notification for the client
-    Notification.objects.create(
+    send_notification(
         recipient=appointment.client,
-        title="Appointment Completed",
-        message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} has been completed. We hope you enjoyed your visit!",
+        title=client_texts['title'],
+        message=client_texts['in_app'],
         notification_type="appointment_completed",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Send SMS if phone number is available
@@ -169,9 +252,9 @@ def create_appointment_completed_notifications(appointment):
         send_sms_notification(
             recipient=appointment.client,
             phone_number=appointment.client.phone_number,
-            message=f"Thank you for visiting Barberian! Your appointment with {appointment.staff.get_full_name()} has been completed. We hope to see you again soon!",
+            message=client_texts['sms'],
             notification_type="appointment_completed",
-            reference_id=str(appointment.id)
+            reference_id=context.reference_id
         )
 
 def create_appointment_rescheduled_notifications(appointment):
@@ -181,22 +264,26 @@ def create_appointment_rescheduled_notifications(appointment):
     Args:
         appointment: The appointment instance that was rescheduled
     """
+    context = MessageContext(appointment)
+    client_texts = context.render('appointment_rescheduled', 'client')
+    staff_texts = context.render('appointment_rescheduled', 'staff')
+
     # Notification for the client
-    Notification.objects.create(
+    send_notification(
         recipient=appointment.client,
-        title="Appointment Rescheduled",
-        message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} has been rescheduled to {appointment.start_time.strftime('%A, %B %d at %I:%M %p')}.",
+        title=client_texts['title'],
+        message=client_texts['in_app'],
         notification_type="appointment_updated",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Notification for the staff
-    Notification.objects.create(
+    send_notification(
         recipient=appointment.staff,
-        title="Appointment Rescheduled",
-        message=f"The appointment with {appointment.client.get_full_name()} for {appointment.service.name} has been rescheduled to {appointment.start_time.strftime('%A, %B %d at %I:%M %p')}.",
+        title=staff_texts['title'],
+        message=staff_texts['in_app'],
         notification_type="appointment_updated",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Send SMS if phone number is available and appointment is confirmed
@@ -204,9 +291,9 @@ def create_appointment_rescheduled_notifications(appointment):
         send_sms_notification(
             recipient=appointment.client,
             phone_number=appointment.client.phone_number,
-            message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} has been rescheduled to {appointment.start_time.strftime('%A, %B %d at %I:%M %p')}.",
+            message=client_texts['sms'],
             notification_type="appointment_updated",
-            reference_id=str(appointment.id)
+            reference_id=context.reference_id
         )
 
 def create_generic_appointment_update_notifications(appointment, old_status=None, new_status=None):
@@ -218,17 +305,16 @@ def create_generic_appointment_update_notifications(appointment, old_status=None
         old_status: The previous status of the appointment (optional)
         new_status: The new status of the appointment (optional)
     """
-    status_message = ""
-    if old_status and new_status:
-        status_message = f" Status changed from {old_status} to {new_status}."
+    context = MessageContext(appointment, old_status=old_status, new_status=new_status)
+    client_texts = context.render('appointment_updated', 'client')
 
     # Notification for the client
-    Notification.objects.create(
+    send_notification(
         recipient=appointment.client,
-        title="Appointment Updated",
-        message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment.start_time.strftime('%A, %B %d at %I:%M %p')} has been updated.{status_message}",
+        title=client_texts['title'],
+        message=client_texts['in_app'],
         notification_type="appointment_updated",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Send SMS only for significant updates and if phone number is available
@@ -236,7 +322,7 @@ def create_generic_appointment_update_notifications(appointment, old_status=None
         send_sms_notification(
             recipient=appointment.client,
             phone_number=appointment.client.phone_number,
-            message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment.start_time.strftime('%A, %B %d at %I:%M %p')} has been updated. Status: {new_status}.",
+            message=client_texts['sms'],
             notification_type="appointment_updated",
-            reference_id=str(appointment.id)
-        )
\ No newline at end of file
+            reference_id=context.reference_id
+        )
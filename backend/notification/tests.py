@@ -0,0 +1,605 @@
+import asyncio
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from django.utils import timezone
+from twilio.base.exceptions import TwilioRestException
+
+from barberian.common.models import User, Category, Service, Appointment
+from barberian.client.models import ClientPreference
+from barberian.staff.models import StaffSettings
+from barberian.notification.batching import batch_appointment_changes, get_active_batch
+from barberian.notification.broadcasts import get_audience_queryset, run_broadcast
+from barberian.notification import views as notification_views
+from barberian.notification import messages
+from barberian.notification import utils as notification_utils
+from barberian.notification.counters import (
+    adjust_unread_count, mark_notification_read, delete_notifications, reconcile_unread_counts
+)
+from barberian.utils.circuit import CircuitOpenError
+from barberian.utils.sms import twilio_breaker
+from barberian.notification.channels import is_channel_enabled, invalidate_preferences
+from barberian.notification.models import (
+    ScheduledReminder, NotificationPreference, Broadcast, Notification, NotificationCounter, SMSNotification
+)
+from barberian.notification.push import PushBroker, publish_event, issue_stream_ticket, SUBSCRIBER_QUEUE_SIZE
+from barberian.notification.retries import attempt_sms_delivery, SMS_MAX_ATTEMPTS
+from barberian.notification.reminders import claim_due_reminders, send_scheduled_reminder, REMINDER_CLAIM_TIMEOUT
+
+
+class NotificationTestCase(TestCase):
+    """
+    A staff member, a client without a phone number and a service to book.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            email='staff@example.com', password='password', first_name='Sam', last_name='Staff', role='staff'
+        )
+        cls.client_user = User.objects.create_user(
+            email='client@example.com', password='password', first_name='Cal', last_name='Client', role='client'
+        )
+        cls.service = Service.objects.create(
+            name='Haircut', price=20, duration=30, category=Category.objects.create(name='Hair')
+        )
+
+    def setUp(self):
+        invalidate_preferences()
+
+    def book(self, start_time=None, status='confirmed'):
+        return Appointment.objects.create(
+            client=self.client_user,
+            staff=self.staff,
+            service=self.service,
+            start_time=start_time or timezone.now() + timedelta(days=3),
+            status=status
+        )
+
+
+class ReminderTests(NotificationTestCase):
+    """
+    Scheduled reminders follow their appointment and are claimed under a lease.
+    """
+
+    def test_scheduled_on_booking(self):
+        appointment = self.book()
+        reminder = ScheduledReminder.objects.get(appointment=appointment)
+        self.assertEqual(reminder.state, 'pending')
+        self.assertEqual(reminder.due_at, appointment.start_time - timedelta(hours=24))
+
+    def test_rescheduled(self):
+        appointment = self.book()
+        ScheduledReminder.objects.filter(appointment=appointment).update(state='sent')
+
+        appointment.start_time += timedelta(days=1)
+        appointment.save()
+
+        reminder = ScheduledReminder.objects.get(appointment=appointment)
+        self.assertEqual(reminder.state, 'pending')
+        self.assertEqual(reminder.due_at, appointment.start_time - timedelta(hours=24))
+
+    def test_loaded_appointment_changes(self):
+        self.book()
+        signals = 'barberian.notification.signals.schedule_appointment_reminder'
+
+        appointment = Appointment.objects.get()
+        appointment.notes = 'Running late'
+        with mock.patch(signals) as schedule:
+            appointment.save()
+        schedule.assert_not_called()
+
+        appointment = Appointment.objects.get()
+        appointment.start_time += timedelta(hours=1)
+        appointment.status = 'pending'
+        with mock.patch(signals) as schedule:
+            appointment.save()
+            # Saving again changes nothing
+            appointment.save()
+        schedule.assert_called_once_with(appointment, rescheduled=True)
+
+        appointment = Appointment.objects.get()
+        appointment.status = 'confirmed'
+        with mock.patch(signals) as schedule:
+            appointment.save()
+        schedule.assert_called_once_with(appointment)
+
+    def test_reminder_time_change(self):
+        appointment = self.book()
+        preference = ClientPreference.objects.create(client=self.client_user, reminder_time=2)
+        reminder = ScheduledReminder.objects.get(appointment=appointment)
+        self.assertEqual(reminder.due_at, appointment.start_time - timedelta(hours=2))
+
+        preference.delete()
+        reminder.refresh_from_db()
+        self.assertEqual(reminder.due_at, appointment.start_time - timedelta(hours=24))
+
+    def test_claim_lease(self):
+        appointment = self.book(start_time=timezone.now() + timedelta(hours=2))
+        now = timezone.now()
+
+        claimed = claim_due_reminders(now=now)
+        self.assertEqual([reminder.appointment_id for reminder in claimed], [appointment.pk])
+        self.assertEqual(claimed[0].state, 'claimed')
+
+        # Held by the first worker until the lease runs out
+        self.assertEqual(claim_due_reminders(now=now), [])
+        self.assertEqual(len(claim_due_reminders(now=now + REMINDER_CLAIM_TIMEOUT + timedelta(seconds=1))), 1)
+
+    def test_cancelled_for_closed_appointments(self):
+        appointment = self.book()
+        appointment.status = 'cancelled'
+        appointment.save()
+        self.assertEqual(ScheduledReminder.objects.get(appointment=appointment).state, 'cancelled')
+
+    def test_pending_appointment_not_sent(self):
+        appointment = self.book(start_time=timezone.now() + timedelta(hours=2), status='pending')
+        reminder = claim_due_reminders()[0]
+        self.assertFalse(send_scheduled_reminder(reminder))
+        self.assertEqual(ScheduledReminder.objects.get(appointment=appointment).state, 'cancelled')
+
+
+class ChannelPreferenceTests(NotificationTestCase):
+    """
+    Channel preferences resolve from overrides, then client or staff settings.
+    """
+
+    def test_client_opt_out(self):
+        ClientPreference.objects.create(client=self.client_user, sms_notifications=False)
+        self.assertFalse(is_channel_enabled(self.client_user, 'sms', 'appointment_created'))
+        self.assertTrue(is_channel_enabled(self.client_user, 'email', 'appointment_created'))
+        self.assertTrue(is_channel_enabled(self.client_user, 'in_app', 'appointment_created'))
+        # Types users cannot configure are always sent
+        self.assertTrue(is_channel_enabled(self.client_user, 'sms', 'manual'))
+
+    def test_override(self):
+        ClientPreference.objects.create(client=self.client_user, sms_notifications=False)
+        NotificationPreference.objects.create(
+            user=self.client_user, notification_type='appointment_reminder', channel='sms', is_enabled=True
+        )
+        NotificationPreference.objects.create(
+            user=self.client_user, notification_type='marketing', channel='in_app', is_enabled=False
+        )
+        self.assertTrue(is_channel_enabled(self.client_user, 'sms', 'appointment_reminder'))
+        self.assertFalse(is_channel_enabled(self.client_user, 'sms', 'appointment_created'))
+        self.assertFalse(is_channel_enabled(self.client_user, 'in_app', 'marketing'))
+
+    def test_staff_settings(self):
+        StaffSettings.objects.create(staff=self.staff, notification_preference='important_only')
+        self.assertFalse(is_channel_enabled(self.staff, 'sms', 'appointment_created'))
+        self.assertTrue(is_channel_enabled(self.staff, 'sms', 'appointment_cancelled'))
+        self.assertTrue(is_channel_enabled(self.staff, 'in_app', 'appointment_created'))
+
+    def test_cache(self):
+        with self.assertNumQueries(2):
+            self.assertTrue(is_channel_enabled(self.client_user, 'sms', 'appointment_created'))
+        with self.assertNumQueries(0):
+            self.assertTrue(is_channel_enabled(self.client_user, 'sms', 'appointment_created'))
+
+    def test_invalidated_on_notification_preference_save(self):
+        self.assertTrue(is_channel_enabled(self.client_user, 'email', 'appointment_updated'))
+        preference = NotificationPreference.objects.create(
+            user=self.client_user, notification_type='appointment_updated', channel='email', is_enabled=False
+        )
+        self.assertFalse(is_channel_enabled(self.client_user, 'email', 'appointment_updated'))
+        preference.delete()
+        self.assertTrue(is_channel_enabled(self.client_user, 'email', 'appointment_updated'))
+
+    def test_invalidated_on_client_preference_save(self):
+        preference = ClientPreference.objects.create(client=self.client_user)
+        self.assertTrue(is_channel_enabled(self.client_user, 'sms', 'appointment_created'))
+        preference.sms_notifications = False
+        preference.save()
+        self.assertFalse(is_channel_enabled(self.client_user, 'sms', 'appointment_created'))
+
+    def test_invalidated_on_staff_settings_save(self):
+        settings = StaffSettings.objects.create(staff=self.staff)
+        self.assertTrue(is_channel_enabled(self.staff, 'email', 'appointment_created'))
+        settings.email_notifications = False
+        settings.save()
+        self.assertFalse(is_channel_enabled(self.staff, 'email', 'appointment_created'))
+
+    def test_in_app_opt_out(self):
+        NotificationPreference.objects.create(
+            user=self.client_user, notification_type='appointment_created', channel='in_app', is_enabled=False
+        )
+        self.book()
+        with self.captureOnCommitCallbacks(execute=True):
+            with batch_appointment_changes():
+                self.book()
+        # Single saves and batched saves honour the opt-out alike
+        self.assertFalse(Notification.objects.filter(recipient=self.client_user).exists())
+        self.assertEqual(Notification.objects.filter(recipient=self.staff).count(), 2)
+
+
+class BroadcastTests(NotificationTestCase):
+    """
+    Broadcasts pick their audience, checkpoint every chunk and stop when asked.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.clients = [cls.client_user] + [
+            User.objects.create_user(email=f'client{i}@example.com', first_name='Client', last_name=str(i), role='client')
+            for i in range(3)
+        ]
+
+    def create_broadcast(self, **kwargs):
+        # Clients have no phone numbers, so every recipient is skipped
+        kwargs.setdefault('audience', 'all_clients')
+        return Broadcast.objects.create(name='Spring offer', channel='sms', message='10% off', chunk_size=1, **kwargs)
+
+    def test_lapsed_audience(self):
+        lapsed, recent, _, never = self.clients
+        for client, days_ago in ((lapsed, 90), (recent, 10)):
+            Appointment.objects.create(
+                client=client, staff=self.staff, service=self.service,
+                start_time=timezone.now() - timedelta(days=days_ago), status='completed'
+            )
+
+        broadcast = self.create_broadcast(audience='lapsed_clients', audience_params={'days': 60})
+        # Clients who never visited are not lapsed
+        self.assertEqual(list(get_audience_queryset(broadcast)), [lapsed])
+
+    def test_resume_after_pause(self):
+        broadcast = self.create_broadcast()
+
+        def pause(progress):
+            Broadcast.objects.filter(pk=progress.pk).update(status='paused')
+
+        broadcast = run_broadcast(broadcast, sleep=lambda seconds: None, progress=pause)
+        self.assertEqual(broadcast.status, 'paused')
+        self.assertEqual(broadcast.last_recipient_id, self.clients[0].pk)
+        self.assertEqual(broadcast.skipped_count, 1)
+
+        broadcast = run_broadcast(Broadcast.objects.get(pk=broadcast.pk), sleep=lambda seconds: None)
+        self.assertEqual(broadcast.status, 'completed')
+        self.assertEqual(broadcast.skipped_count, len(self.clients))
+        self.assertEqual(broadcast.last_recipient_id, self.clients[-1].pk)
+
+    def test_cancel(self):
+        broadcast = self.create_broadcast()
+
+        def cancel(progress):
+            Broadcast.objects.filter(pk=progress.pk).update(status='cancelled')
+
+        broadcast = run_broadcast(broadcast, sleep=lambda seconds: None, progress=cancel)
+        self.assertEqual(broadcast.status, 'cancelled')
+
+        # Cancelled broadcasts are not sent again
+        broadcast = run_broadcast(Broadcast.objects.get(pk=broadcast.pk), sleep=lambda seconds: None)
+        self.assertEqual(broadcast.status, 'cancelled')
+        self.assertEqual(broadcast.processed_count, 1)
+
+
+class UnreadCounterTests(NotificationTestCase):
+    """
+    The unread counter follows notification writes and can be reconciled.
+    """
+
+    def notify(self):
+        return Notification.objects.create(recipient=self.client_user, title='Hello', message='Hello')
+
+    def unread_count(self):
+        return NotificationCounter.objects.get(user=self.client_user).unread_count
+
+    def test_counted_on_create_and_read(self):
+        notifications = [self.notify() for _ in range(3)]
+        self.assertEqual(self.unread_count(), 3)
+
+        self.assertTrue(mark_notification_read(notifications[0]))
+        # Marking it again is not counted twice
+        self.assertFalse(mark_notification_read(notifications[0]))
+        self.assertEqual(self.unread_count(), 2)
+
+        delete_notifications(Notification.objects.filter(pk__in=[n.pk for n in notifications[:2]]), self.client_user.pk)
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_seeded_from_table(self):
+        self.notify()
+        NotificationCounter.objects.all().delete()
+        adjust_unread_count(self.client_user.pk, 1)
+        # The recount already includes the change
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_reconcile(self):
+        self.notify()
+        NotificationCounter.objects.filter(user=self.client_user).update(unread_count=7)
+        self.assertEqual(reconcile_unread_counts(), 1)
+        self.assertEqual(self.unread_count(), 1)
+        self.assertEqual(reconcile_unread_counts(), 0)
+
+    def test_list_agrees_with_count(self):
+        old = self.notify()
+        Notification.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=400))
+        self.notify()
+
+        def list_ids(params):
+            request = APIRequestFactory().get('/', params)
+            force_authenticate(request, user=self.client_user)
+            response = notification_views.NotificationListView.as_view()(request)
+            return [item['id'] for item in response.data['results']]
+
+        self.assertEqual(len(list_ids({})), self.unread_count())
+        # Older notifications are only left out on request
+        self.assertNotIn(old.pk, list_ids({'days': 30}))
+        self.assertIn(old.pk, list_ids({'days': 'all'}))
+        # Windows past the retention period are clamped rather than overflowing
+        self.assertNotIn(old.pk, list_ids({'days': 1000000}))
+
+    def get_count(self, if_none_match=None):
+        headers = {'HTTP_IF_NONE_MATCH': if_none_match} if if_none_match else {}
+        request = APIRequestFactory().get('/', **headers)
+        force_authenticate(request, user=self.client_user)
+        return notification_views.UnreadCountView.as_view()(request)
+
+    def test_if_none_match(self):
+        self.notify()
+        etag = self.get_count()['ETag']
+        self.assertEqual(self.get_count(f'"other", {etag}').status_code, 304)
+        self.assertEqual(self.get_count(f'W/{etag}').status_code, 304)
+        # Only whole entity tags match
+        self.assertEqual(self.get_count(f'"x{etag[1:]}').status_code, 200)
+
+        self.notify()
+        self.assertEqual(self.get_count(etag).status_code, 200)
+
+
+class PushTests(NotificationTestCase):
+    """
+    The broker fans events out to open streams, which open with a stream ticket.
+    """
+
+    def test_dispatch_to_subscribers(self):
+        broker = PushBroker()
+
+        async def run():
+            queue = broker.subscribe(self.client_user.pk)
+            other = broker.subscribe(self.staff.pk)
+            broker.dispatch('{"users": [%d], "event": "notification", "data": {"id": 1}}' % self.client_user.pk)
+            event = await asyncio.wait_for(queue.get(), timeout=1)
+            broker.unsubscribe(self.client_user.pk, queue)
+            broker.unsubscribe(self.staff.pk, other)
+            return event, other.empty()
+
+        self.assertEqual(asyncio.run(run()), (('notification', {'id': 1}), True))
+        self.assertEqual(broker._subscribers, {})
+
+    def test_full_queue_drops_oldest(self):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        for number in range(SUBSCRIBER_QUEUE_SIZE + 1):
+            PushBroker._put(queue, ('notification', number))
+        self.assertEqual(queue.qsize(), SUBSCRIBER_QUEUE_SIZE)
+        self.assertEqual(queue.get_nowait(), ('notification', 1))
+
+    def test_publish_without_postgres(self):
+        with mock.patch('barberian.notification.push.broker.dispatch') as dispatch:
+            with self.captureOnCommitCallbacks(execute=True):
+                publish_event([self.client_user.pk, None], 'notification', {'id': 1})
+                dispatch.assert_not_called()
+        dispatch.assert_called_once_with(
+            '{"users": [%d], "event": "notification", "data": {"id": 1}}' % self.client_user.pk
+        )
+
+    def test_listener_closes_connection(self):
+        conn = mock.MagicMock()
+        conn.cursor.return_value.__enter__.return_value.execute.side_effect = RuntimeError('connection lost')
+        with mock.patch('psycopg2.connect', return_value=conn):
+            with self.assertRaises(RuntimeError):
+                PushBroker()._listen()
+        conn.close.assert_called_once_with()
+
+    def authenticate(self, ticket):
+        request = APIRequestFactory().get('/', {'ticket': ticket})
+        return notification_views.NotificationStreamView().authenticate(request)
+
+    def test_stream_ticket(self):
+        ticket = issue_stream_ticket(self.client_user)
+        self.assertEqual(self.authenticate(ticket), self.client_user)
+        self.assertIsNone(self.authenticate(ticket[:-1] + ('0' if ticket[-1] != '0' else '1')))
+
+        with mock.patch('barberian.notification.push.STREAM_TICKET_SECONDS', -1):
+            self.assertIsNone(self.authenticate(ticket))
+
+        User.objects.filter(pk=self.client_user.pk).update(is_active=False)
+        self.assertIsNone(self.authenticate(ticket))
+
+
+class SMSRetryTests(NotificationTestCase):
+    """
+    Transient send errors are retried with backoff; permanent ones fail at once.
+    """
+
+    def setUp(self):
+        super().setUp()
+        twilio_breaker.reset()
+        self.sms = SMSNotification.objects.create(
+            recipient=self.client_user, phone_number='+15550001111', message='Hello', notification_type='manual'
+        )
+
+    def attempt(self, result):
+        side_effect = result if isinstance(result, Exception) else None
+        with mock.patch(
+            'barberian.notification.retries.create_twilio_message', return_value=result, side_effect=side_effect
+        ) as create:
+            attempt_sms_delivery(self.sms)
+        self.sms.refresh_from_db()
+        return create
+
+    def test_sent(self):
+        self.attempt('SM123')
+        self.assertEqual((self.sms.status, self.sms.twilio_sid, self.sms.attempts), ('sent', 'SM123', 1))
+
+    def test_transient_errors_retried(self):
+        for error in (
+            TwilioRestException(503, '/Messages', 'Service unavailable', code=20500),
+            TwilioRestException(429, '/Messages', 'Too many requests', code=20429),
+            requests.Timeout('Read timed out'),
+            requests.ConnectionError('Connection refused'),
+        ):
+            with self.subTest(error=error):
+                self.attempt(error)
+                self.assertEqual(self.sms.status, 'retrying')
+                self.assertGreater(self.sms.next_attempt_at, timezone.now())
+
+    def test_permanent_error_fails(self):
+        self.attempt(TwilioRestException(400, '/Messages', 'Invalid To number', code=21211))
+        self.assertEqual((self.sms.status, self.sms.attempts, self.sms.next_attempt_at), ('failed', 1, None))
+        self.assertEqual(self.sms.error_message, 'Twilio error 21211 (HTTP 400): Invalid To number')
+
+    def test_circuit_open_not_counted(self):
+        # Open, or half-open with another sender holding the probe
+        for retry_after in (20, 0):
+            with self.subTest(retry_after=retry_after):
+                self.attempt(CircuitOpenError('twilio', retry_after))
+                self.assertEqual((self.sms.status, self.sms.attempts), ('retrying', 0))
+                self.assertGreater(self.sms.next_attempt_at, timezone.now())
+
+    def test_dead_lettered(self):
+        error = TwilioRestException(500, '/Messages', 'Internal error', code=20500)
+        for _ in range(SMS_MAX_ATTEMPTS):
+            self.attempt(error)
+        self.assertEqual((self.sms.status, self.sms.attempts), ('dead_letter', SMS_MAX_ATTEMPTS))
+        self.assertIsNone(self.sms.next_attempt_at)
+
+
+class BatchTests(NotificationTestCase):
+    """
+    Appointment changes saved in a batch are processed once, after commit.
+    """
+
+    def cancellations(self, appointment):
+        return Notification.objects.filter(notification_type='appointment_cancelled', reference_id=str(appointment.pk))
+
+    def test_processed_on_commit(self):
+        appointment = self.book()
+        with self.captureOnCommitCallbacks(execute=True):
+            with batch_appointment_changes() as batch:
+                appointment.status = 'cancelled'
+                appointment.save()
+                self.assertEqual(batch.appointment_ids, [appointment.pk])
+            self.assertFalse(self.cancellations(appointment).exists())
+
+        self.assertEqual(batch.results, {'appointment_cancelled': 1})
+        self.assertEqual(self.cancellations(appointment).count(), 2)
+        self.assertEqual(ScheduledReminder.objects.get(appointment=appointment).state, 'cancelled')
+
+    def test_nested_blocks_join_outer_batch(self):
+        appointment = self.book()
+        with self.captureOnCommitCallbacks() as callbacks:
+            with batch_appointment_changes() as outer:
+                with batch_appointment_changes() as inner:
+                    self.assertIs(inner, outer)
+                    appointment.status = 'cancelled'
+                    appointment.save()
+                # Leaving the inner block does not process the batch
+                self.assertIs(get_active_batch(), outer)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNone(get_active_batch())
+
+    def test_discarded_on_exception(self):
+        appointment = self.book()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with batch_appointment_changes():
+                    appointment.status = 'cancelled'
+                    appointment.save()
+                    raise RuntimeError('abort')
+
+        self.assertEqual(callbacks, [])
+        self.assertIsNone(get_active_batch())
+        self.assertFalse(self.cancellations(appointment).exists())
+
+
+class MessageTests(NotificationTestCase):
+    """
+    Notification texts render from the template registry.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.appointment = self.book()
+
+    def test_matches_previous_text(self):
+        texts = messages.MessageContext(self.appointment).render('appointment_created', 'client')
+        self.assertEqual(texts['title'], 'New Appointment Booked')
+        self.assertEqual(
+            texts['in_app'],
+            f"Your appointment with {self.staff.get_full_name()} for {self.service.name} on "
+            f"{self.appointment.start_time.strftime('%A, %B %d at %I:%M %p')} has been booked successfully."
+        )
+
+    def test_sms_falls_back_to_in_app(self):
+        context = messages.MessageContext(self.appointment)
+        created = context.render('appointment_created', 'client')
+        self.assertEqual(created['sms'], created['in_app'])
+        completed = context.render('appointment_completed', 'client')
+        self.assertNotEqual(completed['sms'], completed['in_app'])
+
+    def test_status_change_needs_both_statuses(self):
+        changed = messages.MessageContext(self.appointment, old_status='pending', new_status='no_show')
+        self.assertTrue(
+            changed.render('appointment_updated')['in_app'].endswith(' Status changed from pending to no_show.')
+        )
+        only_new = messages.MessageContext(self.appointment, new_status='no_show')
+        self.assertNotIn('Status changed', only_new.render('appointment_updated')['in_app'])
+
+    def test_time_format_override(self):
+        with mock.patch.dict(messages.TIME_FORMATS, {'fr': '%d/%m %H:%M'}):
+            texts = messages.MessageContext(self.appointment, language='fr').render('appointment_reminder')
+        self.assertIn(self.appointment.start_time.strftime('%d/%m %H:%M'), texts['in_app'])
+
+    def test_register_message_replaces_compiled(self):
+        with mock.patch.dict(messages.MESSAGE_TEMPLATES):
+            messages.register_message('appointment_test', 'client', 'Old', 'Old text for $client_name')
+            self.assertEqual(
+                messages.MessageContext(self.appointment).render('appointment_test')['in_app'],
+                f'Old text for {self.client_user.get_full_name()}'
+            )
+            messages.register_message('appointment_test', 'client', 'New', 'New text', sms='New SMS')
+            texts = messages.MessageContext(self.appointment).render('appointment_test')
+            sources = {key[3] for key in messages._compiled if key[1:3] == ('appointment_test', 'client')}
+        # Templates compiled from the old texts are dropped
+        self.assertEqual(sources, {'New', 'New text', 'New SMS'})
+        self.assertEqual((texts['title'], texts['in_app'], texts['sms']), ('New', 'New text', 'New SMS'))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class EmailNotificationTests(NotificationTestCase):
+    """
+    Email notifications are sent in batches over one mail connection.
+    """
+
+    def test_one_connection_per_batch(self):
+        ClientPreference.objects.create(client=self.client_user, email_notifications=False)
+        emails = [
+            (self.staff, 'Hello', 'Hello staff', '<p>Hello staff</p>'),
+            (self.client_user, 'Hello', 'Hello client', None),
+            ('walk-in@example.com', 'Hello', 'Hello walk-in', None),
+        ]
+
+        with mock.patch.object(notification_utils, 'get_connection', wraps=get_connection) as connect:
+            sent = notification_utils.send_email_notifications(emails, notification_type='appointment_created')
+
+        connect.assert_called_once()
+        # The client opted out of email
+        self.assertEqual(sent, 2)
+        self.assertEqual([message.to for message in mail.outbox], [[self.staff.email], ['walk-in@example.com']])
+        self.assertEqual(mail.outbox[0].alternatives, [('<p>Hello staff</p>', 'text/html')])
+
+    def test_nothing_to_send(self):
+        ClientPreference.objects.create(client=self.client_user, email_notifications=False)
+        with mock.patch.object(notification_utils, 'get_connection', wraps=get_connection) as connect:
+            sent = notification_utils.send_email_notifications(
+                [(self.client_user, 'Hello', 'Hello client', None)], notification_type='appointment_created'
+            )
+
+        self.assertEqual(sent, 0)
+        connect.assert_not_called()
@@ -11,10 +11,17 @@ urlpatterns = [
     path('mark-all-read/', views.MarkAllNotificationsReadView.as_view(), name='notification-mark-all-read'),
     path('<int:pk>/delete/', views.DeleteNotificationView.as_view(), name='notification-delete'),
     path('delete-all/', views.DeleteAllNotificationsView.as_view(), name='notification-delete-all'),
+    path('stream/', views.NotificationStreamView.as_view(), name='notification-stream'),
+    path('stream/ticket/', views.StreamTicketView.as_view(), name='notification-stream-ticket'),
+    path('unread-count/', views.UnreadCountView.as_view(), name='notification-unread-count'),
     
     # SMS Notifications (admin only)
     path('sms/', views.SMSNotificationListView.as_view(), name='sms-list'),
     path('sms/<int:pk>/', views.SMSNotificationDetailView.as_view(), name='sms-detail'),
     path('sms/send/', views.SendSMSManualView.as_view(), name='sms-send'),
     path('sms/update-status/', views.UpdateSMSStatusView.as_view(), name='sms-update-status'),
+
+    # Marketing broadcasts (admin only)
+    path('broadcasts/', views.BroadcastListCreateView.as_view(), name='broadcast-list'),
+    path('broadcasts/<int:pk>/', views.BroadcastDetailView.as_view(), name='broadcast-detail'),
 ]
\ No newline at end of file
@@ -1,15 +1,18 @@
 import os
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 from datetime import datetime, timedelta
 
-from backend.common.models import Appointment
-from .models import Notification, SMSNotification
+from .models import Notification, SMSNotification, ScheduledReminder
+from .reminders import process_due_reminders
+from .channels import is_channel_enabled, preload_preferences
+from .retries import attempt_sms_delivery
+from .messages import MessageContext
 
-# Import send_twilio_message from utils
-from backend.utils.sms import send_twilio_message, get_message_status
+from backend.utils.sms import get_message_status
 
 User = get_user_model()
 
@@ -25,8 +28,13 @@ def send_notification(recipient, title, message, notification_type='system', ref
         reference_id: Optional ID of the referenced object (e.g., appointment ID)
 
     Returns:
-        Notification: The created notification instance
+        Notification: The created notification instance, or None if the
+            recipient opted out of in-app notifications for this type
     """
+    # Skip recipients who opted out of in-app notifications for this type
+    if not is_channel_enabled(recipient, 'in_app', notification_type):
+        return None
+
     notification = Notification.objects.create(
         recipient=recipient,
         title=title,
@@ -49,9 +57,14 @@ def send_sms_notification(recipient, phone_number, message, notification_type='s
         reference_id: Optional ID of the referenced object (e.g., appointment ID)
 
     Returns:
-        SMSNotification: The created SMS notification instance
+        SMSNotification: The created SMS notification instance, or None if the
+            recipient opted out of SMS for this notification type
         str: The Twilio message SID if successful, None otherwise
     """
+    # Skip recipients who opted out of SMS for this notification type
+    if not is_channel_enabled(recipient, 'sms', notification_type):
+        return None, None
+
     # Create the SMS notification record
     sms_notification = SMSNotification.objects.create(
         recipient=recipient,
@@ -62,32 +75,10 @@ def send_sms_notification(recipient, phone_number, message, notification_type='s
         status='pending'
     )
 
-    # Send the SMS via Twilio
-    try:
-        twilio_sid = send_twilio_message(
-            to_phone_number=phone_number,
-            message=message
-        )
-
-        if twilio_sid:
-            # Update the SMS notification record with the Twilio SID
-            sms_notification.twilio_sid = twilio_sid
-            sms_notification.status = 'sent'
-            sms_notification.save()
-            return sms_notification, twilio_sid
-        else:
-            # Failed to get Twilio SID
-            sms_notification.status = 'failed'
-            sms_notification.error_message = "Failed to get Twilio SID"
-            sms_notification.save()
-            return sms_notification, None
-
-    except Exception as e:
-        # Log the error and update the SMS notification record
-        sms_notification.status = 'failed'
-        sms_notification.error_message = str(e)
-        sms_notification.save()
-        return sms_notification, None
+    # Send the SMS via Twilio; transient failures are retried with backoff
+    # by the retry_sms command until the message is dead-lettered
+    twilio_sid = attempt_sms_delivery(sms_notification)
+    return sms_notification, twilio_sid
 
 def send_appointment_reminder(appointment, hours_before=24):
     """
@@ -105,7 +96,7 @@ def send_appointment_reminder(appointment, hours_before=24):
         return None
 
     # Calculate the reminder time
-    now = datetime.now(appointment.start_time.tzinfo)
+    now = timezone.now()
     reminder_time = appointment.start_time - timedelta(hours=hours_before)
 
     # Check if it's time to send the reminder
@@ -113,24 +104,25 @@ def send_appointment_reminder(appointment, hours_before=24):
         return None
 
     # Check if a reminder has already been sent
-    existing_reminders = Notification.objects.filter(
-        recipient=appointment.client,
-        notification_type='appointment_reminder',
-        reference_id=str(appointment.id),
-        created_at__gte=reminder_time
+    reminder, _ = ScheduledReminder.objects.get_or_create(
+        appointment=appointment,
+        defaults={'due_at': reminder_time}
     )
 
-    if existing_reminders.exists():
+    if reminder.state == 'sent':
         # Reminder already sent
         return None
 
+    context = MessageContext(appointment)
+    texts = context.render('appointment_reminder', 'client')
+
     # Create the reminder notification
-    notification = Notification.objects.create(
+    notification = send_notification(
         recipient=appointment.client,
-        title="Appointment Reminder",
-        message=f"Reminder: You have an appointment with {appointment.staff.get_full_name()} for {appointment.service.name} tomorrow at {appointment.start_time.strftime('%I:%M %p')}.",
+        title=texts['title'],
+        message=texts['in_app'],
         notification_type='appointment_reminder',
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Send SMS reminder if the client has a phone number
@@ -139,11 +131,16 @@ def send_appointment_reminder(appointment, hours_before=24):
         sms_notification, _ = send_sms_notification(
             recipient=appointment.client,
             phone_number=appointment.client.phone_number,
-            message=f"Reminder: You have an appointment with {appointment.staff.get_full_name()} for {appointment.service.name} tomorrow at {appointment.start_time.strftime('%I:%M %p')}.",
+            message=texts['sms'],
             notification_type='appointment_reminder',
-            reference_id=str(appointment.id)
+            reference_id=context.reference_id
         )
 
+    # Mark the scheduled reminder as sent so the worker skips it
+    reminder.state = 'sent'
+    reminder.sent_at = now
+    reminder.save(update_fields=['state', 'sent_at', 'updated_at'])
+
     return notification, sms_notification
 
 def update_sms_status(sms_id=None, max_age_hours=24):
@@ -214,52 +211,24 @@ def update_sms_status(sms_id=None, max_age_hours=24):
 
     return results
 
-def send_appointment_reminders_batch(hours_before=24, batch_size=100):
+def send_appointment_reminders_batch(batch_size=100, max_batches=None):
     """
-    Send reminders for all upcoming appointments in a batch.
+    Send all due appointment reminders in batches.
+
+    Reminders are read from the ScheduledReminder table, which is filled in
+    when appointments are created or rescheduled using each client's
+    reminder lead time, so a run only touches reminders that are due.
 
     Args:
-        hours_before: Hours before the appointment to send the reminder
-        batch_size: Maximum number of reminders to send
+        batch_size: Number of reminders claimed per batch
+        max_batches: Optional limit on the number of batches to process
 
     Returns:
         dict: Summary of reminder results
     """
-    results = {
-        'sent': 0,
-        'failed': 0,
-        'total': 0,
-    }
-
-    # Calculate the time range for sending reminders
-    now = datetime.now()
-    reminder_start = now
-    reminder_end = now + timedelta(hours=hours_before)
-
-    # Find appointments that need reminders
-    appointments = Appointment.objects.filter(
-        status='confirmed',
-        start_time__gte=reminder_start,
-        start_time__lte=reminder_end
-    ).order_by('start_time')[:batch_size]
+    return process_due_reminders(batch_size=batch_size, max_batches=max_batches)
 
-    results['total'] = appointments.count()
-
-    # Send reminders for each appointment
-    for appointment in appointments:
-        try:
-            reminder = send_appointment_reminder(appointment, hours_before)
-            if reminder:
-                results['sent'] += 1
-            else:
-                results['failed'] += 1
-        except Exception as e:
-            print(f"Error sending reminder for appointment {appointment.id}: {str(e)}")
-            results['failed'] += 1
-
-    return results
-
-def send_email_notification(recipient, subject, message, from_email=None, html_message=None):
+def send_email_notification(recipient, subject, message, from_email=None, html_message=None, notification_type=None):
     """
     Send an email notification to a user.
 
@@ -269,34 +238,75 @@ def send_email_notification(recipient, subject, message, from_email=None, html_m
         message: Email text content
         from_email: Sender email address (default: settings.DEFAULT_FROM_EMAIL)
         html_message: Optional HTML version of the message
+        notification_type: Optional notification type used to honour the
+            recipient's email preferences
 
     Returns:
         bool: True if the email was sent successfully, False otherwise
     """
-    # Get the recipient email
-    if isinstance(recipient, User):
-        to_email = recipient.email
-    else:
-        to_email = recipient
+    sent = send_email_notifications(
+        [(recipient, subject, message, html_message)],
+        from_email=from_email,
+        notification_type=notification_type
+    )
+    return sent == 1
+
+def send_email_notifications(messages, from_email=None, notification_type=None, connection=None):
+    """
+    Send a batch of email notifications over a single mail connection.
+
+    Args:
+        messages: Iterable of (recipient, subject, message, html_message) tuples,
+            where recipient is a User instance or an email address
+        from_email: Sender email address (default: settings.DEFAULT_FROM_EMAIL)
+        notification_type: Optional notification type used to honour the
+            recipients' email preferences
+        connection: Optional open email backend connection to reuse
+
+    Returns:
+        int: Number of emails sent successfully
+    """
+    messages = list(messages)
 
     # Get the sender email
     if not from_email:
         from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@backend.com')
 
-    # Send the email
-    try:
-        send_mail(
+    # Resolve email preferences for every user recipient at once
+    users = [recipient for recipient, _, _, _ in messages if isinstance(recipient, User)]
+    if notification_type and users:
+        preload_preferences(users)
+
+    email_messages = []
+    for recipient, subject, message, html_message in messages:
+        # Get the recipient email
+        if isinstance(recipient, User):
+            if notification_type and not is_channel_enabled(recipient, 'email', notification_type):
+                continue
+            to_email = recipient.email
+        else:
+            to_email = recipient
+
+        email_message = EmailMultiAlternatives(
             subject=subject,
-            message=message,
+            body=message,
             from_email=from_email,
-            recipient_list=[to_email],
-            html_message=html_message,
-            fail_silently=False
+            to=[to_email]
         )
-        return True
+        if html_message:
+            email_message.attach_alternative(html_message, 'text/html')
+        email_messages.append(email_message)
+
+    if not email_messages:
+        return 0
+
+    # Send every message through one connection instead of one per email
+    try:
+        connection = connection or get_connection(fail_silently=False)
+        return connection.send_messages(email_messages) or 0
     except Exception as e:
-        print(f"Error sending email to {to_email}: {str(e)}")
-        return False
+        print(f"Error sending {len(email_messages)} email(s): {str(e)}")
+        return 0
 
 # Appointment notification functions
 
@@ -310,25 +320,26 @@ def notify_appointment_created(appointment):
     Returns:
         tuple: (client notification, staff notification, SMS notification)
     """
-    # Format the appointment time
-    appointment_time = appointment.start_time.strftime('%A, %B %d at %I:%M %p')
+    context = MessageContext(appointment)
+    client_texts = context.render('appointment_created', 'client')
+    staff_texts = context.render('appointment_created', 'staff')
 
     # Create notification for the client
     client_notification = send_notification(
         recipient=appointment.client,
-        title="New Appointment Booked",
-        message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment_time} has been booked successfully.",
+        title=client_texts['title'],
+        message=client_texts['in_app'],
         notification_type="appointment_created",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Create notification for the staff
     staff_notification = send_notification(
         recipient=appointment.staff,
-        title="New Appointment Scheduled",
-        message=f"A new appointment with {appointment.client.get_full_name()} for {appointment.service.name} on {appointment_time} has been scheduled.",
+        title=staff_texts['title'],
+        message=staff_texts['in_app'],
         notification_type="appointment_created",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Send SMS to the client if phone number is available
@@ -337,9 +348,9 @@ def notify_appointment_created(appointment):
         sms_notification, _ = send_sms_notification(
             recipient=appointment.client,
             phone_number=appointment.client.phone_number,
-            message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment_time} has been booked successfully.",
+            message=client_texts['sms'],
             notification_type="appointment_created",
-            reference_id=str(appointment.id)
+            reference_id=context.reference_id
         )
 
     return client_notification, staff_notification, sms_notification
@@ -355,39 +366,35 @@ def notify_appointment_updated(appointment, updated_fields=None):
     Returns:
         tuple: (client notification, staff notification, SMS notification)
     """
-    # Format the appointment time
-    appointment_time = appointment.start_time.strftime('%A, %B %d at %I:%M %p')
+    context = MessageContext(appointment)
 
-    # Create a message based on the updated fields
+    # Pick the event based on the updated fields
     if updated_fields and 'start_time' in updated_fields:
-        client_message = f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} has been rescheduled to {appointment_time}."
-        staff_message = f"The appointment with {appointment.client.get_full_name()} for {appointment.service.name} has been rescheduled to {appointment_time}."
-        title = "Appointment Rescheduled"
+        client_texts = context.render('appointment_rescheduled', 'client')
+        staff_texts = context.render('appointment_rescheduled', 'staff')
     elif updated_fields and 'status' in updated_fields and appointment.status == 'confirmed':
-        client_message = f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment_time} has been confirmed."
-        staff_message = client_message
-        title = "Appointment Confirmed"
+        client_texts = context.render('appointment_confirmed', 'client')
+        staff_texts = client_texts
     else:
-        client_message = f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment_time} has been updated."
-        staff_message = f"The appointment with {appointment.client.get_full_name()} for {appointment.service.name} on {appointment_time} has been updated."
-        title = "Appointment Updated"
+        client_texts = context.render('appointment_updated', 'client')
+        staff_texts = context.render('appointment_updated', 'staff')
 
     # Create notification for the client
     client_notification = send_notification(
         recipient=appointment.client,
-        title=title,
-        message=client_message,
+        title=client_texts['title'],
+        message=client_texts['in_app'],
         notification_type="appointment_updated",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Create notification for the staff
     staff_notification = send_notification(
         recipient=appointment.staff,
-        title=title,
-        message=staff_message,
+        title=staff_texts['title'],
+        message=staff_texts['in_app'],
         notification_type="appointment_updated",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Send SMS to the client if phone number is available and it's a significant update
@@ -399,9 +406,9 @@ def notify_appointment_updated(appointment, updated_fields=None):
         sms_notification, _ = send_sms_notification(
             recipient=appointment.client,
             phone_number=appointment.client.phone_number,
-            message=client_message,
+            message=client_texts['sms'],
             notification_type="appointment_updated",
-            reference_id=str(appointment.id)
+            reference_id=context.reference_id
         )
 
     return client_notification, staff_notification, sms_notification
@@ -416,25 +423,26 @@ def notify_appointment_canceled(appointment):
     Returns:
         tuple: (client notification, staff notification, SMS notification)
     """
-    # Format the appointment time
-    appointment_time = appointment.start_time.strftime('%A, %B %d at %I:%M %p')
+    context = MessageContext(appointment)
+    client_texts = context.render('appointment_cancelled', 'client')
+    staff_texts = context.render('appointment_cancelled', 'staff')
 
     # Create notification for the client
     client_notification = send_notification(
         recipient=appointment.client,
-        title="Appointment Cancelled",
-        message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment_time} has been cancelled.",
+        title=client_texts['title'],
+        message=client_texts['in_app'],
         notification_type="appointment_cancelled",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Create notification for the staff
     staff_notification = send_notification(
         recipient=appointment.staff,
-        title="Appointment Cancelled",
-        message=f"The appointment with {appointment.client.get_full_name()} for {appointment.service.name} on {appointment_time} has been cancelled.",
+        title=staff_texts['title'],
+        message=staff_texts['in_app'],
         notification_type="appointment_cancelled",
-        reference_id=str(appointment.id)
+        reference_id=context.reference_id
     )
 
     # Send SMS to the client if phone number is available
@@ -443,9 +451,9 @@ def notify_appointment_canceled(appointment):
         sms_notification, _ = send_sms_notification(
             recipient=appointment.client,
             phone_number=appointment.client.phone_number,
-            message=f"Your appointment with {appointment.staff.get_full_name()} for {appointment.service.name} on {appointment_time} has been cancelled.",
+            message=client_texts['sms'],
             notification_type="appointment_cancelled",
-            reference_id=str(appointment.id)
+            reference_id=context.reference_id
         )
 
-    return client_notification, staff_notification, sms_notification
\ No newline at end of file
+    return client_notification, staff_notification, sms_notification
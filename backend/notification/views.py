@@ -1,30 +1,51 @@
 import json
+import asyncio
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views import View
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 
-from .models import Notification, SMSNotification
-from .serializers import NotificationSerializer, SMSNotificationSerializer
+from .models import Notification, SMSNotification, Broadcast
+from .serializers import (
+    NotificationSerializer, NotificationValuesSerializer, SMSNotificationSerializer, BroadcastSerializer
+)
+from .push import broker, issue_stream_ticket, get_stream_ticket_user, STREAM_TICKET_SECONDS
+from .partitions import recent
+from .retries import attempt_sms_delivery
+from .counters import (
+    get_unread_counter, mark_notification_read, mark_all_notifications_read, delete_notifications
+)
+from barberian.utils.eager_loading import EagerLoadingViewMixin
+from barberian.utils.pagination import KeysetPagination
 from barberian.utils.permissions import IsAdmin
-from barberian.utils.sms import send_twilio_message, get_message_status
+from barberian.utils.sms import get_message_status
+from barberian.utils.values_serializers import ValuesListMixin
 
 User = get_user_model()
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(ValuesListMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for listing user notifications
     """
     serializer_class = NotificationSerializer
+    values_serializer_class = NotificationValuesSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
         # Return only notifications for the current user
-        return Notification.objects.filter(recipient=self.request.user).order_by('-created_at')
+        return recent(Notification.objects.filter(recipient=self.request.user), self.request).order_by('-created_at')
 
-class NotificationDetailView(generics.RetrieveAPIView):
+class NotificationDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """
     API endpoint for retrieving notification details
     """
@@ -44,8 +65,7 @@ class MarkNotificationReadView(APIView):
     def post(self, request, pk):
         try:
             notification = Notification.objects.get(pk=pk, recipient=request.user)
-            notification.is_read = True
-            notification.save()
+            mark_notification_read(notification)
             return Response(
                 {"message": "Notification marked as read"},
                 status=status.HTTP_200_OK
@@ -63,7 +83,7 @@ class MarkAllNotificationsReadView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+        mark_all_notifications_read(request.user.id)
         return Response(
             {"message": "All notifications marked as read"},
             status=status.HTTP_200_OK
@@ -77,8 +97,12 @@ class DeleteNotificationView(APIView):
     
     def delete(self, request, pk):
         try:
-            notification = Notification.objects.get(pk=pk, recipient=request.user)
-            notification.delete()
+            deleted = delete_notifications(
+                Notification.objects.filter(pk=pk, recipient=request.user),
+                request.user.id
+            )
+            if not deleted:
+                raise Notification.DoesNotExist
             return Response(
                 {"message": "Notification deleted"},
                 status=status.HTTP_200_OK
@@ -96,25 +120,117 @@ class DeleteAllNotificationsView(APIView):
     permission_classes = [IsAuthenticated]
     
     def delete(self, request):
-        Notification.objects.filter(recipient=request.user).delete()
+        delete_notifications(Notification.objects.filter(recipient=request.user), request.user.id)
         return Response(
             {"message": "All notifications deleted"},
             status=status.HTTP_200_OK
         )
 
+class UnreadCountView(APIView):
+    """
+    API endpoint for the current user's unread notification count
+
+    Reads the denormalised counter instead of the notification table and
+    supports If-None-Match, so polling clients get a 304 until the count changes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        counter = get_unread_counter(request.user.id)
+        etag = f'"{request.user.id}-{counter.unread_count}"'
+
+        # Weak comparison, as for If-None-Match in Django's conditional GETs
+        client_etags = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+        if etag in client_etags or '*' in client_etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({"unread_count": counter.unread_count}, status=status.HTTP_200_OK)
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+class StreamTicketView(APIView):
+    """
+    API endpoint issuing a short-lived ticket that opens the notification stream
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            "ticket": issue_stream_ticket(request.user),
+            "expires_in": STREAM_TICKET_SECONDS
+        }, status=status.HTTP_200_OK)
+
+class NotificationStreamView(View):
+    """
+    Server-sent event stream of the current user's notifications and
+    appointment changes
+
+    Meant to be served through the ASGI application: each open stream waits
+    on the process-wide LISTEN/NOTIFY broker instead of polling the database.
+    EventSource cannot set headers, so browsers pass a ticket from
+    StreamTicketView as ?ticket=, fetching a new one before reconnecting.
+    """
+    heartbeat_seconds = 15
+
+    async def get(self, request):
+        user = await sync_to_async(self.authenticate)(request)
+        if user is None:
+            return JsonResponse(
+                {"error": "Authentication credentials were not provided or are invalid"},
+                status=401
+            )
+
+        response = StreamingHttpResponse(self.stream(user.id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def authenticate(self, request):
+        ticket = request.GET.get('ticket')
+        if ticket:
+            return get_stream_ticket_user(ticket)
+
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except (InvalidToken, TokenError):
+            return None
+
+        if result:
+            return result[0]
+        return request.user if request.user.is_authenticated else None
+
+    async def stream(self, user_id):
+        queue = broker.subscribe(user_id)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            broker.unsubscribe(user_id, queue)
+
 # SMS Notification Views
 
-class SMSNotificationListView(generics.ListAPIView):
+class SMSNotificationListView(EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for listing SMS notifications (admin only)
     """
     serializer_class = SMSNotificationSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
-        return SMSNotification.objects.all().order_by('-created_at')
+        return recent(SMSNotification.objects.all(), self.request).order_by('-created_at')
 
-class SMSNotificationDetailView(generics.RetrieveAPIView):
+class SMSNotificationDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """
     API endpoint for retrieving SMS notification details (admin only)
     """
@@ -163,42 +279,22 @@ class SendSMSManualView(APIView):
             status='pending'
         )
         
-        # Send the SMS
-        try:
-            twilio_sid = send_twilio_message(
-                to_phone_number=phone_number,
-                message=message
-            )
-            
-            if twilio_sid:
-                notification.twilio_sid = twilio_sid
-                notification.status = 'sent'
-                notification.save()
-                
-                return Response({
-                    "message": "SMS sent successfully",
-                    "sms_id": notification.id,
-                    "twilio_sid": twilio_sid
-                }, status=status.HTTP_200_OK)
-            else:
-                notification.status = 'failed'
-                notification.error_message = "Failed to get Twilio SID"
-                notification.save()
-                
-                return Response({
-                    "error": "Failed to send SMS",
-                    "sms_id": notification.id
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        except Exception as e:
-            notification.status = 'failed'
-            notification.error_message = str(e)
-            notification.save()
-            
+        # Send the SMS; a transient failure is left on the retry queue
+        twilio_sid = attempt_sms_delivery(notification)
+
+        if twilio_sid:
             return Response({
-                "error": f"Failed to send SMS: {str(e)}",
-                "sms_id": notification.id
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                "message": "SMS sent successfully",
+                "sms_id": notification.id,
+                "twilio_sid": twilio_sid
+            }, status=status.HTTP_200_OK)
+
+        return Response({
+            "error": f"Failed to send SMS: {notification.error_message}",
+            "sms_id": notification.id,
+            "status": notification.status,
+            "next_attempt_at": notification.next_attempt_at
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class UpdateSMSStatusView(APIView):
     """
@@ -274,4 +370,25 @@ class UpdateSMSStatusView(APIView):
                 "updated": updated_count,
                 "failed": failed_count,
                 "total": notifications.count()
-            }, status=status.HTTP_200_OK)
\ No newline at end of file
+            }, status=status.HTTP_200_OK)
+
+# Broadcast Views
+
+class BroadcastListCreateView(generics.ListCreateAPIView):
+    """
+    API endpoint for listing and creating marketing broadcasts (admin only)
+    """
+    queryset = Broadcast.objects.all().order_by('-created_at')
+    serializer_class = BroadcastSerializer
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+class BroadcastDetailView(generics.RetrieveUpdateAPIView):
+    """
+    API endpoint for retrieving broadcast progress or pausing a broadcast (admin only)
+    """
+    queryset = Broadcast.objects.all()
+    serializer_class = BroadcastSerializer
+    permission_classes = [IsAuthenticated, IsAdmin]
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -57,6 +58,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'backend.utils.compression.CompressionMiddleware',  # gzip/brotli; before anything reading the body
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -157,8 +159,29 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'backend.utils.renderers.ORJSONRenderer',  # Same output as JSONRenderer, encoded with orjson
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+# Default page size for cursor-paginated list endpoints (?page_size= overrides, up to 200)
+KEYSET_PAGE_SIZE = 50
+
+# Response compression
+COMPRESSION_MIN_SIZE = 1024  # Bytes; smaller responses are sent as they are
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5  # 0-11; higher levels cost far more CPU per request
+
+# Public catalogue cache (services, categories, staff, business info)
+CATALOGUE_CACHE_ALIAS = 'default'  # Should be a cache shared by all workers in production
+CATALOGUE_CACHE_TIMEOUT = 3600  # Seconds a payload is kept; bounds staleness after writes that skip signals
+CATALOGUE_VERSION_CHECK_SECONDS = 1  # Seconds a worker trusts its copy of the catalogue version
+CATALOGUE_LOCAL_MAX_ENTRIES = 256  # Catalogue payloads kept in each process (least recently used dropped)
+
+# Admin bulk write endpoints
+BULK_MAX_ITEMS = 500  # Items accepted in one request, across create, update and delete
+
 # JWT settings
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -181,3 +204,26 @@ CSRF_COOKIE_HTTPONLY = False  # Set to True in production
 TWILIO_ACCOUNT_SID = 'your_twilio_account_sid'
 TWILIO_AUTH_TOKEN = 'your_twilio_auth_token'
 TWILIO_PHONE_NUMBER = '+15551234567'
+
+# Provider API base URLs; set both to the provider_standin server (e.g.
+# http://127.0.0.1:8025) to exercise the notification pipeline offline
+TWILIO_API_BASE_URL = os.environ.get('TWILIO_API_BASE_URL')
+SENDGRID_API_BASE_URL = os.environ.get('SENDGRID_API_BASE_URL')
+
+# Provider timeouts and circuit breaker
+TWILIO_TIMEOUT_SECONDS = 5
+SENDGRID_TIMEOUT_SECONDS = 5
+PROVIDER_BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+PROVIDER_BREAKER_RECOVERY_SECONDS = 30  # Seconds to fail fast before probing again
+
+# Appointment reminder settings
+APPOINTMENT_REMINDER_HOURS = 24  # Default lead time for clients without preferences
+APPOINTMENT_REMINDER_CLAIM_TIMEOUT_MINUTES = 10
+APPOINTMENT_SWEEP_GRACE_MINUTES = 60  # Minutes after an appointment ends before the sweep closes it
+NOTIFICATION_PREFERENCE_CACHE_TTL = 300  # Seconds before cached channel preferences are reloaded
+NOTIFICATION_RETENTION_MONTHS = 12  # Months of notifications kept by purge_notifications
+NOTIFICATION_PARTITIONS_AHEAD = 3  # Monthly partitions created ahead of time
+NOTIFICATION_STREAM_TICKET_SECONDS = 60  # Lifetime of the tickets that open notification streams
+SMS_MAX_ATTEMPTS = 5  # Send attempts before an SMS is dead-lettered
+SMS_RETRY_BASE_SECONDS = 30  # Backoff before the first retry, doubled per attempt
+SMS_RETRY_MAX_SECONDS = 3600  # Upper bound on the backoff
@@ -12,23 +12,23 @@ from barberian.common.models import (
     User, Schedule, Appointment, Service
 )
 from barberian.notification.models import Notification
+from barberian.notification.partitions import recent
 from barberian.common.serializers import (
     ScheduleSerializer, AppointmentSerializer,
-    ServiceSerializer, UserSerializer
+    ServiceSerializer, UserSerializer,
+    AppointmentValuesSerializer, ServiceValuesSerializer
 )
-from barberian.notification.serializers import NotificationSerializer
+from barberian.common.transitions import transition_appointment, InvalidTransition
+from barberian.notification.serializers import NotificationSerializer, NotificationValuesSerializer
+from barberian.utils.eager_loading import EagerLoadingViewMixin
 from barberian.utils.permissions import IsStaff
-from barberian.notification.utils import (
-    notify_appointment_created,
-    notify_appointment_updated,
-    notify_appointment_canceled
-)
+from barberian.utils.values_serializers import ValuesListMixin
 from .models import StaffSettings
 from .serializers import StaffSettingsSerializer, ChangePasswordSerializer, StaffProfileUpdateSerializer
 
 
 # Schedule Management Views
-class StaffScheduleListView(generics.ListAPIView):
+class StaffScheduleListView(EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for staff to list their schedules.
     """
@@ -123,7 +123,7 @@ class StaffScheduleCreateView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class StaffScheduleDetailView(generics.RetrieveAPIView):
+class StaffScheduleDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """
     API endpoint for staff to retrieve details of a specific schedule.
     """
@@ -135,7 +135,7 @@ class StaffScheduleDetailView(generics.RetrieveAPIView):
         return Schedule.objects.filter(staff=user)
 
 
-class StaffScheduleUpdateView(generics.UpdateAPIView):
+class StaffScheduleUpdateView(EagerLoadingViewMixin, generics.UpdateAPIView):
     """
     API endpoint for staff to update their schedule.
     """
@@ -159,11 +159,12 @@ class StaffScheduleDeleteView(generics.DestroyAPIView):
 
 
 # Appointment Management Views
-class StaffAppointmentListView(generics.ListAPIView):
+class StaffAppointmentListView(ValuesListMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for staff to list their appointments.
     """
     serializer_class = AppointmentSerializer
+    values_serializer_class = AppointmentValuesSerializer
     permission_classes = [permissions.IsAuthenticated, IsStaff]
 
     def get_queryset(self):
@@ -178,11 +179,12 @@ class StaffAppointmentListView(generics.ListAPIView):
         return queryset
 
 
-class StaffTodayAppointmentsView(generics.ListAPIView):
+class StaffTodayAppointmentsView(ValuesListMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for staff to list their appointments for today.
     """
     serializer_class = AppointmentSerializer
+    values_serializer_class = AppointmentValuesSerializer
     permission_classes = [permissions.IsAuthenticated, IsStaff]
 
     def get_queryset(self):
@@ -195,11 +197,12 @@ class StaffTodayAppointmentsView(generics.ListAPIView):
         ).order_by('start_time')
 
 
-class StaffUpcomingAppointmentsView(generics.ListAPIView):
+class StaffUpcomingAppointmentsView(ValuesListMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for staff to list their upcoming appointments.
     """
     serializer_class = AppointmentSerializer
+    values_serializer_class = AppointmentValuesSerializer
     permission_classes = [permissions.IsAuthenticated, IsStaff]
 
     def get_queryset(self):
@@ -213,7 +216,7 @@ class StaffUpcomingAppointmentsView(generics.ListAPIView):
         ).order_by('start_time')
 
 
-class StaffAppointmentDetailView(generics.RetrieveAPIView):
+class StaffAppointmentDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """
     API endpoint for staff to retrieve details of a specific appointment.
     """
@@ -241,22 +244,9 @@ class AppointmentStatusUpdateView(APIView):
             if not new_status:
                 return Response({"error": "Status is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Validate status
-            valid_statuses = ['pending', 'confirmed', 'completed', 'cancelled', 'no_show']
-            if new_status not in valid_statuses:
-                return Response({
-                    "error": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            # Update appointment status
-            appointment.status = new_status
-            appointment.save()
-
-            # Send notifications
-            if new_status == 'cancelled':
-                notify_appointment_canceled(appointment)
-            else:
-                notify_appointment_updated(appointment, appointment.start_time)
+            # Validate and apply the status change; notifications are sent
+            # once the change is committed
+            appointment = transition_appointment(appointment, new_status)
 
             return Response({
                 "message": f"Appointment status updated to {new_status}.",
@@ -265,16 +255,19 @@ class AppointmentStatusUpdateView(APIView):
 
         except Appointment.DoesNotExist:
             return Response({"error": "Appointment not found."}, status=status.HTTP_404_NOT_FOUND)
+        except InvalidTransition as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
 # Service Browsing Views
-class StaffServicesView(generics.ListAPIView):
+class StaffServicesView(ValuesListMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for staff to view available services.
     """
     serializer_class = ServiceSerializer
+    values_serializer_class = ServiceValuesSerializer
     permission_classes = [permissions.IsAuthenticated, IsStaff]
     queryset = Service.objects.filter(is_active=True).order_by('category', 'name')
 
@@ -484,16 +477,17 @@ class StaffAvailabilityToggleView(APIView):
 
 
 # Notification Management Views
-class StaffNotificationListView(generics.ListAPIView):
+class StaffNotificationListView(ValuesListMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for staff to list their notifications.
     """
     serializer_class = NotificationSerializer
+    values_serializer_class = NotificationValuesSerializer
     permission_classes = [permissions.IsAuthenticated, IsStaff]
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Notification.objects.filter(recipient=user).order_by('-created_at')
+        queryset = recent(Notification.objects.filter(recipient=user), self.request).order_by('-created_at')
 
         # Filter by read status if provided
         is_read = self.request.query_params.get('is_read')
@@ -0,0 +1,209 @@
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Items accepted in one bulk request, across create, update and delete
+MAX_ITEMS = getattr(settings, 'BULK_MAX_ITEMS', 500)
+
+def _is_pk(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+class BulkWriteView(APIView):
+    """
+    Create, update and delete many rows of a model in one request.
+
+    The body may hold "create" (a list of objects), "update" (a list of
+    objects with their "id", applied as partial updates) and "delete" (a
+    list of IDs). Every item is validated with serializer_class before
+    anything is written. If any item fails, nothing is written and
+    "errors" lists the errors of each item at its position, with {} for
+    valid items. Otherwise the rows are written with bulk_create(),
+    bulk_update() and one delete() in a single transaction, after rules
+    that concurrent writes could break are checked again on locked rows.
+
+    bulk_create() and bulk_update() call neither save() nor post_save
+    handlers: subclasses put save() logic in build_instance() and signal
+    side effects in after_write().
+    """
+    queryset = None
+    serializer_class = None
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('context', {'request': self.request, 'view': self})
+        return self.serializer_class(*args, **kwargs)
+
+    def post(self, request):
+        if not isinstance(request.data, Mapping):
+            return Response(
+                {"error": "The body must be an object with create, update and delete lists."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        creates = request.data.get('create', [])
+        updates = request.data.get('update', [])
+        deletes = request.data.get('delete', [])
+
+        if not all(isinstance(items, list) for items in (creates, updates, deletes)):
+            return Response(
+                {"error": "create, update and delete must be lists."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not (creates or updates or deletes):
+            return Response(
+                {"error": "Provide items to create, update or delete."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(creates) + len(updates) + len(deletes) > MAX_ITEMS:
+            return Response(
+                {"error": f"At most {MAX_ITEMS} items can be written at once."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        errors = {'create': [], 'update': [], 'delete': []}
+        to_create, to_update, to_delete = self.validate_items(creates, updates, deletes, errors)
+        if not self.has_errors(errors):
+            self.validate_batch(to_create, to_update, to_delete, errors)
+        if not self.has_errors(errors):
+            with transaction.atomic():
+                self.validate_locked(to_create, to_update, to_delete, errors)
+                if not self.has_errors(errors):
+                    created, updated, deleted_ids = self.perform_write(to_create, to_update, to_delete)
+                    self.after_write(created, updated, deleted_ids)
+        if self.has_errors(errors):
+            return Response({
+                "error": "No items were written because some are invalid.",
+                "errors": errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        written = created + updated
+        if hasattr(self.serializer_class, 'prefetch_instances'):
+            self.serializer_class.prefetch_instances(written)
+
+        return Response({
+            "message": f"{len(created)} created, {len(updated)} updated, {len(deleted_ids)} deleted.",
+            "created": self.get_serializer(created, many=True).data,
+            "updated": self.get_serializer(updated, many=True).data,
+            "deleted": deleted_ids
+        }, status=status.HTTP_200_OK)
+
+    def has_errors(self, errors):
+        return any(any(items) for items in errors.values())
+
+    def validate_items(self, creates, updates, deletes, errors):
+        """
+        Validate every item on its own, recording its errors.
+
+        The rows to update and delete are loaded with one query.
+
+        Returns:
+            tuple: (create serializers, update serializers, instances to delete)
+        """
+        ids = [item.get('id') for item in updates if isinstance(item, dict)] + deletes
+        instances = self.get_queryset().in_bulk([pk for pk in ids if _is_pk(pk)])
+        seen = set()
+
+        def get_instance(pk):
+            if not _is_pk(pk):
+                return None, {'id': ['A valid integer ID is required.']}
+            if pk in seen:
+                return None, {'id': ['Listed more than once.']}
+            if pk not in instances:
+                return None, {'id': ['Not found.']}
+            seen.add(pk)
+            return instances[pk], {}
+
+        to_create = []
+        for item in creates:
+            serializer = self.get_serializer(data=item)
+            errors['create'].append({} if serializer.is_valid() else serializer.errors)
+            to_create.append(serializer)
+
+        to_update = []
+        for item in updates:
+            instance, item_errors = get_instance(item.get('id') if isinstance(item, dict) else None)
+            serializer = None
+            if instance is not None:
+                serializer = self.get_serializer(instance, data=item, partial=True)
+                if not serializer.is_valid():
+                    item_errors = serializer.errors
+            errors['update'].append(item_errors)
+            to_update.append(serializer)
+
+        to_delete = []
+        for pk in deletes:
+            instance, item_errors = get_instance(pk)
+            errors['delete'].append(item_errors)
+            to_delete.append(instance)
+
+        return to_create, to_update, to_delete
+
+    def validate_batch(self, to_create, to_update, to_delete, errors):
+        """
+        Check rules spanning several items, once every item is valid on its own.
+
+        Subclasses record errors at the position of the offending items.
+        """
+
+    def validate_locked(self, to_create, to_update, to_delete, errors):
+        """
+        Check rules again inside the write transaction, before anything is written.
+
+        The other checks read rows before the transaction starts, so rules on
+        values a concurrent request can change (e.g. a status) are checked
+        here again, on rows locked with select_for_update().
+        """
+
+    def build_instance(self, validated_data):
+        """
+        Build an unsaved instance from a validated create item.
+        """
+        return self.serializer_class.Meta.model(**validated_data)
+
+    def perform_write(self, to_create, to_update, to_delete):
+        """
+        Write the validated batch.
+
+        Returns:
+            tuple: (created instances, updated instances, deleted IDs)
+        """
+        model = self.serializer_class.Meta.model
+
+        created = []
+        if to_create:
+            created = model.objects.bulk_create([self.build_instance(s.validated_data) for s in to_create])
+
+        updated = []
+        fields = set()
+        for serializer in to_update:
+            for field, value in serializer.validated_data.items():
+                setattr(serializer.instance, field, value)
+                fields.add(field)
+            updated.append(serializer.instance)
+        if updated and fields:
+            # bulk_update() skips pre_save(), which sets auto_now fields
+            now = timezone.now()
+            for field in model._meta.concrete_fields:
+                if getattr(field, 'auto_now', False):
+                    for instance in updated:
+                        setattr(instance, field.attname, now)
+                    fields.add(field.name)
+            model.objects.bulk_update(updated, fields)
+
+        deleted_ids = [instance.pk for instance in to_delete]
+        if deleted_ids:
+            self.get_queryset().filter(pk__in=deleted_ids).delete()
+
+        return created, updated, deleted_ids
+
+    def after_write(self, created, updated, deleted_ids):
+        """
+        Hook run inside the transaction once the batch is written.
+        """
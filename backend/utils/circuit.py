@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is rejected because the circuit is open.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open; retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker for calls to an external provider.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast for recovery_timeout seconds. It then goes half-open and lets a
+    single probe call through: success closes the circuit, failure opens it
+    again for another recovery_timeout.
+
+    Args:
+        name: Name used in logs and metrics
+        failure_threshold: Consecutive failures that open the circuit
+        recovery_timeout: Seconds the circuit stays open before probing
+        clock: Function returning the current monotonic time
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._metrics = {
+            'calls': 0,
+            'successes': 0,
+            'failures': 0,
+            'rejected': 0,
+            'trips': 0,
+            'last_trip_at': None,
+            'last_error': None,
+        }
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def retry_after(self) -> float:
+        """
+        Seconds until the circuit will let a probe through (0 if it is closed).
+        """
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self.recovery_timeout - (self._clock() - self._opened_at))
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may go ahead, reserving the probe when half-open.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                allowed = True
+            elif state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                allowed = True
+            else:
+                allowed = False
+
+            if allowed:
+                self._metrics['calls'] += 1
+            else:
+                self._metrics['rejected'] += 1
+            return allowed
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuit '{self.name}' closed after successful probe")
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+            self._metrics['successes'] += 1
+
+    def record_failure(self, error: Optional[BaseException] = None):
+        with self._lock:
+            self._failures += 1
+            self._metrics['failures'] += 1
+            self._metrics['last_error'] = str(error) if error else None
+
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+        self._metrics['trips'] += 1
+        self._metrics['last_trip_at'] = time.time()
+        logger.warning(
+            f"Circuit '{self.name}' opened after {self._failures} failure(s); "
+            f"failing fast for {self.recovery_timeout}s"
+        )
+
+    def call(self, func: Callable, *args, is_failure: Callable[[BaseException], bool] = None, **kwargs):
+        """
+        Run func through the breaker.
+
+        Args:
+            func: The provider call
+            is_failure: Optional predicate deciding whether an exception
+                counts against the provider (default: every exception does)
+
+        Returns:
+            The result of func
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_failure is None or is_failure(e):
+                self.record_failure(e)
+            else:
+                # The provider answered; the request itself was bad
+                self.record_success()
+            raise
+
+        self.record_success()
+        return result
+
+    def metrics(self) -> Dict:
+        """
+        Snapshot of the breaker's state and counters.
+        """
+        with self._lock:
+            snapshot = dict(self._metrics)
+            snapshot['state'] = self._current_state()
+            snapshot['consecutive_failures'] = self._failures
+            return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name: str, **options) -> CircuitBreaker:
+    """
+    Get the process-wide breaker for a provider, creating it on first use.
+
+    Args:
+        name: Provider name (e.g., 'twilio', 'sendgrid')
+        **options: CircuitBreaker options used when the breaker is created
+
+    Returns:
+        CircuitBreaker: The shared breaker
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **options)
+        return _breakers[name]
+
+def breaker_metrics() -> Dict[str, Dict]:
+    """
+    Metrics for every breaker created in this process.
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.metrics() for breaker in breakers}
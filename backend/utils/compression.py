@@ -0,0 +1,97 @@
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # Responses are gzipped only
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+MIN_SIZE = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+GZIP_LEVEL = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+BROTLI_QUALITY = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header.
+
+    Returns:
+        dict: Quality value by lower-cased coding
+    """
+    accepted = {}
+    for part in header.split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    return accepted
+
+def choose_encoding(header):
+    """
+    Pick the coding to compress with for an Accept-Encoding header, or None.
+
+    Brotli is preferred when installed and accepted at least as strongly as gzip.
+    """
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    gzip_quality = accepted.get('gzip', wildcard)
+    brotli_quality = accepted.get('br', wildcard) if brotli is not None else 0.0
+
+    if brotli_quality > 0 and brotli_quality >= gzip_quality:
+        return 'br'
+    if gzip_quality > 0:
+        return 'gzip'
+    return None
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli or gzip, as negotiated through Accept-Encoding.
+
+    A replacement for Django's GZipMiddleware that adds brotli and only
+    compresses bodies of at least COMPRESSION_MIN_SIZE bytes, where the
+    saving outweighs the CPU. Streaming responses, such as the notification
+    event stream, are left alone so events are not held back in a buffer.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(response.content, compresslevel=GZIP_LEVEL, mtime=0)
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+
+        # The compressed body is a different representation; a strong ETag
+        # would claim it is byte-identical to the uncompressed one
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        return response
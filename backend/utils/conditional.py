@@ -0,0 +1,64 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+class EarlyResponse(Exception):
+    """
+    Raised from initial() to answer a request without running the handler,
+    e.g. with a 304 for a conditional GET.
+    """
+
+    def __init__(self, response):
+        self.response = response
+
+class ConditionalGetMixin:
+    """
+    View mixin answering If-None-Match and If-Modified-Since with a 304.
+
+    The validators are computed by get_validators() before the handler
+    runs, so unchanged data is never serialised; subclasses compute them
+    cheaply, e.g. from a version number (see catalogue.CatalogueCacheMixin).
+    """
+    cache_control = 'public, no-cache'
+
+    def get_etag_extra(self):
+        """
+        Get anything else the response depends on, e.g. the current date.
+        """
+        return ''
+
+    def get_validators(self, request):
+        """
+        Compute the ETag and Last-Modified time of the current response.
+
+        Returns:
+            tuple: (quoted ETag, latest change as a datetime or None)
+        """
+        raise NotImplementedError
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+
+        if request.method in ('GET', 'HEAD'):
+            self.etag, self.last_modified = self.get_validators(request)
+            response = get_conditional_response(
+                request,
+                etag=self.etag,
+                last_modified=int(self.last_modified.timestamp()) if self.last_modified else None
+            )
+            if response is not None:
+                raise EarlyResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, EarlyResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (200, 304):
+            response['ETag'] = self.etag
+            if self.last_modified:
+                response['Last-Modified'] = http_date(self.last_modified.timestamp())
+            response['Cache-Control'] = self.cache_control
+        return response
@@ -0,0 +1,126 @@
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from .sparse_fields import FieldSelection, SparseFieldsetsMixin
+
+class EagerLoadingMixin:
+    """
+    Serializer mixin declaring the related rows a serializer reads.
+
+    Each serializer lists the relations its own methods use in
+    select_related_fields and prefetch_related_fields. Relations reached
+    through nested serializer fields are added automatically, prefixed with
+    the field's source, so a parent serializer never repeats what its
+    children need: single nested serializers are joined with select_related,
+    and many=True ones, with everything below them, are prefetched.
+
+    Relations only a single field reads, such as a SerializerMethodField,
+    go in field_select_related and field_prefetch_related, keyed by field
+    name, so they are skipped when a FieldSelection leaves the field out.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    field_select_related = {}
+    field_prefetch_related = {}
+
+    @classmethod
+    def get_eager_loading(cls, prefix='', many=False, selection=None):
+        """
+        Collect the related lookups this serializer and its nested serializers need.
+
+        Args:
+            prefix: Lookup path of this serializer from the root model
+            many: Whether this serializer is reached through a to-many
+                relation, in which case every lookup must be prefetched
+            selection: FieldSelection of the fields that will be rendered,
+                or None for all of them
+
+        Returns:
+            tuple: (select_related lookups, prefetch_related lookups)
+        """
+        select = []
+        prefetch = []
+
+        def join(lookup):
+            return f'{prefix}__{lookup}' if prefix else lookup
+
+        (prefetch if many else select).extend(join(lookup) for lookup in cls.select_related_fields)
+        prefetch.extend(join(lookup) for lookup in cls.prefetch_related_fields)
+
+        for name, lookups in cls.field_select_related.items():
+            if selection is None or selection.includes(name):
+                (prefetch if many else select).extend(join(lookup) for lookup in lookups)
+        for name, lookups in cls.field_prefetch_related.items():
+            if selection is None or selection.includes(name):
+                prefetch.extend(join(lookup) for lookup in lookups)
+
+        for name, field in cls._declared_fields.items():
+            nested_many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if nested_many else field
+            if not isinstance(nested, EagerLoadingMixin) or field.source == '*':
+                continue
+            if selection is not None and not selection.includes(name, nested=True):
+                continue
+
+            lookup = join((field.source or name).replace('.', '__'))
+            if many or nested_many:
+                prefetch.append(lookup)
+            else:
+                select.append(lookup)
+
+            nested_select, nested_prefetch = nested.get_eager_loading(
+                lookup, many or nested_many, selection.child(name) if selection is not None else None
+            )
+            select.extend(nested_select)
+            prefetch.extend(nested_prefetch)
+
+        return select, prefetch
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, selection=None):
+        """
+        Apply the serializer's select_related/prefetch_related lookups to a queryset.
+        """
+        select, prefetch = cls.get_eager_loading(selection=selection)
+        if select:
+            queryset = queryset.select_related(*dict.fromkeys(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*dict.fromkeys(prefetch))
+        return queryset
+
+    @classmethod
+    def prefetch_instances(cls, instances):
+        """
+        Load the serializer's related rows onto instances that were already fetched.
+        """
+        select, prefetch = cls.get_eager_loading()
+        prefetch_related_objects(list(instances), *dict.fromkeys(select + prefetch))
+
+class EagerLoadingViewMixin:
+    """
+    Generic view mixin applying the serializer's eager loading to every queryset
+    it lists or retrieves from, whatever get_queryset() returns.
+
+    For serializers using SparseFieldsetsMixin, ?fields= and ?expand= on
+    reads select what is rendered and only those relations are loaded.
+    """
+
+    def get_field_selection(self):
+        if self.request.method not in SAFE_METHODS:
+            return None
+        if not issubclass(self.get_serializer_class(), SparseFieldsetsMixin):
+            return None
+        return FieldSelection.from_query_params(self.request.query_params)
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), SparseFieldsetsMixin):
+            kwargs.setdefault('selection', self.get_field_selection())
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, EagerLoadingMixin):
+            queryset = serializer_class.setup_eager_loading(queryset, self.get_field_selection())
+        return queryset
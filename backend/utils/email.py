@@ -1,15 +1,173 @@
 import os
 import logging
-import sys
-from typing import Optional
+import threading
+from datetime import timedelta
+from html import escape
+from string import Template
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Content
+from sendgrid.helpers.mail import Mail, Email, To, Content, Personalization
+from python_http_client.exceptions import HTTPError
+
+from .circuit import CircuitOpenError, get_breaker
+from .models import DeferredEmail
 
 logger = logging.getLogger(__name__)
 
 # Get SendGrid API key from environment variable
 SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
 
+# Alternative API host, e.g. the provider_standin server used for load tests
+SENDGRID_API_BASE_URL = getattr(settings, 'SENDGRID_API_BASE_URL', None)
+
+# Hard limit on each SendGrid HTTP request
+SENDGRID_TIMEOUT_SECONDS = getattr(settings, 'SENDGRID_TIMEOUT_SECONDS', 5)
+
+# Shared by every thread; opens after repeated SendGrid failures so calls fail fast
+sendgrid_breaker = get_breaker(
+    'sendgrid',
+    failure_threshold=getattr(settings, 'PROVIDER_BREAKER_FAILURE_THRESHOLD', 5),
+    recovery_timeout=getattr(settings, 'PROVIDER_BREAKER_RECOVERY_SECONDS', 30)
+)
+
+# How long a claimed deferred email is hidden from other workers
+DEFERRED_EMAIL_LEASE = timedelta(minutes=5)
+
+# SendGrid accepts at most 1000 personalizations per mail/send request
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+_sendgrid_client = None
+_sendgrid_client_lock = threading.Lock()
+
+def get_sendgrid_client() -> SendGridAPIClient:
+    """
+    Get the shared SendGrid client, creating it on first use.
+
+    The client is reused for every message so its HTTP connection pool is
+    shared instead of being rebuilt per email, and every request is limited
+    to SENDGRID_TIMEOUT_SECONDS.
+
+    Returns:
+        SendGridAPIClient: The shared SendGrid client
+    """
+    global _sendgrid_client
+
+    if _sendgrid_client is None:
+        with _sendgrid_client_lock:
+            if _sendgrid_client is None:
+                if SENDGRID_API_BASE_URL:
+                    client = SendGridAPIClient(SENDGRID_API_KEY, host=SENDGRID_API_BASE_URL.rstrip('/'))
+                else:
+                    client = SendGridAPIClient(SENDGRID_API_KEY)
+                client.client.timeout = SENDGRID_TIMEOUT_SECONDS
+                _sendgrid_client = client
+
+    return _sendgrid_client
+
+def is_provider_failure(error: Exception) -> bool:
+    """
+    Decide whether an error means SendGrid itself is unhealthy.
+
+    Timeouts, connection errors, throttling and 5xx responses count against
+    the circuit; other 4xx responses (e.g. a malformed address) do not.
+    """
+    if isinstance(error, HTTPError):
+        return error.status_code == 429 or error.status_code >= 500
+    return True
+
+def defer_email(
+    to_emails: List[str],
+    from_email: str,
+    subject: str,
+    text_content: Optional[str],
+    html_content: Optional[str],
+    retry_after: float
+):
+    """
+    Store an email held back by the open circuit, to be sent by the
+    send_deferred_emails command once it closes.
+    """
+    DeferredEmail.objects.create(
+        to_emails=to_emails,
+        from_email=from_email,
+        subject=subject,
+        text_content=text_content,
+        html_content=html_content,
+        next_attempt_at=timezone.now() + timedelta(seconds=retry_after)
+    )
+
+def claim_deferred_emails(batch_size: int = 100, now=None) -> List:
+    """
+    Claim a batch of deferred emails that are due.
+
+    Rows are locked with ``SELECT ... FOR UPDATE SKIP LOCKED`` and leased by
+    pushing next_attempt_at forward, so concurrent workers never send the same
+    email twice and a crashed worker's emails come back after DEFERRED_EMAIL_LEASE.
+
+    Returns:
+        list: Claimed DeferredEmail instances
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        email_ids = list(
+            DeferredEmail.objects.select_for_update(skip_locked=True).filter(
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at').values_list('id', flat=True)[:batch_size]
+        )
+        DeferredEmail.objects.filter(id__in=email_ids).update(next_attempt_at=now + DEFERRED_EMAIL_LEASE)
+
+    return list(DeferredEmail.objects.filter(id__in=email_ids).order_by('id'))
+
+def send_deferred_emails(batch_size: int = 100) -> Dict[str, int]:
+    """
+    Send the due deferred emails, stopping while the circuit is open.
+
+    Recipients still held back by the circuit stay deferred until it is
+    expected to let a probe through again.
+
+    Args:
+        batch_size: Number of emails claimed per batch
+
+    Returns:
+        dict: Number of emails sent and still deferred, and of recipients
+            the sent emails were accepted for
+    """
+    results = {'sent': 0, 'deferred': 0, 'recipients': 0}
+    if not SENDGRID_API_KEY:
+        logger.error("Missing SendGrid API key. Make sure SENDGRID_API_KEY is set.")
+        return results
+
+    while not sendgrid_breaker.retry_after():
+        emails = claim_deferred_emails(batch_size=batch_size)
+        if not emails:
+            break
+
+        for index, email in enumerate(emails):
+            sent, held_back, retry_after = _send_chunks(
+                email.to_emails, email.from_email, email.subject, email.text_content, email.html_content
+            )
+            results['recipients'] += sent
+
+            if held_back:
+                # Release this email and the rest of the batch until the circuit recovers
+                email.to_emails = held_back
+                email.save(update_fields=['to_emails'])
+                remaining = [other.id for other in emails[index:]]
+                DeferredEmail.objects.filter(id__in=remaining).update(
+                    next_attempt_at=timezone.now() + timedelta(seconds=retry_after)
+                )
+                results['deferred'] += len(remaining)
+                return results
+
+            email.delete()
+            results['sent'] += 1
+
+    return results
+
 def send_email(
     to_email: str,
     from_email: str,
@@ -19,115 +177,152 @@ def send_email(
 ) -> bool:
     """
     Send an email using SendGrid.
-    
+
     Args:
         to_email: Recipient's email address
         from_email: Sender's email address
         subject: Email subject
         text_content: Plain text content (optional if html_content is provided)
         html_content: HTML content (optional if text_content is provided)
-        
+
     Returns:
         bool: True if the email was sent successfully, False otherwise
     """
+    return send_bulk_email(
+        to_emails=[to_email],
+        from_email=from_email,
+        subject=subject,
+        text_content=text_content,
+        html_content=html_content
+    ) == 1
+
+def send_bulk_email(
+    to_emails: Iterable[str],
+    from_email: str,
+    subject: str,
+    text_content: Optional[str] = None,
+    html_content: Optional[str] = None
+) -> int:
+    """
+    Send the same email to many recipients using SendGrid personalizations.
+
+    Each recipient gets their own personalization, so recipients do not see
+    each other, and up to SENDGRID_MAX_PERSONALIZATIONS recipients share a
+    single API call.
+
+    Args:
+        to_emails: Recipients' email addresses
+        from_email: Sender's email address
+        subject: Email subject
+        text_content: Plain text content (optional if html_content is provided)
+        html_content: HTML content (optional if text_content is provided)
+
+    Returns:
+        int: Number of recipients the email was accepted for
+    """
     # Validate SendGrid API key
     if not SENDGRID_API_KEY:
         logger.error("Missing SendGrid API key. Make sure SENDGRID_API_KEY is set.")
-        return False
-    
+        return 0
+
     # Ensure at least one content type is provided
     if not text_content and not html_content:
         logger.error("Either text_content or html_content must be provided.")
-        return False
-    
-    try:
-        # Initialize SendGrid client
-        sg = SendGridAPIClient(SENDGRID_API_KEY)
-        
-        # Create email message
-        message = Mail(
-            from_email=Email(from_email),
-            to_emails=To(to_email),
-            subject=subject
-        )
-        
-        # Add content based on provided parameters
-        if html_content:
-            message.content = Content("text/html", html_content)
-        elif text_content:
-            message.content = Content("text/plain", text_content)
-        
-        # Send the email
-        response = sg.send(message)
-        
-        # Check response status
-        if 200 <= response.status_code < 300:
-            logger.info(f"Email sent successfully to {to_email}")
-            return True
-        else:
-            logger.error(f"SendGrid API error: {response.status_code} - {response.body}")
-            return False
-    
-    except Exception as e:
-        logger.error(f"Unexpected error sending email: {str(e)}")
-        return False
+        return 0
+
+    to_emails = list(to_emails)
+    sent, held_back, retry_after = _send_chunks(to_emails, from_email, subject, text_content, html_content)
+
+    if held_back:
+        # Hold the remaining recipients until SendGrid recovers
+        defer_email(held_back, from_email, subject, text_content, html_content, retry_after)
+        logger.warning(f"Email to {len(held_back)} recipient(s) deferred for {retry_after:.1f}s")
+
+    return sent
+
+def _send_chunks(
+    to_emails: List[str],
+    from_email: str,
+    subject: str,
+    text_content: Optional[str],
+    html_content: Optional[str]
+) -> Tuple[int, List[str], float]:
+    """
+    Send an email in chunks of SENDGRID_MAX_PERSONALIZATIONS recipients.
+
+    Returns:
+        tuple: (recipients accepted, recipients held back by the open
+            circuit, seconds until it lets a probe through)
+    """
+    sent = 0
+
+    for start in range(0, len(to_emails), SENDGRID_MAX_PERSONALIZATIONS):
+        chunk = to_emails[start:start + SENDGRID_MAX_PERSONALIZATIONS]
+
+        try:
+            # Create email message with one personalization per recipient
+            message = Mail(from_email=Email(from_email), subject=subject)
+            for to_email in chunk:
+                personalization = Personalization()
+                personalization.add_to(To(to_email))
+                message.add_personalization(personalization)
+
+            # Add content based on provided parameters
+            if text_content:
+                message.add_content(Content("text/plain", text_content))
+            if html_content:
+                message.add_content(Content("text/html", html_content))
+
+            # Send the email
+            response = sendgrid_breaker.call(
+                get_sendgrid_client().send,
+                message,
+                is_failure=is_provider_failure
+            )
+
+            # Check response status
+            if 200 <= response.status_code < 300:
+                logger.info(f"Email sent successfully to {len(chunk)} recipient(s)")
+                sent += len(chunk)
+            else:
+                logger.error(f"SendGrid API error: {response.status_code} - {response.body}")
+
+        except CircuitOpenError as e:
+            # While half-open another sender holds the probe, which settles within the timeout
+            return sent, to_emails[start:], max(e.retry_after, SENDGRID_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.error(f"Unexpected error sending email: {str(e)}")
+
+    return sent, [], 0.0
 
 def is_sendgrid_configured() -> bool:
     """
     Check if SendGrid is properly configured.
-    
+
     Returns:
         bool: True if SendGrid is configured, False otherwise
     """
     return bool(SENDGRID_API_KEY)
 
-def send_appointment_email(
-    to_email: str,
-    from_email: str,
-    appointment_type: str,
-    client_name: str,
-    staff_name: str,
-    service_name: str,
-    appointment_time: str,
-    additional_info: Optional[str] = None
-) -> bool:
-    """
-    Send an appointment-related email using SendGrid.
-    
-    Args:
-        to_email: Recipient's email address
-        from_email: Sender's email address
-        appointment_type: Type of appointment email (e.g., 'confirmation', 'cancellation')
-        client_name: Name of the client
-        staff_name: Name of the staff member
-        service_name: Name of the service
-        appointment_time: Formatted appointment time string
-        additional_info: Any additional information to include (optional)
-        
-    Returns:
-        bool: True if the email was sent successfully, False otherwise
-    """
-    # Set up email subject based on appointment type
-    subject_mapping = {
-        'confirmation': f"Appointment Confirmation - {service_name}",
-        'cancellation': "Appointment Cancelled",
-        'rescheduled': "Appointment Rescheduled",
-        'reminder': "Appointment Reminder",
-        'completed': "Thank You for Your Visit"
-    }
-    
-    subject = subject_mapping.get(appointment_type, f"Appointment {appointment_type.title()}")
-    
-    # Create HTML content for the email
-    html_content = f"""
+# Appointment email templates, compiled once at import time
+
+APPOINTMENT_EMAIL_SUBJECTS = {
+    'confirmation': Template("Appointment Confirmation - $service_name"),
+    'cancellation': Template("Appointment Cancelled"),
+    'rescheduled': Template("Appointment Rescheduled"),
+    'reminder': Template("Appointment Reminder"),
+    'completed': Template("Thank You for Your Visit"),
+}
+
+APPOINTMENT_EMAIL_LAYOUT = Template("""
     <html>
     <head>
         <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background-color: #2c3e50; color: white; padding: 15px; text-align: center; }}
-            .content {{ padding: 20px; background-color: #f9f9f9; }}
-            .footer {{ text-align: center; margin-top: 20px; font-size: 12px; color: #777; }}
+            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+            .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+            .header { background-color: #2c3e50; color: white; padding: 15px; text-align: center; }
+            .content { padding: 20px; background-color: #f9f9f9; }
+            .footer { text-align: center; margin-top: 20px; font-size: 12px; color: #777; }
         </style>
     </head>
     <body>
@@ -136,100 +331,177 @@ def send_appointment_email(
                 <h1>Barberian Barber Shop</h1>
             </div>
             <div class="content">
-    """
-    
-    # Add content based on appointment type
-    if appointment_type == 'confirmation':
-        html_content += f"""
+    $body
+    $additional_info
+            </div>
+            <div class="footer">
+                <p>© 2025 Barberian Barber Shop. All rights reserved.</p>
+                <p>If you have any questions, please contact us.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """)
+
+APPOINTMENT_EMAIL_BODIES = {
+    'confirmation': Template("""
                 <h2>Appointment Confirmed</h2>
-                <p>Dear {client_name},</p>
+                <p>Dear $client_name,</p>
                 <p>Your appointment has been confirmed with the following details:</p>
                 <ul>
-                    <li><strong>Service:</strong> {service_name}</li>
-                    <li><strong>Barber:</strong> {staff_name}</li>
-                    <li><strong>Date & Time:</strong> {appointment_time}</li>
+                    <li><strong>Service:</strong> $service_name</li>
+                    <li><strong>Barber:</strong> $staff_name</li>
+                    <li><strong>Date & Time:</strong> $appointment_time</li>
                 </ul>
                 <p>We look forward to seeing you!</p>
-        """
-    elif appointment_type == 'cancellation':
-        html_content += f"""
+        """),
+    'cancellation': Template("""
                 <h2>Appointment Cancelled</h2>
-                <p>Dear {client_name},</p>
-                <p>Your appointment for {service_name} with {staff_name} on {appointment_time} has been cancelled.</p>
+                <p>Dear $client_name,</p>
+                <p>Your appointment for $service_name with $staff_name on $appointment_time has been cancelled.</p>
                 <p>If you would like to reschedule, please visit our website or contact us directly.</p>
-        """
-    elif appointment_type == 'rescheduled':
-        html_content += f"""
+        """),
+    'rescheduled': Template("""
                 <h2>Appointment Rescheduled</h2>
-                <p>Dear {client_name},</p>
+                <p>Dear $client_name,</p>
                 <p>Your appointment has been rescheduled to the following:</p>
                 <ul>
-                    <li><strong>Service:</strong> {service_name}</li>
-                    <li><strong>Barber:</strong> {staff_name}</li>
-                    <li><strong>New Date & Time:</strong> {appointment_time}</li>
+                    <li><strong>Service:</strong> $service_name</li>
+                    <li><strong>Barber:</strong> $staff_name</li>
+                    <li><strong>New Date & Time:</strong> $appointment_time</li>
                 </ul>
                 <p>We look forward to seeing you at the new time!</p>
-        """
-    elif appointment_type == 'reminder':
-        html_content += f"""
+        """),
+    'reminder': Template("""
                 <h2>Appointment Reminder</h2>
-                <p>Dear {client_name},</p>
+                <p>Dear $client_name,</p>
                 <p>This is a friendly reminder about your upcoming appointment:</p>
                 <ul>
-                    <li><strong>Service:</strong> {service_name}</li>
-                    <li><strong>Barber:</strong> {staff_name}</li>
-                    <li><strong>Date & Time:</strong> {appointment_time}</li>
+                    <li><strong>Service:</strong> $service_name</li>
+                    <li><strong>Barber:</strong> $staff_name</li>
+                    <li><strong>Date & Time:</strong> $appointment_time</li>
                 </ul>
                 <p>We look forward to seeing you soon!</p>
-        """
-    else:
-        html_content += f"""
+        """),
+}
+
+APPOINTMENT_EMAIL_DEFAULT_BODY = Template("""
                 <h2>Appointment Update</h2>
-                <p>Dear {client_name},</p>
-                <p>There has been an update to your appointment for {service_name} with {staff_name} on {appointment_time}.</p>
-        """
-    
-    # Add additional info if provided
-    if additional_info:
-        html_content += f"""
-                <p>{additional_info}</p>
-        """
-    
-    # Complete the HTML
-    html_content += """
-            </div>
-            <div class="footer">
-                <p>© 2025 Barberian Barber Shop. All rights reserved.</p>
-                <p>If you have any questions, please contact us.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    # Create plain text version
-    text_content = f"""
+                <p>Dear $client_name,</p>
+                <p>There has been an update to your appointment for $service_name with $staff_name on $appointment_time.</p>
+        """)
+
+APPOINTMENT_EMAIL_TEXT = Template("""
     Barberian Barber Shop
 
-    Dear {client_name},
+    Dear $client_name,
 
-    {"Your appointment has been confirmed" if appointment_type == 'confirmation' else
-     "Your appointment has been cancelled" if appointment_type == 'cancellation' else
-     "Your appointment has been rescheduled" if appointment_type == 'rescheduled' else
-     "This is a friendly reminder about your upcoming appointment" if appointment_type == 'reminder' else
-     "There has been an update to your appointment"}
+    $intro
 
-    Service: {service_name}
-    Barber: {staff_name}
-    Date & Time: {appointment_time}
+    Service: $service_name
+    Barber: $staff_name
+    Date & Time: $appointment_time
 
-    {additional_info if additional_info else ""}
+    $additional_info
 
-    {"We look forward to seeing you!" if appointment_type in ['confirmation', 'rescheduled', 'reminder'] else ""}
+    $closing
 
     © 2025 Barberian Barber Shop. All rights reserved.
+    """)
+
+APPOINTMENT_EMAIL_INTROS = {
+    'confirmation': "Your appointment has been confirmed",
+    'cancellation': "Your appointment has been cancelled",
+    'rescheduled': "Your appointment has been rescheduled",
+    'reminder': "This is a friendly reminder about your upcoming appointment",
+}
+
+def render_appointment_email(
+    appointment_type: str,
+    client_name: str,
+    staff_name: str,
+    service_name: str,
+    appointment_time: str,
+    additional_info: Optional[str] = None
+) -> Tuple[str, str, str]:
+    """
+    Render an appointment email from the pre-compiled templates.
+
+    Args:
+        appointment_type: Type of appointment email (e.g., 'confirmation', 'cancellation')
+        client_name: Name of the client
+        staff_name: Name of the staff member
+        service_name: Name of the service
+        appointment_time: Formatted appointment time string
+        additional_info: Any additional information to include (optional)
+
+    Returns:
+        tuple: (subject, html_content, text_content)
+    """
+    values = {
+        'client_name': client_name,
+        'staff_name': staff_name,
+        'service_name': service_name,
+        'appointment_time': appointment_time,
+    }
+    html_values = {key: escape(value) for key, value in values.items()}
+
+    subject_template = APPOINTMENT_EMAIL_SUBJECTS.get(appointment_type)
+    if subject_template:
+        subject = subject_template.substitute(values)
+    else:
+        subject = f"Appointment {appointment_type.title()}"
+
+    body = APPOINTMENT_EMAIL_BODIES.get(appointment_type, APPOINTMENT_EMAIL_DEFAULT_BODY)
+    html_content = APPOINTMENT_EMAIL_LAYOUT.substitute(
+        body=body.substitute(html_values),
+        additional_info=f"<p>{escape(additional_info)}</p>" if additional_info else ""
+    )
+
+    text_content = APPOINTMENT_EMAIL_TEXT.substitute(
+        values,
+        intro=APPOINTMENT_EMAIL_INTROS.get(appointment_type, "There has been an update to your appointment"),
+        additional_info=additional_info or "",
+        closing="We look forward to seeing you!" if appointment_type in ['confirmation', 'rescheduled', 'reminder'] else ""
+    )
+
+    return subject, html_content, text_content
+
+def send_appointment_email(
+    to_email: str,
+    from_email: str,
+    appointment_type: str,
+    client_name: str,
+    staff_name: str,
+    service_name: str,
+    appointment_time: str,
+    additional_info: Optional[str] = None
+) -> bool:
     """
-    
+    Send an appointment-related email using SendGrid.
+
+    Args:
+        to_email: Recipient's email address
+        from_email: Sender's email address
+        appointment_type: Type of appointment email (e.g., 'confirmation', 'cancellation')
+        client_name: Name of the client
+        staff_name: Name of the staff member
+        service_name: Name of the service
+        appointment_time: Formatted appointment time string
+        additional_info: Any additional information to include (optional)
+
+    Returns:
+        bool: True if the email was sent successfully, False otherwise
+    """
+    subject, html_content, text_content = render_appointment_email(
+        appointment_type=appointment_type,
+        client_name=client_name,
+        staff_name=staff_name,
+        service_name=service_name,
+        appointment_time=appointment_time,
+        additional_info=additional_info
+    )
+
     # Send the email with both HTML and plain text content
     return send_email(
         to_email=to_email,
@@ -237,4 +509,30 @@ def send_appointment_email(
         subject=subject,
         text_content=text_content,
         html_content=html_content
-    )
\ No newline at end of file
+    )
+
+def send_appointment_emails(from_email: str, emails: List[Dict]) -> int:
+    """
+    Send many appointment-related emails through the shared SendGrid client.
+
+    Args:
+        from_email: Sender's email address
+        emails: List of dicts with 'to_email' plus the keyword arguments of
+            render_appointment_email
+
+    Returns:
+        int: Number of emails sent successfully
+    """
+    sent = 0
+    for email in emails:
+        email = dict(email)
+        to_email = email.pop('to_email')
+        subject, html_content, text_content = render_appointment_email(**email)
+        sent += send_bulk_email(
+            to_emails=[to_email],
+            from_email=from_email,
+            subject=subject,
+            text_content=text_content,
+            html_content=html_content
+        )
+    return sent
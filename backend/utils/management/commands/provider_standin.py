@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from backend.utils.provider_standin import StandinConfig, make_server
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in for the Twilio and SendGrid APIs for offline load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+        parser.add_argument('--port', type=int, default=8025, help='Port to bind')
+        parser.add_argument('--latency-ms', type=float, default=50, help='Mean delay added to every response')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Maximum random deviation from the latency')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 500')
+        parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with a 429')
+        parser.add_argument('--undelivered-rate', type=float, default=0.0, help="Fraction of SMS that end 'undelivered'")
+        parser.add_argument('--status-interval', type=float, default=1.0, help='Seconds an SMS spends in each status')
+
+    def handle(self, *args, **options):
+        config = StandinConfig(
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            throttle_rate=options['throttle_rate'],
+            undelivered_rate=options['undelivered_rate'],
+            status_interval=options['status_interval']
+        )
+        server = make_server(options['host'], options['port'], config)
+        url = f"http://{options['host']}:{server.server_address[1]}"
+
+        self.stdout.write(self.style.SUCCESS(f"Provider stand-in listening on {url}"))
+        self.stdout.write(f"Set TWILIO_API_BASE_URL={url} and SENDGRID_API_BASE_URL={url} to use it; request counts at {url}/__stats")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Final stats: {server.state.stats()}")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from backend.utils.email import send_deferred_emails
+
+class Command(BaseCommand):
+    help = 'Send emails deferred while the SendGrid circuit was open'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of emails claimed per batch')
+
+    def handle(self, *args, **options):
+        results = send_deferred_emails(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {results['sent']} deferred email(s) to {results['recipients']} recipient(s), "
+            f"{results['deferred']} still deferred"
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.10 on 2026-10-19 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeferredEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('to_emails', models.JSONField(default=list, verbose_name='Recipients')),
+                ('from_email', models.CharField(max_length=255, verbose_name='From')),
+                ('subject', models.CharField(max_length=998, verbose_name='Subject')),
+                ('text_content', models.TextField(blank=True, null=True, verbose_name='Text Content')),
+                ('html_content', models.TextField(blank=True, null=True, verbose_name='HTML Content')),
+                ('next_attempt_at', models.DateTimeField(db_index=True, help_text='When the email is due to be sent again', verbose_name='Next Attempt At')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'Deferred Email',
+                'verbose_name_plural': 'Deferred Emails',
+                'ordering': ['next_attempt_at'],
+            },
+        ),
+    ]
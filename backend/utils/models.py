@@ -0,0 +1,30 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class DeferredEmail(models.Model):
+    """
+    Email held back while the SendGrid circuit was open.
+
+    Stored in the database so nothing is lost when the process exits, and
+    sent by the send_deferred_emails command once next_attempt_at passes.
+    """
+    to_emails = models.JSONField(_('Recipients'), default=list)
+    from_email = models.CharField(_('From'), max_length=255)
+    subject = models.CharField(_('Subject'), max_length=998)
+    text_content = models.TextField(_('Text Content'), blank=True, null=True)
+    html_content = models.TextField(_('HTML Content'), blank=True, null=True)
+    next_attempt_at = models.DateTimeField(
+        _('Next Attempt At'),
+        db_index=True,
+        help_text=_('When the email is due to be sent again')
+    )
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Deferred Email')
+        verbose_name_plural = _('Deferred Emails')
+        ordering = ['next_attempt_at']
+
+    def __str__(self):
+        return f"{self.subject} to {len(self.to_emails)} recipient(s)"
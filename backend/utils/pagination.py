@@ -0,0 +1,168 @@
+import datetime
+import decimal
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+def _encode_value(value):
+    # isoformat() keeps microseconds, which the keyset comparison needs
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a composite sort key.
+
+    Pages are selected with a WHERE clause on the sort key of the last row
+    seen instead of an OFFSET, so with an index on the key every page costs
+    the same as the first and rows inserted meanwhile never shift a page.
+    The key must be unique and non-null, which is why it ends with 'id'.
+
+    Views set cursor_ordering, e.g. ('-start_time', '-id'); clients follow
+    the opaque 'next' and 'previous' links and may pass ?page_size=.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = getattr(settings, 'KEYSET_PAGE_SIZE', 50)
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'cursor_ordering', None) or self.ordering)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.invert(self.ordering) if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page = results
+        return results
+
+    def invert(self, ordering):
+        return tuple(term[1:] if term.startswith('-') else f'-{term}' for term in ordering)
+
+    def get_keyset_filter(self, ordering, position):
+        """
+        Build the WHERE clause selecting rows after a position in the ordering.
+
+        For ('-a', '-b') and position (x, y) this is
+        ``a <= x AND (a < x OR (a = x AND b < y))``; the leading range on the
+        first column lets the database walk the index from the cursor.
+        """
+        first = ordering[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]})
+
+        after = Q()
+        for i, term in enumerate(ordering):
+            clause = Q(**{f"{term.lstrip('-')}__{'lt' if term.startswith('-') else 'gt'}": position[i]})
+            for previous, value in zip(ordering[:i], position):
+                clause &= Q(**{previous.lstrip('-'): value})
+            after |= clause
+
+        return bound & after
+
+    def get_position(self, instance):
+        # Pages of values() rows are dicts
+        if isinstance(instance, dict):
+            return [_encode_value(instance[term.lstrip('-')]) for term in self.ordering]
+        return [_encode_value(getattr(instance, term.lstrip('-'))) for term in self.ordering]
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        token = urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        """
+        Decode the cursor from the request.
+
+        Returns:
+            tuple: (position values or None, whether paging backwards)
+
+        Raises:
+            NotFound: If the cursor is malformed or does not match the ordering
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+
+        try:
+            payload = json.loads(urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                model._meta.get_field(term.lstrip('-')).to_python(value)
+                for term, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, bool(payload.get('r'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,222 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Twilio message statuses a successful message moves through, in order
+TWILIO_STATUS_FLOW = ('queued', 'sending', 'sent', 'delivered')
+
+MESSAGES_PATH = re.compile(r'^/2010-04-01/Accounts/(?P<account>[^/]+)/Messages\.json$')
+MESSAGE_PATH = re.compile(r'^/2010-04-01/Accounts/(?P<account>[^/]+)/Messages/(?P<sid>[^/]+)\.json$')
+SENDGRID_PATH = '/v3/mail/send'
+STATS_PATH = '/__stats'
+
+class StandinConfig:
+    """
+    Behaviour of the stand-in providers.
+
+    Args:
+        latency_ms: Mean delay added to every response
+        jitter_ms: Maximum random deviation from latency_ms
+        error_rate: Fraction of requests answered with a 500 error
+        throttle_rate: Fraction of requests answered with a 429 error
+        undelivered_rate: Fraction of SMS that end as 'undelivered' instead of 'delivered'
+        status_interval: Seconds an SMS spends in each status before moving on
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 50,
+        jitter_ms: float = 0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        undelivered_rate: float = 0.0,
+        status_interval: float = 1.0
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.undelivered_rate = undelivered_rate
+        self.status_interval = status_interval
+
+class StandinState:
+    """
+    Messages and request counters shared by all handler threads.
+    """
+
+    def __init__(self, config: StandinConfig):
+        self.config = config
+        self.messages: Dict[str, dict] = {}
+        self.counters: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.random = random.Random()
+
+    def count(self, key: str, amount: int = 1):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def create_message(self, account_sid: str, form: Dict[str, str]) -> dict:
+        sid = 'SM' + uuid.uuid4().hex
+        message = {
+            'sid': sid,
+            'account_sid': account_sid,
+            'to': form.get('To'),
+            'from': form.get('From'),
+            'body': form.get('Body', ''),
+            'num_segments': str(max(1, -(-len(form.get('Body', '')) // 160))),
+            'direction': 'outbound-api',
+            'api_version': '2010-04-01',
+            'price': None,
+            'price_unit': 'USD',
+            'error_code': None,
+            'error_message': None,
+            'date_created': formatdate(usegmt=True),
+            'date_updated': formatdate(usegmt=True),
+            'date_sent': None,
+            'uri': f'/2010-04-01/Accounts/{account_sid}/Messages/{sid}.json',
+            '_created': time.monotonic(),
+            '_undelivered': self.random.random() < self.config.undelivered_rate,
+        }
+        with self.lock:
+            self.messages[sid] = message
+        return self.render_message(message)
+
+    def get_message(self, sid: str) -> Optional[dict]:
+        with self.lock:
+            message = self.messages.get(sid)
+        return self.render_message(message) if message else None
+
+    def render_message(self, message: dict) -> dict:
+        """
+        Public view of a message with its status advanced by elapsed time.
+        """
+        steps = int((time.monotonic() - message['_created']) / max(self.config.status_interval, 0.001))
+        status = TWILIO_STATUS_FLOW[min(steps, len(TWILIO_STATUS_FLOW) - 1)]
+        if status == 'delivered' and message['_undelivered']:
+            status = 'undelivered'
+
+        rendered = {key: value for key, value in message.items() if not key.startswith('_')}
+        rendered['status'] = status
+        if status == 'undelivered':
+            rendered['error_code'] = 30003
+            rendered['error_message'] = 'Unreachable destination handset'
+        return rendered
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'requests': dict(self.counters), 'messages': len(self.messages)}
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """
+    Answers the subset of the Twilio and SendGrid APIs the app uses.
+    """
+    server_version = 'ProviderStandin/1.0'
+    state: StandinState = None
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        if self.path == STATS_PATH:
+            return self.respond(200, self.state.stats())
+
+        match = MESSAGE_PATH.match(self.path)
+        if not match:
+            return self.respond(404, {'code': 20404, 'message': 'The requested resource was not found', 'status': 404})
+
+        if self.inject_failure('twilio.fetch'):
+            return
+
+        message = self.state.get_message(match.group('sid'))
+        if message is None:
+            return self.respond(404, {'code': 20404, 'message': 'The requested resource was not found', 'status': 404})
+        self.state.count('twilio.fetch')
+        self.respond(200, message)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        match = MESSAGES_PATH.match(self.path)
+        if match:
+            if self.inject_failure('twilio.create'):
+                return
+            form = {key: values[-1] for key, values in parse_qs(body.decode('utf-8')).items()}
+            if not form.get('To') or not form.get('Body'):
+                return self.respond(400, {'code': 21602, 'message': 'Message body and To are required', 'status': 400})
+            self.state.count('twilio.create')
+            return self.respond(201, self.state.create_message(match.group('account'), form))
+
+        if self.path == SENDGRID_PATH:
+            if self.inject_failure('sendgrid.send'):
+                return
+            try:
+                mail = json.loads(body or b'{}')
+            except ValueError:
+                return self.respond(400, {'errors': [{'message': 'Invalid JSON'}]})
+            recipients = sum(len(p.get('to', [])) for p in mail.get('personalizations', []))
+            self.state.count('sendgrid.send')
+            self.state.count('sendgrid.recipients', recipients)
+            return self.respond(202, None)
+
+        self.respond(404, {'errors': [{'message': 'Not found'}]})
+
+    def inject_failure(self, key: str) -> bool:
+        """
+        Apply the configured latency and, randomly, an error response.
+
+        Returns:
+            bool: True if an error response was sent
+        """
+        config = self.state.config
+        delay = config.latency_ms + self.state.random.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        roll = self.state.random.random()
+        if roll < config.throttle_rate:
+            self.state.count(f'{key}.throttled')
+            self.respond(429, {'code': 20429, 'message': 'Too Many Requests', 'status': 429})
+            return True
+        if roll < config.throttle_rate + config.error_rate:
+            self.state.count(f'{key}.error')
+            self.respond(500, {'code': 20500, 'message': 'Internal Server Error', 'status': 500})
+            return True
+        return False
+
+    def respond(self, status: int, payload):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        if data:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def make_server(host: str = '127.0.0.1', port: int = 8025, config: Optional[StandinConfig] = None) -> ThreadingHTTPServer:
+    """
+    Build a stand-in server for the Twilio and SendGrid APIs.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        config: StandinConfig controlling latency and failures
+
+    Returns:
+        ThreadingHTTPServer: The server, not yet serving
+    """
+    state = StandinState(config or StandinConfig())
+    handler = type('BoundStandinHandler', (StandinHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
@@ -0,0 +1,38 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+# Types orjson has no native encoding for, or encodes differently from DRF,
+# (Decimal, dates and times, lazy strings, querysets...) go through DRF's encoder
+_default = encoders.JSONEncoder().default
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer producing the same bytes with orjson.
+
+    orjson encodes dicts, lists, strings and numbers natively. Datetimes are
+    passed through to DRF's encoder so they keep its format ('Z' for UTC),
+    as are Decimals and lazy translation strings. Indented output (the
+    browsable API, ?indent=), non-default UNICODE_JSON/COMPACT_JSON settings
+    and anything orjson cannot encode, such as integers wider than 64 bits,
+    fall back to JSONRenderer.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if indent or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape the line and paragraph separators like JSONRenderer, so the
+        # output is also valid JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
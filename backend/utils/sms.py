@@ -1,10 +1,16 @@
 import os
 import logging
+import threading
 from typing import Optional
+import requests
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
 from twilio.base.exceptions import TwilioRestException
 
+from .circuit import CircuitOpenError, get_breaker
+
 logger = logging.getLogger(__name__)
 
 # Get Twilio credentials from settings
@@ -12,44 +18,135 @@ TWILIO_ACCOUNT_SID = settings.TWILIO_ACCOUNT_SID
 TWILIO_AUTH_TOKEN = settings.TWILIO_AUTH_TOKEN
 TWILIO_PHONE_NUMBER = settings.TWILIO_PHONE_NUMBER
 
-def send_twilio_message(to_phone_number: str, message: str) -> Optional[str]:
+# Alternative API host, e.g. the provider_standin server used for load tests
+TWILIO_API_BASE_URL = getattr(settings, 'TWILIO_API_BASE_URL', None)
+
+# Hard limit on each Twilio HTTP request, so a slow provider cannot stall requests
+TWILIO_TIMEOUT_SECONDS = getattr(settings, 'TWILIO_TIMEOUT_SECONDS', 5)
+
+# Shared by every thread; opens after repeated Twilio failures so calls fail fast
+twilio_breaker = get_breaker(
+    'twilio',
+    failure_threshold=getattr(settings, 'PROVIDER_BREAKER_FAILURE_THRESHOLD', 5),
+    recovery_timeout=getattr(settings, 'PROVIDER_BREAKER_RECOVERY_SECONDS', 30)
+)
+
+_twilio_client = None
+_twilio_client_lock = threading.Lock()
+
+def get_twilio_client() -> Client:
+    """
+    Get the shared Twilio client, creating it on first use.
+
+    Every request is limited to TWILIO_TIMEOUT_SECONDS. When
+    TWILIO_API_BASE_URL is set, requests go to that host instead of
+    api.twilio.com.
+
+    Returns:
+        Client: The shared Twilio client
+    """
+    global _twilio_client
+
+    if _twilio_client is None:
+        with _twilio_client_lock:
+            if _twilio_client is None:
+                client = Client(
+                    TWILIO_ACCOUNT_SID,
+                    TWILIO_AUTH_TOKEN,
+                    http_client=TwilioHttpClient(timeout=TWILIO_TIMEOUT_SECONDS)
+                )
+                if TWILIO_API_BASE_URL:
+                    client.api.base_url = TWILIO_API_BASE_URL.rstrip('/')
+                _twilio_client = client
+
+    return _twilio_client
+
+def is_provider_failure(error: Exception) -> bool:
+    """
+    Decide whether an error means Twilio itself is unhealthy.
+
+    Timeouts, connection errors, throttling and 5xx responses count against
+    the circuit; other 4xx responses (e.g. an invalid number) do not.
+    """
+    if isinstance(error, TwilioRestException):
+        return error.status == 429 or error.status >= 500
+    return True
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Decide whether a failed send is worth retrying.
+
+    Only timeouts, connection errors, throttling, 5xx responses and an open
+    circuit are transient; other 4xx responses (e.g. an invalid number),
+    missing credentials and unexpected errors fail the same way every time.
+    """
+    if isinstance(error, TwilioRestException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (CircuitOpenError, requests.Timeout, requests.ConnectionError))
+
+def describe_sms_error(error: Exception) -> str:
+    """
+    Describe a failed send for SMSNotification.error_message.
+    """
+    if isinstance(error, TwilioRestException):
+        return f"Twilio error {error.code} (HTTP {error.status}): {error.msg}"
+    return str(error) or error.__class__.__name__
+
+def create_twilio_message(to_phone_number: str, message: str) -> str:
     """
-    Send an SMS message using Twilio.
+    Send an SMS message using Twilio, raising on failure.
 
     Args:
         to_phone_number: The recipient's phone number in E.164 format (e.g., +1XXXXXXXXXX)
         message: The message content to send
 
     Returns:
-        str: The Twilio message SID if successful, None otherwise
+        str: The Twilio message SID
+
+    Raises:
+        ImproperlyConfigured: If the Twilio credentials are missing
+        CircuitOpenError: If the Twilio circuit is open
+        TwilioRestException: If Twilio rejected the message
+        requests.RequestException: If Twilio could not be reached in time
     """
     # Validate Twilio credentials
     if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER]):
-        logger.error("Missing Twilio credentials. Make sure TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, and TWILIO_PHONE_NUMBER are set.")
-        return None
+        raise ImproperlyConfigured(
+            "Missing Twilio credentials. Make sure TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, and TWILIO_PHONE_NUMBER are set."
+        )
 
     # Sanitize phone number if needed
     sanitized_phone = sanitize_phone_number(to_phone_number)
 
-    try:
-        # Initialize Twilio client
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-
-        # Send the message
-        twilio_message = client.messages.create(
-            body=message,
-            from_=TWILIO_PHONE_NUMBER,
-            to=sanitized_phone
-        )
+    twilio_message = twilio_breaker.call(
+        get_twilio_client().messages.create,
+        body=message,
+        from_=TWILIO_PHONE_NUMBER,
+        to=sanitized_phone,
+        is_failure=is_provider_failure
+    )
 
-        logger.info(f"SMS sent successfully to {sanitized_phone}, SID: {twilio_message.sid}")
-        return twilio_message.sid
+    logger.info(f"SMS sent successfully to {sanitized_phone}, SID: {twilio_message.sid}")
+    return twilio_message.sid
 
-    except TwilioRestException as e:
-        logger.error(f"Twilio error: {e.code} - {e.msg}")
+def send_twilio_message(to_phone_number: str, message: str) -> Optional[str]:
+    """
+    Send an SMS message using Twilio, logging any failure.
+
+    Args:
+        to_phone_number: The recipient's phone number in E.164 format (e.g., +1XXXXXXXXXX)
+        message: The message content to send
+
+    Returns:
+        str: The Twilio message SID if successful, None otherwise
+    """
+    try:
+        return create_twilio_message(to_phone_number, message)
+    except CircuitOpenError as e:
+        logger.warning(f"SMS to {to_phone_number} not sent: {str(e)}")
         return None
     except Exception as e:
-        logger.error(f"Unexpected error sending SMS: {str(e)}")
+        logger.error(f"Error sending SMS: {describe_sms_error(e)}")
         return None
 
 def get_message_status(message_sid: str) -> Optional[str]:
@@ -68,15 +165,18 @@ def get_message_status(message_sid: str) -> Optional[str]:
         return None
 
     try:
-        # Initialize Twilio client
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-
         # Get the message
-        message = client.messages.get(message_sid).fetch()
+        message = twilio_breaker.call(
+            get_twilio_client().messages.get(message_sid).fetch,
+            is_failure=is_provider_failure
+        )
 
         logger.info(f"SMS status for {message_sid}: {message.status}")
         return message.status
 
+    except CircuitOpenError as e:
+        logger.warning(f"Status check for {message_sid} skipped: {str(e)}")
+        return None
     except TwilioRestException as e:
         logger.error(f"Twilio error checking message status: {e.code} - {e.msg}")
         return None
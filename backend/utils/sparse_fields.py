@@ -0,0 +1,94 @@
+from rest_framework import serializers
+
+def _split(value):
+    return [path.strip() for path in (value or '').split(',') if path.strip()]
+
+class FieldSelection:
+    """
+    The fields a client asked for with ?fields= and ?expand=, for one serializer.
+
+    ``?fields=id,start_time,service_details.name`` limits a response to the
+    listed fields; dotted paths select fields of nested serializers, and
+    naming a nested field expands it. ``?expand=client_details`` adds a
+    nested serializer, with all of its own plain fields, to the response.
+    Once either parameter is given nested serializers are opt-in: those not
+    named in either parameter are left out, and so is the loading of their rows.
+    """
+
+    def __init__(self):
+        # None selects every plain field
+        self.fields = None
+        self.expand = {}
+
+    @classmethod
+    def from_query_params(cls, query_params):
+        """
+        Parse ?fields= and ?expand= into a selection.
+
+        Returns:
+            FieldSelection: The selection, or None when neither parameter is
+                given and the full representation should be used
+        """
+        if 'fields' not in query_params and 'expand' not in query_params:
+            return None
+
+        selection = cls()
+        for path in _split(query_params.get('fields')):
+            node = selection
+            for name in path.split('.')[:-1]:
+                node.add_field(name)
+                node = node.expand.setdefault(name, cls())
+            node.add_field(path.split('.')[-1])
+
+        for path in _split(query_params.get('expand')):
+            node = selection
+            for name in path.split('.'):
+                node = node.expand.setdefault(name, cls())
+
+        return selection
+
+    def add_field(self, name):
+        if self.fields is None:
+            self.fields = set()
+        self.fields.add(name)
+
+    def includes(self, name, nested=False):
+        """
+        Whether a field is part of the selection; nested serializers only are when named.
+        """
+        if nested:
+            return name in self.expand or (self.fields is not None and name in self.fields)
+        return self.fields is None or name in self.fields
+
+    def child(self, name):
+        """
+        Get the selection for a nested serializer field.
+        """
+        return self.expand.get(name) or FieldSelection()
+
+class SparseFieldsetsMixin:
+    """
+    Serializer mixin dropping the fields a FieldSelection leaves out.
+
+    Views pass the selection as the ``selection`` keyword; nested serializers
+    using the mixin receive their part of it from their parent. Without a
+    selection the serializer renders every field as usual.
+    """
+
+    def __init__(self, *args, selection=None, **kwargs):
+        self.selection = selection
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.selection is None:
+            return fields
+
+        for name, field in list(fields.items()):
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if not self.selection.includes(name, isinstance(nested, serializers.BaseSerializer)):
+                del fields[name]
+            elif isinstance(nested, SparseFieldsetsMixin):
+                nested.selection = self.selection.child(name)
+
+        return fields
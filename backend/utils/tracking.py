@@ -0,0 +1,108 @@
+class LazyDirtyFieldsMixin:
+    """
+    Model mixin tracking which fields changed since the instance was loaded.
+
+    A drop-in replacement for dirtyfields.DirtyFieldsMixin that does no work
+    when an instance is built. from_db() only keeps a reference to the row
+    the instance was loaded from; the saved state is built from it the first
+    time get_dirty_fields() is called, so read-only paths that load thousands
+    of rows never pay for tracking. The state is refreshed after save() and
+    refresh_from_db(), once post_save handlers have seen the changes.
+
+    Values are compared by equality without copying, so the mixin is meant
+    for models without mutable field values (e.g. JSONField).
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_row = (field_names, values)
+        return instance
+
+    def _get_saved_state(self):
+        """
+        Get the field values last read from or written to the database, by attname.
+        """
+        state = self.__dict__.get('_saved_state')
+        if state is None:
+            row = self.__dict__.pop('_loaded_row', None)
+            state = dict(zip(*row)) if row else {}
+            self._saved_state = state
+        return state
+
+    def _reset_saved_state(self, fields=None):
+        """
+        Record the current values as saved, for all loaded fields or only the given ones.
+        """
+        if fields is None:
+            state = {}
+            tracked = self._meta.concrete_fields
+        else:
+            state = dict(self._get_saved_state())
+            tracked = [self._meta.get_field(name) for name in fields]
+
+        for field in tracked:
+            value = self.__dict__.get(field.attname, state)
+            if value is state or hasattr(value, 'resolve_expression'):
+                # Deferred, or set to an expression whose result is unknown
+                state.pop(field.attname, None)
+            else:
+                state[field.attname] = value
+
+        self.__dict__.pop('_loaded_row', None)
+        self._saved_state = state
+
+    def get_dirty_fields(self, check_relationship=False):
+        """
+        Get the fields whose value differs from the saved one.
+
+        Args:
+            check_relationship: Whether to include foreign keys
+
+        Returns:
+            dict: Mapping of changed field name to its saved value; for
+                unsaved instances, every loaded field and its current value
+        """
+        fields = [
+            field for field in self._meta.concrete_fields
+            if check_relationship or not field.remote_field
+        ]
+
+        if self._state.adding:
+            return {
+                field.name: self.__dict__[field.attname]
+                for field in fields
+                if field.attname in self.__dict__ and not (field.primary_key and self.pk is None)
+            }
+
+        saved = self._get_saved_state()
+        dirty = {}
+        for field in fields:
+            if field.attname not in saved or field.attname not in self.__dict__:
+                continue
+
+            value = self.__dict__[field.attname]
+            if value == saved[field.attname] or hasattr(value, 'resolve_expression'):
+                continue
+
+            try:
+                # Tolerate values assigned in their serialised form, e.g. '12' for 12
+                if field.to_python(value) == saved[field.attname]:
+                    continue
+            except Exception:
+                pass
+
+            dirty[field.name] = saved[field.attname]
+
+        return dirty
+
+    def is_dirty(self, check_relationship=False):
+        return bool(self.get_dirty_fields(check_relationship=check_relationship))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._reset_saved_state(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._reset_saved_state(fields)
@@ -0,0 +1,221 @@
+from collections import defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+# Field types whose to_representation() returns values() results unchanged
+IDENTITY_FIELDS = (
+    serializers.IntegerField, serializers.CharField, serializers.EmailField,
+    serializers.URLField, serializers.BooleanField, serializers.ChoiceField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+class ValuesSerializer:
+    """
+    Read-only fast path rendering a ModelSerializer's output from values() rows.
+
+    The field list, sources and formatting come from the ModelSerializer it
+    mirrors, compiled once per request into a plan of (name, column,
+    converter) entries, so rows become dicts without instantiating models or
+    going through DRF's per-field attribute lookups. Nested serializers are
+    read from joined columns in the same query; many=True ones with one
+    extra query per relation, grouped by foreign key.
+
+    Subclasses map nested serializer fields to their ValuesSerializer in
+    ``nested`` and, for each SerializerMethodField, list in ``method_fields``
+    the columns (or many=True fields) passed to their get_<name>() method.
+    """
+    serializer_class = None
+    nested = {}
+    method_fields = {}
+
+    def __init__(self, context=None, serializer=None, prefix=''):
+        if serializer is None:
+            serializer = self.serializer_class(context=context or {})
+        self.context = serializer.context
+        self.prefix = prefix
+        self.model = serializer.Meta.model
+        self.pk_column = prefix + self.model._meta.pk.attname
+        self.columns = [self.pk_column]
+        self.children = []
+        self.many = []
+        self.fields = serializer.fields
+        self.plan = [
+            self.compile_field(name, field)
+            for name, field in serializer.fields.items()
+            if not field.write_only
+        ]
+        self.columns = list(dict.fromkeys(self.columns))
+
+    def get_nested_class(self, name):
+        try:
+            return self.nested[name]
+        except KeyError:
+            raise ImproperlyConfigured(f"{type(self).__name__}.nested has no entry for '{name}'")
+
+    def compile_field(self, name, field):
+        """
+        Compile a serializer field into a (name, column, converter) plan entry.
+
+        A column of None means the converter is given the whole row.
+        """
+        source = field.source.replace('.', '__')
+
+        if isinstance(field, serializers.ListSerializer):
+            relation = self.model._meta.get_field(source)
+            child = self.get_nested_class(name)(serializer=field.child)
+            key = self.prefix + name
+            self.many.append((key, child, relation.field.attname, relation.related_model._default_manager))
+            return name, key, None
+
+        if isinstance(field, serializers.BaseSerializer):
+            child = self.get_nested_class(name)(serializer=field, prefix=f'{self.prefix}{source}__')
+            self.columns.extend(child.columns)
+            self.children.append(child)
+            return name, None, child.to_representation
+
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in self.method_fields:
+                raise ImproperlyConfigured(f"{type(self).__name__}.method_fields has no entry for '{name}'")
+            args = self.method_fields[name]
+            keys = [self.prefix + arg.replace('.', '__') for arg in args]
+            # many=True fields are passed rendered; everything else is a column
+            self.columns.extend(
+                key for arg, key in zip(args, keys)
+                if not isinstance(self.fields.get(arg), serializers.ListSerializer)
+            )
+            method = getattr(self, field.method_name)
+            return name, None, lambda row: method(*[row[key] for key in keys])
+
+        if isinstance(field, serializers.ReadOnlyField) or source == '*':
+            raise ImproperlyConfigured(f"'{name}' cannot be read from values() rows")
+
+        column = self.prefix + source
+        self.columns.append(column)
+
+        if type(field) in IDENTITY_FIELDS:
+            return name, column, None
+        if isinstance(field, serializers.FileField):
+            return name, column, self.get_file_converter(field, self.model._meta.get_field(source))
+        if type(field) is serializers.DateTimeField:
+            return name, column, self.get_datetime_converter(field)
+        return name, column, field.to_representation
+
+    def get_datetime_converter(self, field):
+        """
+        Format aware datetimes like DateTimeField.to_representation, resolving
+        the output timezone once instead of for every value.
+        """
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if value.tzinfo is None:
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+
+        return convert
+
+    def get_file_converter(self, field, model_field):
+        """
+        Build the URL of a stored file name the way FileField.to_representation does.
+        """
+        if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            return lambda name: name or None
+
+        storage = model_field.storage
+        request = self.context.get('request')
+
+        def convert(name):
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return convert
+
+    def values(self, queryset):
+        """
+        Turn a queryset of the serializer's model into one of the rows it needs.
+        """
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    def load_related(self, rows):
+        """
+        Render the many=True relations of the rows and store them on each row.
+        """
+        for key, child, foreign_key, manager in self.many:
+            ids = {row[self.pk_column] for row in rows if row[self.pk_column] is not None}
+            grouped = defaultdict(list)
+            if ids:
+                child_rows = list(manager.filter(**{f'{foreign_key}__in': ids}).values(*child.columns, foreign_key))
+                child.load_related(child_rows)
+                for child_row in child_rows:
+                    grouped[child_row[foreign_key]].append(child.to_representation(child_row))
+            for row in rows:
+                row[key] = grouped.get(row[self.pk_column], [])
+
+        for child in self.children:
+            child.load_related(rows)
+
+    def to_representation(self, row):
+        if row[self.pk_column] is None:
+            # Null foreign key of a nested serializer
+            return None
+
+        data = {}
+        for name, column, convert in self.plan:
+            if column is None:
+                data[name] = convert(row)
+            else:
+                value = row[column]
+                data[name] = value if value is None or convert is None else convert(value)
+        return data
+
+    def render(self, rows):
+        """
+        Render values() rows into the serializer's representation.
+
+        Returns:
+            list: One dict per row, equal to the ModelSerializer's output
+        """
+        rows = list(rows)
+        self.load_related(rows)
+        return [self.to_representation(row) for row in rows]
+
+class ValuesListMixin:
+    """
+    List view mixin serving full representations through values_serializer_class.
+
+    Applies when the view's serializer renders every field; requests
+    selecting fields with ?fields= or ?expand= use the regular serializer.
+    Keyset pagination works on the rows as long as the ordering columns
+    are serialised fields.
+    """
+    values_serializer_class = None
+
+    def get_values_serializer(self):
+        if self.values_serializer_class is None:
+            return None
+        if hasattr(self, 'get_field_selection') and self.get_field_selection() is not None:
+            return None
+        return self.values_serializer_class(serializer=self.get_serializer())
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = values_serializer.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.render(page))
+        return Response(values_serializer.render(rows))